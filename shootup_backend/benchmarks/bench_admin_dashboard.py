@@ -0,0 +1,57 @@
+"""Admin dashboard: aggregating on every request vs reading the materialized snapshot.
+
+Usage:
+    python benchmarks/bench_admin_dashboard.py [--learners 20000] [--requests 200]
+
+"live" runs the dashboard aggregates for each request, as the endpoint used
+to; "snapshot" is GET /api/admin/dashboard reading the stored snapshot row.
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--learners', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    app, db = load_app(temp_database_path(), SHOOTUP_DASHBOARD_STATS_BACKGROUND=0)
+    from src.services.dashboard_stats import build_dashboard_stats, dashboard_stats
+
+    with app.app_context():
+        seed_catalog(db, courses=200, lessons_per_course=10, learners=args.learners)
+        engine = db.engine
+    dashboard_stats.refresh()
+
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+
+    statements.clear()
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        with app.app_context():
+            build_dashboard_stats()
+    live_s = time.perf_counter() - started
+    live_statements = len(statements) / args.requests
+
+    admin = login_client(app, 1, 'admin')
+    statements.clear()
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        response = admin.get('/api/admin/dashboard')
+        assert response.status_code == 200, response.get_json()
+    snapshot_s = time.perf_counter() - started
+    snapshot_statements = len(statements) / args.requests
+
+    rows = [
+        {'mode': 'live', 'ms/request': f'{live_s / args.requests * 1000:.2f}', 'SQL statements': f'{live_statements:g}'},
+        {'mode': 'snapshot', 'ms/request': f'{snapshot_s / args.requests * 1000:.2f}', 'SQL statements': f'{snapshot_statements:g}'}
+    ]
+    report(f'{args.requests} dashboard loads with {args.learners} learners', rows, ['mode', 'ms/request', 'SQL statements'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Audited admin actions: writing each audit row vs the buffered audit writer.
+
+Usage:
+    python benchmarks/bench_audit_writer.py [--threads 4] [--actions 500]
+
+Each thread approves courses through POST /api/admin/courses/<id>/approve.
+"sync" inserts every audit row in its own write transaction
+(SHOOTUP_AUDIT_BUFFERED=0); "buffered" queues it for the background writer,
+which inserts the queue in batches, and "durable" also fsyncs it to the
+spool before the request returns. Every mode must end with one audit row
+per action, and is timed until the last row is visible.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from sqlalchemy import event
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+def run_actions(app, course_ids, threads, actions):
+    """Approve courses from `threads` clients; returns per-request latencies in ms"""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(offset):
+        client = login_client(app, 1, 'admin')
+        local = []
+        for i in range(actions):
+            course_id = course_ids[(offset * actions + i) % len(course_ids)]
+            started = time.perf_counter()
+            response = client.post(f'/api/admin/courses/{course_id}/approve')
+            local.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.get_json()
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--actions', type=int, default=500)
+    args = parser.parse_args()
+
+    app, db = load_app(temp_database_path(), SHOOTUP_DASHBOARD_STATS_BACKGROUND=0, SHOOTUP_RESPONSE_CACHE=0)
+    from src.models.user import AuditLog
+    from src.services.audit import audit_writer
+
+    with app.app_context():
+        course_ids = seed_catalog(db, courses=200, lessons_per_course=1, learners=10)['course_ids']
+        engine = db.engine
+
+    write_transactions = []
+    event.listen(engine, 'commit', lambda connection: write_transactions.append(1))
+
+    total = args.threads * args.actions
+    rows = []
+    for mode, buffered, durable in (('sync', False, False), ('buffered', True, False), ('durable', True, True)):
+        with app.app_context():
+            AuditLog.query.delete()
+            db.session.commit()
+        audit_writer.buffered, audit_writer.durable = buffered, durable
+
+        write_transactions.clear()
+        started = time.perf_counter()
+        latencies = run_actions(app, course_ids, args.threads, args.actions)
+        elapsed = time.perf_counter() - started
+        while True:
+            with app.app_context():
+                written = AuditLog.query.count()
+            if written >= total:
+                break
+            time.sleep(0.01)
+        visible = time.perf_counter() - started
+
+        assert written == total, f'{mode}: {written} audit rows for {total} actions'
+        latencies.sort()
+        rows.append({
+            'mode': mode,
+            'actions/s': f'{total / elapsed:,.0f}',
+            'p50 ms': f'{statistics.median(latencies):.2f}',
+            'p99 ms': f'{latencies[int(len(latencies) * 0.99) - 1]:.2f}',
+            'commits': len(write_transactions),
+            'all visible after s': f'{visible:.2f}'
+        })
+
+    report(f'{total} audited course approvals from {args.threads} threads', rows,
+           ['mode', 'actions/s', 'p50 ms', 'p99 ms', 'commits', 'all visible after s'])
+    print('\nEvery mode wrote one audit row per action: yes')
+
+if __name__ == '__main__':
+    main()
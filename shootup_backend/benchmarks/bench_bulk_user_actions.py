@@ -0,0 +1,74 @@
+"""Bulk user actions: ORM objects flipped one at a time vs chunked set-based UPDATEs.
+
+Usage:
+    python benchmarks/bench_bulk_user_actions.py [--users 100000]
+
+"orm" loads every targeted user with one IN query and sets is_active on
+each object, the way POST /api/admin/bulk-actions/users worked before (on
+SQLite builds with the default bound variable limit, 32766 since 3.32 and
+999 before, a long id list fails outright). "set-based" reactivates the
+same ids, then deactivates them again by filter, through the endpoint.
+Peak Python allocations are measured with tracemalloc.
+"""
+import argparse
+import time
+import tracemalloc
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+def measure(function):
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = function()
+    except Exception as e:
+        result = f'failed: {type(e).__name__}'
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    args = parser.parse_args()
+
+    app, db = load_app(temp_database_path(), SHOOTUP_DASHBOARD_STATS_BACKGROUND=0, SHOOTUP_AUDIT_DURABLE=0)
+    from src.models.user import User
+
+    with app.app_context():
+        user_ids = seed_catalog(db, courses=1, lessons_per_course=1, learners=args.users, enroll=False)['learner_ids']
+    admin = login_client(app, 1, 'admin')
+
+    def orm_deactivate():
+        with app.app_context():
+            users = User.query.filter(User.user_id.in_(user_ids)).all()
+            for user in users:
+                user.is_active = False
+            db.session.commit()
+            return len(users)
+
+    def bulk(body):
+        def run():
+            response = admin.post('/api/admin/bulk-actions/users', json=body)
+            assert response.status_code == 200, response.get_json()
+            return response.get_json()['affected']
+        return run
+
+    rows = []
+    for mode, function in (
+        ('orm, by ids', orm_deactivate),
+        ('set-based activate, by ids', bulk({'action': 'activate', 'user_ids': user_ids})),
+        ('set-based deactivate, by filter', bulk({'action': 'deactivate', 'filter': {'role': 'learner', 'is_active': True}}))
+    ):
+        result, seconds, peak = measure(function)
+        rows.append({'mode': mode, 'users changed': result, 'seconds': f'{seconds:.2f}', 'peak MB': f'{peak:.1f}'})
+
+    with app.app_context():
+        inactive = User.query.filter(User.user_id.in_(user_ids), User.is_active.is_(False)).count()
+    assert inactive == args.users, f'{args.users - inactive} users still active'
+
+    report(f'Bulk is_active changes on {args.users} users', rows, ['mode', 'users changed', 'seconds', 'peak MB'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Deleting a big course: ORM-loaded children vs ON DELETE CASCADE vs soft delete and background purge.
+
+Usage:
+    python benchmarks/bench_cascade_delete.py [--enrollments 20000] [--completions 10]
+
+Three courses get --enrollments enrollments each, with --completions lesson
+completions per enrollment. "orm" loads the course's enrollments and their
+completions and deletes them object by object, the way the cascade
+relationships worked before. "cascade" is DELETE /api/courses/<id> with the
+purge threshold out of reach, so one statement cascades in the database.
+"soft delete" is the same request under the default threshold: it returns
+202 and the purger removes the rows in batches. A probe thread commits a
+one-row write every 10 ms on its own connection throughout; its slowest
+write is how long the delete kept other writers waiting.
+"""
+import argparse
+import sqlite3
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+class WriteProbe:
+    def __init__(self, path):
+        self.path = path
+        self.worst = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        connection = sqlite3.connect(self.path, timeout=600, isolation_level=None)
+        connection.execute('CREATE TABLE IF NOT EXISTS bench_probe (id INTEGER PRIMARY KEY, at REAL)')
+        while not self._stop.wait(0.01):
+            started = time.perf_counter()
+            connection.execute('INSERT OR REPLACE INTO bench_probe (id, at) VALUES (1, ?)', (started,))
+            self.worst = max(self.worst, time.perf_counter() - started)
+        connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--enrollments', type=int, default=20000)
+    parser.add_argument('--completions', type=int, default=10)
+    args = parser.parse_args()
+
+    path = temp_database_path()
+    app, db = load_app(
+        path, SHOOTUP_DASHBOARD_STATS_BACKGROUND=0, SHOOTUP_AUDIT_DURABLE=0,
+        SHOOTUP_PURGE_THRESHOLD_ROWS=10000, SHOOTUP_PURGE_INTERVAL=1
+    )
+    from sqlalchemy.orm import selectinload
+    from src.models.user import Course, Enrollment, Lesson, LessonCompletion
+    from src.services.purge import purger
+
+    with app.app_context():
+        course_ids = seed_catalog(db, courses=3, lessons_per_course=args.completions, learners=3 * args.enrollments)['course_ids']
+        now = datetime.utcnow()
+        for course_id in course_ids:
+            lesson_ids = [lesson_id for lesson_id, in db.session.query(Lesson.lesson_id).filter_by(course_id=course_id)]
+            enrollment_ids = [enrollment_id for enrollment_id, in db.session.query(Enrollment.enrollment_id).filter_by(course_id=course_id)]
+            db.session.execute(LessonCompletion.__table__.insert(), [
+                {'enrollment_id': enrollment_id, 'lesson_id': lesson_id, 'completion_date': now}
+                for enrollment_id in enrollment_ids for lesson_id in lesson_ids
+            ])
+        db.session.commit()
+    admin = login_client(app, 1, 'admin')
+
+    def orm_delete(course_id):
+        with app.app_context():
+            course = db.session.get(Course, course_id, options=[selectinload(Course.enrollments).selectinload(Enrollment.completions)])
+            for enrollment in course.enrollments:
+                for completion in enrollment.completions:
+                    db.session.delete(completion)
+                db.session.delete(enrollment)
+            db.session.delete(course)
+            db.session.commit()
+
+    def api_delete(course_id, threshold):
+        purger.threshold = threshold
+        response = admin.delete(f'/api/courses/{course_id}')
+        assert response.status_code in (200, 202), response.get_json()
+        return response.status_code
+
+    def gone(course_id):
+        with app.app_context(), db.engine.connect() as connection:
+            return not connection.exec_driver_sql(
+                f'SELECT COUNT(*) FROM courses WHERE course_id = {course_id}'
+            ).scalar() and not connection.exec_driver_sql(
+                f'SELECT COUNT(*) FROM enrollments WHERE course_id = {course_id}'
+            ).scalar()
+
+    rows = []
+    for mode, course_id, function in (
+        ('orm, children loaded', course_ids[0], lambda: orm_delete(course_ids[0])),
+        ('cascade', course_ids[1], lambda: api_delete(course_ids[1], threshold=10 ** 12)),
+        ('soft delete + purge', course_ids[2], lambda: api_delete(course_ids[2], threshold=10000))
+    ):
+        with WriteProbe(path) as probe:
+            tracemalloc.start()
+            started = time.perf_counter()
+            status = function()
+            responded = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            while not gone(course_id):
+                time.sleep(0.05)
+            finished = time.perf_counter() - started
+        rows.append({
+            'mode': mode, 'status': status or '-', 'response s': f'{responded:.2f}', 'gone after s': f'{finished:.2f}',
+            'peak MB': f'{peak:.1f}', 'worst other write ms': f'{probe.worst * 1000:.0f}'
+        })
+
+    for course_id in course_ids:
+        assert gone(course_id), f'course {course_id} still has rows'
+    with app.app_context():
+        stats = purger.get_stats()
+    assert not stats['errors'], stats['last_error']
+
+    rows_per_course = args.enrollments * (1 + args.completions)
+    report(f'Deleting a course with {args.enrollments} enrollments and {rows_per_course} dependent rows', rows,
+           ['mode', 'status', 'response s', 'gone after s', 'peak MB', 'worst other write ms'])
+
+if __name__ == '__main__':
+    main()
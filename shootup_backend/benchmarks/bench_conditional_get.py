@@ -0,0 +1,78 @@
+"""Full responses vs 304 revalidations for course, lesson and quiz reads.
+
+Usage:
+    python benchmarks/bench_conditional_get.py [--lessons 200] [--questions 100] [--requests 300]
+
+A signed-in learner polls each endpoint, once without validators and once
+sending back the ETag from the previous response.
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+def measure(client, url, count, headers=None):
+    started = time.perf_counter()
+    for _ in range(count):
+        response = client.get(url, headers=headers or {})
+    return (time.perf_counter() - started) / count * 1000, response
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lessons', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    app, db = load_app(temp_database_path())
+    from src.models.user import Lesson, Quiz, Question, Option
+
+    with app.app_context():
+        ids = seed_catalog(db, courses=1, lessons_per_course=args.lessons, learners=20)
+        lesson = Lesson.query.filter_by(course_id=ids['course_ids'][0]).first()
+        quiz = Quiz(lesson_id=lesson.lesson_id, title='Benchmark quiz', passing_score=70)
+        db.session.add(quiz)
+        db.session.flush()
+        for i in range(args.questions):
+            question = Question(quiz_id=quiz.quiz_id, question_text=f'Question {i}', question_type='multiple_choice')
+            db.session.add(question)
+            db.session.flush()
+            db.session.add_all([
+                Option(question_id=question.question_id, option_text=f'Option {j}', is_correct=j == 0) for j in range(4)
+            ])
+        db.session.commit()
+        quiz_id = quiz.quiz_id
+        engine = db.engine
+
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+
+    client = login_client(app, ids['learner_ids'][0], 'learner')
+    course_id = ids['course_ids'][0]
+    rows = []
+    for label, url in [
+        ('GET /api/courses/<id>', f'/api/courses/{course_id}'),
+        ('GET /api/courses/<id>/lessons', f'/api/courses/{course_id}/lessons'),
+        ('GET /api/quizzes/<id>', f'/api/quizzes/{quiz_id}')
+    ]:
+        full_ms, response = measure(client, url, args.requests)
+        etag = response.headers['ETag']
+        statements.clear()
+        revalidate_ms, not_modified = measure(client, url, args.requests, {'If-None-Match': etag})
+        assert not_modified.status_code == 304, not_modified.status_code
+        rows.append({
+            'endpoint': label,
+            'body bytes': len(response.data),
+            '200 ms': f'{full_ms:.2f}',
+            '304 ms': f'{revalidate_ms:.2f}',
+            '304 queries': len(statements) // args.requests,
+            'speedup': f'{full_ms / revalidate_ms:.1f}x'
+        })
+
+    report(f'Mean latency per request over {args.requests} requests',
+           rows, ['endpoint', 'body bytes', '200 ms', '304 ms', '304 queries', 'speedup'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Compare SQLite engine profiles under concurrent enrollment reads and progress writes.
+
+Usage:
+    python benchmarks/bench_database_profile.py [--threads 8] [--seconds 5]
+
+Each profile runs in a fresh subprocess (the app reads its database settings
+at import time) against its own temporary database. Reader threads hit
+GET /api/enrollments/ while writer threads hit
+POST /api/enrollments/<id>/progress.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+PROFILES = ['default', 'production']
+
+def run_worker(profile, threads, seconds):
+    app, db = load_app(temp_database_path(), profile=profile)
+    from src.models.user import Enrollment, Lesson
+
+    with app.app_context():
+        seed_catalog(db, courses=10, lessons_per_course=20, learners=max(threads * 4, 40))
+        rows = Enrollment.query.all()
+        enrollments = [(e.enrollment_id, e.user_id) for e in rows]
+        course_lessons = {}
+        for course_id, lesson_id in db.session.query(Lesson.course_id, Lesson.lesson_id):
+            course_lessons.setdefault(course_id, []).append(lesson_id)
+        lessons = {e.enrollment_id: course_lessons[e.course_id] for e in rows}
+
+    counters = {'reads': 0, 'writes': 0, 'errors': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def reader(index):
+        enrollment_id, user_id = enrollments[index % len(enrollments)]
+        client = login_client(app, user_id, 'learner')
+        while time.perf_counter() < deadline:
+            response = client.get('/api/enrollments/')
+            record('reads', response)
+
+    def writer(index):
+        enrollment_id, user_id = enrollments[(index * 7) % len(enrollments)]
+        client = login_client(app, user_id, 'learner')
+        lesson_ids = lessons[enrollment_id]
+        step = 0
+        while time.perf_counter() < deadline:
+            response = client.post(f'/api/enrollments/{enrollment_id}/progress', json={
+                'lesson_id': lesson_ids[step % len(lesson_ids)],
+                'is_completed': step % 2 == 0
+            })
+            step += 1
+            record('writes', response)
+
+    def record(kind, response):
+        with lock:
+            if response.status_code < 400:
+                counters[kind] += 1
+            else:
+                counters['errors'] += 1
+                if b'locked' in response.data:
+                    counters['locked'] += 1
+
+    workers = [threading.Thread(target=reader, args=(i,)) for i in range(threads)]
+    workers += [threading.Thread(target=writer, args=(i,)) for i in range(max(threads // 2, 1))]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'profile': profile,
+        'reads/s': round(counters['reads'] / elapsed, 1),
+        'writes/s': round(counters['writes'] / elapsed, 1),
+        'errors': counters['errors'],
+        'locked': counters['locked']
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8, help='reader threads (writers = threads / 2)')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--worker', choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.threads, args.seconds)
+        return
+
+    rows = []
+    for profile in PROFILES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', profile,
+             '--threads', str(args.threads), '--seconds', str(args.seconds)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        rows.append(json.loads(output.strip().splitlines()[-1]))
+
+    report(f'{args.threads} readers / {max(args.threads // 2, 1)} writers for {args.seconds}s',
+           rows, ['profile', 'reads/s', 'writes/s', 'errors', 'locked'])
+
+if __name__ == '__main__':
+    main()
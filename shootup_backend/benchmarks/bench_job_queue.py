@@ -0,0 +1,90 @@
+"""Background jobs: a notification fan-out inline vs queued, and queue throughput.
+
+Usage:
+    python benchmarks/bench_job_queue.py [--users 50000] [--jobs 2000] [--workers 2]
+
+"inline" writes one notification per learner inside the request, the way a
+broadcast endpoint would without a queue. "queued" is POST
+/api/admin/notifications/broadcast, which returns 202 while the
+notify_users job writes the rows; it is timed to the response and to the
+last row. Then --jobs no-op jobs are enqueued at once and drained by
+--workers threads, reporting jobs/s and the wait from due to start that
+GET /api/admin/jobs shows.
+"""
+import argparse
+import time
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    app, db = load_app(
+        temp_database_path(), SHOOTUP_DASHBOARD_STATS_BACKGROUND=0, SHOOTUP_AUDIT_DURABLE=0,
+        SHOOTUP_JOBS_WORKERS=args.workers, SHOOTUP_JOBS_POLL_INTERVAL=1
+    )
+    from src.models.user import Notification, Job
+    from src.services.jobs import job_queue
+    from src.services.tasks import notify_users
+
+    @job_queue.task('noop')
+    def noop():
+        pass
+
+    with app.app_context():
+        seed_catalog(db, courses=1, lessons_per_course=1, learners=args.users, enroll=False)
+    admin = login_client(app, 1, 'admin')
+
+    def notifications(message):
+        with app.app_context():
+            return Notification.query.filter_by(message=message).count()
+
+    def wait_for(condition):
+        while not condition():
+            time.sleep(0.05)
+
+    rows = []
+    with app.app_context():
+        started = time.perf_counter()
+        notify_users('inline broadcast', role='learner')
+        inline = time.perf_counter() - started
+    rows.append({'mode': 'inline', 'response s': f'{inline:.2f}', 'all rows written s': f'{inline:.2f}'})
+
+    started = time.perf_counter()
+    response = admin.post('/api/admin/notifications/broadcast', json={'message': 'queued broadcast', 'role': 'learner'})
+    responded = time.perf_counter() - started
+    assert response.status_code == 202, response.get_json()
+    wait_for(lambda: notifications('queued broadcast') == args.users)
+    rows.append({'mode': 'queued', 'response s': f'{responded:.3f}', 'all rows written s': f'{time.perf_counter() - started:.2f}'})
+    assert notifications('inline broadcast') == args.users
+    report(f'Notifying {args.users} learners', rows, ['mode', 'response s', 'all rows written s'])
+
+    started = time.perf_counter()
+    with app.app_context():
+        for _ in range(args.jobs):
+            job_queue.enqueue('noop')
+    enqueued = time.perf_counter() - started
+
+    def drained():
+        with app.app_context():
+            return not Job.query.filter(Job.name == 'noop', Job.status.in_(('queued', 'running'))).count()
+    wait_for(drained)
+    drained_at = time.perf_counter() - started
+
+    overview = admin.get('/api/admin/jobs?per_page=1').get_json()
+    noop_latency = overview['latency']['by_name']['noop']
+    assert overview['queue']['failed'] == 0, overview['queue']
+    report(f'{args.jobs} no-op jobs on {args.workers} workers', [{
+        'enqueue/s': f'{args.jobs / enqueued:,.0f}',
+        'jobs/s': f'{args.jobs / drained_at:,.0f}',
+        'wait p50 ms': noop_latency['wait_ms']['p50'],
+        'wait p95 ms': noop_latency['wait_ms']['p95'],
+        'run p50 ms': noop_latency['run_ms']['p50']
+    }], ['enqueue/s', 'jobs/s', 'wait p50 ms', 'wait p95 ms', 'run p50 ms'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Login throughput with password hashing inline vs on process pools of different sizes.
+
+Usage:
+    python benchmarks/bench_password_hashing.py [--threads 8] [--logins 25] [--workers 0,1,2,4]
+
+Each client thread posts to /api/auth/login as a different learner.
+"workers=0" checks the password on the request thread
+(SHOOTUP_PASSWORD_HASH_WORKERS=0); other rows send it to a pool of that
+many processes, which is started and warmed before the run is timed.
+Throughput is bounded by the cores available to the pool, so expect rows to
+level off past os.cpu_count().
+
+Afterwards a few learners are given pbkdf2 hashes, as if the policy had
+been changed since they last logged in, and the run fails unless one login
+upgrades each of them to the configured method and the next login still
+succeeds.
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from common import load_app, report, seed_catalog, temp_database_path
+
+def run_logins(app, usernames, threads, logins):
+    """Log in from `threads` clients; returns per-request latencies in ms"""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(offset):
+        client = app.test_client()
+        local = []
+        for i in range(logins):
+            username = usernames[(offset * logins + i) % len(usernames)]
+            started = time.perf_counter()
+            response = client.post('/api/auth/login', json={'username': username, 'password': 'benchmark'})
+            local.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.get_json()
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies
+
+def check_rehash(app, db, usernames):
+    from werkzeug.security import generate_password_hash
+    from src.models.user import User
+    from src.services.passwords import hash_parameters, password_hasher
+
+    legacy = generate_password_hash('benchmark', 'pbkdf2:sha256:1000')
+    with app.app_context():
+        User.query.filter(User.username.in_(usernames)).update({'password_hash': legacy}, synchronize_session=False)
+        db.session.commit()
+    client = app.test_client()
+    for _ in range(2):
+        for username in usernames:
+            response = client.post('/api/auth/login', json={'username': username, 'password': 'benchmark'})
+            assert response.status_code == 200, response.get_json()
+    with app.app_context():
+        methods = {hash_parameters(user.password_hash) for user in User.query.filter(User.username.in_(usernames))}
+    assert methods == {password_hasher.method}, f'hashes after login use {methods}'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=25)
+    parser.add_argument('--workers', default='0,1,2,4')
+    args = parser.parse_args()
+
+    app, db = load_app(temp_database_path(), SHOOTUP_DASHBOARD_STATS_BACKGROUND=0, SHOOTUP_AUDIT_DURABLE=0)
+    from src.models.user import User
+    from src.services.passwords import password_hasher
+
+    with app.app_context():
+        learner_ids = seed_catalog(db, courses=1, lessons_per_course=1, learners=200)['learner_ids']
+        usernames = [row[0] for row in db.session.query(User.username).filter(User.user_id.in_(learner_ids))]
+
+    total = args.threads * args.logins
+    rows = []
+    for workers in [int(value) for value in args.workers.split(',')]:
+        password_hasher.shutdown()
+        password_hasher.workers = workers
+        password_hasher.hash('warm up the pool')
+        for _ in range(workers):
+            password_hasher.hash('warm up the pool')
+
+        started = time.perf_counter()
+        latencies = run_logins(app, usernames, args.threads, args.logins)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        rows.append({
+            'workers': workers or 'inline',
+            'logins/s': f'{total / elapsed:,.1f}',
+            'p50 ms': f'{statistics.median(latencies):.1f}',
+            'p99 ms': f'{latencies[int(len(latencies) * 0.99) - 1]:.1f}'
+        })
+
+    check_rehash(app, db, usernames[:10])
+    password_hasher.shutdown()
+
+    report(f'{total} logins from {args.threads} threads ({password_hasher.method}, {os.cpu_count()} CPUs)', rows,
+           ['workers', 'logins/s', 'p50 ms', 'p99 ms'])
+    print(f'\nLegacy pbkdf2 hashes upgraded to {password_hasher.method} on login: yes')
+
+if __name__ == '__main__':
+    main()
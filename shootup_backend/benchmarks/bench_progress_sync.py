@@ -0,0 +1,95 @@
+"""Learner sessions syncing lesson progress: one request per lesson vs the batch endpoint.
+
+Usage:
+    python benchmarks/bench_progress_sync.py [--learners 100] [--lessons 40]
+
+Every learner works through their whole course, re-opening and un-checking
+a few lessons along the way. Half the learners post each change to
+/api/enrollments/<id>/progress as it happens; the other half send their
+session's changes once to /api/enrollments/progress/batch. Both halves must
+end with the same progress and every enrollment completed.
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import event
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+def session_changes(lesson_ids, rng):
+    """A session's lesson changes in order: every lesson completed, a few toggled back and forth"""
+    changes = []
+    for lesson_id in lesson_ids:
+        changes.append((lesson_id, True))
+        if rng.random() < 0.1:
+            changes += [(lesson_id, False), (lesson_id, True)]
+    return changes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--learners', type=int, default=100)
+    parser.add_argument('--lessons', type=int, default=40)
+    args = parser.parse_args()
+
+    app, db = load_app(temp_database_path())
+    from src.models.user import Enrollment, Lesson
+
+    with app.app_context():
+        seed_catalog(db, courses=5, lessons_per_course=args.lessons, learners=args.learners)
+        lessons = {}
+        for course_id, lesson_id in db.session.query(Lesson.course_id, Lesson.lesson_id).order_by(Lesson.lesson_order):
+            lessons.setdefault(course_id, []).append(lesson_id)
+        enrollments = [(e.enrollment_id, e.user_id, e.course_id) for e in Enrollment.query.order_by(Enrollment.enrollment_id)]
+        engine = db.engine
+
+    rng = random.Random(5)
+    sessions = [(enrollment_id, user_id, session_changes(lessons[course_id], rng))
+                for enrollment_id, user_id, course_id in enrollments]
+    half = len(sessions) // 2
+
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+
+    statements.clear()
+    started = time.perf_counter()
+    individual_requests = 0
+    for enrollment_id, user_id, changes in sessions[:half]:
+        client = login_client(app, user_id, 'learner')
+        for lesson_id, is_completed in changes:
+            response = client.post(f'/api/enrollments/{enrollment_id}/progress',
+                                   json={'lesson_id': lesson_id, 'is_completed': is_completed})
+            assert response.status_code == 200, response.get_json()
+            individual_requests += 1
+    individual_s = time.perf_counter() - started
+    individual_statements = len(statements)
+
+    statements.clear()
+    started = time.perf_counter()
+    for enrollment_id, user_id, changes in sessions[half:]:
+        client = login_client(app, user_id, 'learner')
+        response = client.post('/api/enrollments/progress/batch', json={'changes': [
+            {'enrollment_id': enrollment_id, 'lesson_id': lesson_id, 'is_completed': is_completed}
+            for lesson_id, is_completed in changes
+        ]})
+        assert response.status_code == 200 and not response.get_json()['errors'], response.get_json()
+    batch_s = time.perf_counter() - started
+    batch_statements = len(statements)
+
+    with app.app_context():
+        states = {(e.status, e.completed_lessons) for e in Enrollment.query}
+    assert states == {('completed', args.lessons)}, f'unexpected final progress: {states}'
+
+    changes_sent = [sum(len(changes) for _, _, changes in group) for group in (sessions[:half], sessions[half:])]
+    rows = [
+        {'mode': 'per lesson', 'sessions': half, 'changes': changes_sent[0], 'requests': individual_requests,
+         'seconds': f'{individual_s:.2f}', 'SQL statements': individual_statements},
+        {'mode': 'batch', 'sessions': len(sessions) - half, 'changes': changes_sent[1], 'requests': len(sessions) - half,
+         'seconds': f'{batch_s:.2f}', 'SQL statements': batch_statements}
+    ]
+    report(f'{len(sessions)} learner sessions over {args.lessons}-lesson courses',
+           rows, ['mode', 'sessions', 'changes', 'requests', 'seconds', 'SQL statements'])
+    print('\nEvery enrollment ended completed with all lessons counted: yes')
+
+if __name__ == '__main__':
+    main()
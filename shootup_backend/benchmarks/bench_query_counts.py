@@ -0,0 +1,81 @@
+"""Count SQL statements per list endpoint at two page sizes.
+
+Usage:
+    python benchmarks/bench_query_counts.py
+
+With the loader profiles applied, the statement count of each endpoint must
+not depend on how many rows the page holds.
+"""
+from datetime import datetime
+
+from sqlalchemy import event
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+def main():
+    # Measure the routes themselves, not the response cache in front of them,
+    # and keep the dashboard, purge and job threads from running during the counts
+    app, db = load_app(
+        temp_database_path(), SHOOTUP_RESPONSE_CACHE=0, SHOOTUP_DASHBOARD_STATS_BACKGROUND=0,
+        SHOOTUP_PURGE_BACKGROUND=0, SHOOTUP_JOBS_BACKGROUND=0
+    )
+    from src.models.user import ForumTopic, ForumPost, Vlog, Review
+    from src.services.dashboard_stats import dashboard_stats
+
+    with app.app_context():
+        ids = seed_catalog(db, courses=60, lessons_per_course=5, learners=60)
+        now = datetime.utcnow()
+        for i, user_id in enumerate(ids['learner_ids']):
+            topic = ForumTopic(title=f'Topic {i}', user_id=user_id, created_at=now, last_post_at=now)
+            db.session.add(topic)
+            db.session.flush()
+            db.session.add(ForumPost(topic_id=topic.topic_id, user_id=user_id, content='First', created_at=now))
+            db.session.add(ForumPost(topic_id=topic.topic_id, user_id=ids['instructor_id'], content='Reply', created_at=now))
+            db.session.add(Vlog(user_id=user_id, title=f'Vlog {i}', video_url='https://example.com/v.mp4', status='approved', views=i))
+            db.session.add(Review(course_id=ids['course_ids'][0], user_id=user_id, rating=5))
+        db.session.commit()
+        engine = db.engine
+    dashboard_stats.refresh()
+
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    admin = login_client(app, 1, 'admin')
+    learner = login_client(app, ids['learner_ids'][0], 'learner')
+    endpoints = [
+        (admin, '/api/courses/?per_page={n}'),
+        (admin, '/api/forum/topics?per_page={n}'),
+        (admin, '/api/forum/topics/1?per_page={n}'),
+        (admin, '/api/vlogs/?per_page={n}'),
+        (admin, '/api/vlogs/popular?limit={n}'),
+        (admin, '/api/vlogs/recent?limit={n}'),
+        (admin, '/api/users/?per_page={n}'),
+        (admin, '/api/admin/courses/pending?per_page={n}'),
+        (admin, '/api/admin/dashboard'),
+        (admin, '/api/courses/{course}/reviews'),
+        (admin, '/api/courses/{course}'),
+        (learner, '/api/forum/my-posts'),
+        (learner, '/api/courses/my-courses'),
+        (learner, '/api/enrollments/'),
+        (admin, '/api/enrollments/course/{course}')
+    ]
+
+    rows = []
+    for client, template in endpoints:
+        counts = []
+        for n in (5, 50):
+            statements.clear()
+            response = client.get(template.format(n=n, course=ids['course_ids'][0]))
+            assert response.status_code == 200, (template, response.status_code, response.data[:200])
+            counts.append(len(statements))
+        rows.append({
+            'endpoint': template.replace('{n}', 'N').replace('{course}', '<id>'),
+            'N=5': counts[0],
+            'N=50': counts[1],
+            'constant': 'yes' if counts[0] == counts[1] else 'NO'
+        })
+
+    report('SQL statements per request', rows, ['endpoint', 'N=5', 'N=50', 'constant'])
+
+if __name__ == '__main__':
+    main()
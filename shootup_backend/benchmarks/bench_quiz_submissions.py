@@ -0,0 +1,126 @@
+"""1,000 quiz attempts: one request each vs the batch submission endpoint.
+
+Usage:
+    python benchmarks/bench_quiz_submissions.py [--attempts 1000] [--quizzes 5] [--questions 20] [--batch-size 250]
+
+"individual" posts every attempt to /api/quizzes/<id>/attempt as its learner;
+"batch" has the course instructor upload the same attempts to
+/api/quizzes/attempts/batch. Both paths must store identical scores.
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import event, func
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+def build_quizzes(db, course_id, quizzes, questions):
+    from src.models.user import Lesson, Quiz, Question, Option
+    rng = random.Random(11)
+    lessons = Lesson.query.filter_by(course_id=course_id).order_by(Lesson.lesson_order).all()
+    catalog = {}
+    for i in range(quizzes):
+        quiz = Quiz(lesson_id=lessons[i % len(lessons)].lesson_id, title=f'Exam {i}', passing_score=60)
+        db.session.add(quiz)
+        db.session.flush()
+        items = []
+        for j in range(questions):
+            question_type = 'short_answer' if j % 5 == 4 else 'multiple_choice'
+            question = Question(quiz_id=quiz.quiz_id, question_text=f'Q{j}', question_type=question_type,
+                                correct_answer='photosynthesis' if question_type == 'short_answer' else None)
+            db.session.add(question)
+            db.session.flush()
+            option_ids = []
+            if question_type == 'multiple_choice':
+                for k in range(4):
+                    option = Option(question_id=question.question_id, option_text=f'Option {k}', is_correct=k == 0)
+                    db.session.add(option)
+                    db.session.flush()
+                    option_ids.append(option.option_id)
+            items.append((question.question_id, question_type, option_ids))
+        catalog[quiz.quiz_id] = items
+    db.session.commit()
+
+    def answers_for(quiz_id):
+        answers = []
+        for question_id, question_type, option_ids in catalog[quiz_id]:
+            if question_type == 'short_answer':
+                answers.append({'question_id': question_id, 'answer_text': rng.choice(['Photosynthesis', 'osmosis'])})
+            else:
+                answers.append({'question_id': question_id, 'selected_option_id': rng.choice(option_ids[:2])})
+        return answers
+    return list(catalog), answers_for
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--attempts', type=int, default=1000)
+    parser.add_argument('--quizzes', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=250)
+    args = parser.parse_args()
+
+    app, db = load_app(temp_database_path())
+    from src.models.user import QuizAttempt, Answer
+
+    with app.app_context():
+        ids = seed_catalog(db, courses=1, lessons_per_course=args.quizzes, learners=200)
+        quiz_ids, answers_for = build_quizzes(db, ids['course_ids'][0], args.quizzes, args.questions)
+        engine = db.engine
+
+    rng = random.Random(3)
+    workload = [{
+        'quiz_id': rng.choice(quiz_ids),
+        'user_id': rng.choice(ids['learner_ids']),
+    } for _ in range(args.attempts)]
+    for i, item in enumerate(workload):
+        item['answers'] = answers_for(item['quiz_id'])
+        item['client_ref'] = f'attempt-{i}'
+
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+
+    # Individual submissions, one learner session each
+    clients = {}
+    statements.clear()
+    started = time.perf_counter()
+    individual_scores = []
+    for item in workload:
+        client = clients.get(item['user_id'])
+        if client is None:
+            client = clients[item['user_id']] = login_client(app, item['user_id'], 'learner')
+        response = client.post(f"/api/quizzes/{item['quiz_id']}/attempt", json={'answers': item['answers']})
+        assert response.status_code == 201, response.get_json()
+        individual_scores.append(response.get_json()['score'])
+    individual_s = time.perf_counter() - started
+    individual_statements = len(statements)
+
+    # The same attempts uploaded by the proctoring instructor
+    proctor = login_client(app, ids['instructor_id'], 'instructor')
+    statements.clear()
+    started = time.perf_counter()
+    batch_scores = []
+    for offset in range(0, len(workload), args.batch_size):
+        response = proctor.post('/api/quizzes/attempts/batch', json={'attempts': workload[offset:offset + args.batch_size]})
+        assert response.status_code == 201, response.get_json()
+        batch_scores += [result['score'] for result in response.get_json()['results']]
+    batch_s = time.perf_counter() - started
+    batch_statements = len(statements)
+
+    assert batch_scores == individual_scores, 'batch grading disagrees with individual grading'
+    with app.app_context():
+        attempts = db.session.query(func.count(QuizAttempt.attempt_id)).scalar()
+        answers = db.session.query(func.count(Answer.answer_id)).scalar()
+
+    rows = [
+        {'mode': 'individual', 'requests': len(workload), 'seconds': f'{individual_s:.2f}',
+         'attempts/s': f'{len(workload) / individual_s:.0f}', 'SQL statements': individual_statements},
+        {'mode': f'batch of {args.batch_size}', 'requests': -(-len(workload) // args.batch_size), 'seconds': f'{batch_s:.2f}',
+         'attempts/s': f'{len(workload) / batch_s:.0f}', 'SQL statements': batch_statements}
+    ]
+    report(f'{args.attempts} attempts over {args.quizzes} quizzes of {args.questions} questions',
+           rows, ['mode', 'requests', 'seconds', 'attempts/s', 'SQL statements'])
+    print(f'\nStored {attempts} attempts and {answers} answers; scores identical: yes')
+
+if __name__ == '__main__':
+    main()
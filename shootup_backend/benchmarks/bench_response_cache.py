@@ -0,0 +1,81 @@
+"""Throughput of the public GET endpoints with and without the response cache.
+
+Usage:
+    python benchmarks/bench_response_cache.py [--courses 200] [--requests 500]
+
+Each endpoint is requested anonymously in three modes: cache disabled, hits
+served from the shared SQLite store (local LRU off, as for a worker that has
+not seen the key yet) and hits served from the process-local LRU.
+"""
+import argparse
+import time
+
+from common import load_app, report, seed_catalog, temp_database_path
+
+ENDPOINTS = [
+    '/api/courses/?per_page=20',
+    '/api/courses/{course}',
+    '/api/categories/',
+    '/api/vlogs/popular',
+    '/api/vlogs/recent'
+]
+
+def throughput(client, url, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+    return count / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--courses', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    app, db = load_app(temp_database_path())
+    from src.models.user import Vlog
+    from src.services.cache import response_cache
+
+    with app.app_context():
+        ids = seed_catalog(db, courses=args.courses, lessons_per_course=10, learners=200)
+        db.session.add_all([
+            Vlog(user_id=user_id, title=f'Vlog {i}', video_url='https://example.com/v.mp4', status='approved', views=i)
+            for i, user_id in enumerate(ids['learner_ids'][:50])
+        ])
+        db.session.commit()
+
+    client = app.test_client()
+    local_size = response_cache.local_size
+    rows = []
+    for template in ENDPOINTS:
+        url = template.format(course=ids['course_ids'][0])
+
+        response_cache.enabled = False
+        uncached = throughput(client, url, args.requests)
+
+        response_cache.enabled = True
+        response_cache.clear()
+        response_cache.local_size = 0
+        client.get(url)
+        shared = throughput(client, url, args.requests)
+
+        response_cache.local_size = local_size
+        client.get(url)
+        local = throughput(client, url, args.requests)
+
+        rows.append({
+            'endpoint': template,
+            'uncached req/s': f'{uncached:.0f}',
+            'shared hit req/s': f'{shared:.0f}',
+            'local hit req/s': f'{local:.0f}',
+            'speedup': f'{local / uncached:.1f}x'
+        })
+
+    report(f'Anonymous GET throughput, {args.requests} requests each ({args.courses} courses)',
+           rows, ['endpoint', 'uncached req/s', 'shared hit req/s', 'local hit req/s', 'speedup'])
+    stats = response_cache.get_stats()
+    print(f"\nhits: {stats['local_hits']} local / {stats['shared_hits']} shared, misses: {stats['misses']}")
+
+if __name__ == '__main__':
+    main()
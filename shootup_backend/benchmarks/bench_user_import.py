@@ -0,0 +1,81 @@
+"""Onboarding users: one POST /api/users/ per learner vs the bulk import endpoint.
+
+Usage:
+    python benchmarks/bench_user_import.py [--users 50000] [--per-row-users 200] [--workers 4] [--hash-method scrypt]
+
+"per-row" creates --per-row-users learners through POST /api/users/, the
+way a school is onboarded today, and its time for --users is extrapolated
+from that sample. "bulk" posts one CSV of --users learners, each enrolled in
+a course, to POST /api/admin/import/users. Both hash with --hash-method on a
+pool of --workers processes; password hashing is most of the bulk import's
+time, so pass a cheap method (pbkdf2:sha256:1000) to see the cost of the
+rest of the pipeline. The run fails unless every bulk row is created and
+the course's enrollment counter matches its enrollments.
+"""
+import argparse
+import io
+import time
+
+from common import load_app, login_client, report, seed_catalog, temp_database_path
+
+def learner_csv(prefix, count):
+    lines = ['username,email,password,first_name,last_name']
+    lines.extend(f'{prefix}{i},{prefix}{i}@import.local,secret-{i},Imported,Learner {i}' for i in range(count))
+    return ('\n'.join(lines) + '\n').encode()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--per-row-users', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--hash-method', default='scrypt')
+    args = parser.parse_args()
+
+    app, db = load_app(
+        temp_database_path(), SHOOTUP_DASHBOARD_STATS_BACKGROUND=0, SHOOTUP_AUDIT_DURABLE=0,
+        SHOOTUP_PASSWORD_HASH_WORKERS=args.workers, SHOOTUP_PASSWORD_HASH_METHOD=args.hash_method
+    )
+    from src.models.user import Course, Enrollment
+    from src.services.passwords import password_hasher
+
+    with app.app_context():
+        course_id = seed_catalog(db, courses=1, lessons_per_course=1, learners=1, enroll=False)['course_ids'][0]
+    admin = login_client(app, 1, 'admin')
+    password_hasher.hash('warm up the pool')
+
+    started = time.perf_counter()
+    for i in range(args.per_row_users):
+        response = admin.post('/api/users/', json={
+            'username': f'row{i}', 'email': f'row{i}@import.local', 'password': f'secret-{i}',
+            'first_name': 'Imported', 'last_name': f'Learner {i}', 'role': 'learner'
+        })
+        assert response.status_code == 201, response.get_json()
+    per_row = (time.perf_counter() - started) / args.per_row_users
+
+    body = learner_csv('bulk', args.users)
+    started = time.perf_counter()
+    response = admin.post(f'/api/admin/import/users?course_ids={course_id}', data={'file': (io.BytesIO(body), 'learners.csv')},
+                          content_type='multipart/form-data')
+    bulk = time.perf_counter() - started
+    result = response.get_json()
+    assert response.status_code == 200, result
+    assert result['created'] == args.users and not result['failed'], result
+
+    with app.app_context():
+        counter = db.session.get(Course, course_id).enrollment_count
+        enrolled = Enrollment.query.filter_by(course_id=course_id).count()
+    assert counter == enrolled == args.users, f'enrollment_count {counter}, enrollments {enrolled}'
+    password_hasher.shutdown()
+
+    rows = [
+        {'mode': 'per-row POST', 'users timed': args.per_row_users, 'users/s': f'{1 / per_row:,.0f}',
+         f'time for {args.users}': f'{per_row * args.users / 60:,.1f} min (extrapolated)'},
+        {'mode': 'bulk import', 'users timed': args.users, 'users/s': f'{args.users / bulk:,.0f}',
+         f'time for {args.users}': f'{bulk / 60:,.1f} min'}
+    ]
+    report(f'Importing {args.users} learners ({password_hasher.method}, {args.workers} hash workers)', rows,
+           ['mode', 'users timed', 'users/s', f'time for {args.users}'])
+    print('\nEvery bulk row created and enrolled, counters consistent: yes')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Concurrent vlog views: per-request commits vs the write-behind buffer.
+
+Usage:
+    python benchmarks/bench_view_counter.py [--threads 8] [--views 250]
+
+Each thread repeatedly GETs the same popular vlog. "direct" writes every
+view in its own transaction (the old behaviour, made atomic); "buffered"
+batches them through the view counter. Both must end with an exact count.
+"""
+import argparse
+import threading
+import time
+
+from common import load_app, report, seed_catalog, temp_database_path
+
+def run(app, vlog_id, threads, views):
+    errors = []
+
+    def worker():
+        client = app.test_client()
+        for _ in range(views):
+            response = client.get(f'/api/vlogs/{vlog_id}')
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--views', type=int, default=250)
+    args = parser.parse_args()
+
+    app, db = load_app(temp_database_path())
+    from src.models.user import Vlog
+    from src.services.cache import response_cache
+    from src.services.view_counter import view_counter
+
+    with app.app_context():
+        ids = seed_catalog(db, courses=1, lessons_per_course=1, learners=20)
+        vlogs = [
+            Vlog(user_id=user_id, title=f'Vlog {i}', video_url='https://example.com/v.mp4', status='approved', views=1000 - i)
+            for i, user_id in enumerate(ids['learner_ids'])
+        ]
+        db.session.add_all(vlogs)
+        db.session.commit()
+        targets = {'direct': vlogs[-1].vlog_id, 'buffered': vlogs[-2].vlog_id}
+
+    client = app.test_client()
+    total = args.threads * args.views
+    rows = []
+    for mode, vlog_id in targets.items():
+        view_counter.buffered = mode == 'buffered'
+        with app.app_context():
+            before = db.session.get(Vlog, vlog_id).views
+
+        elapsed, errors = run(app, vlog_id, args.threads, args.views)
+        response_cache.clear()  # look past the short-lived cached ranking
+        popular = client.get('/api/vlogs/popular?limit=1').get_json()['vlogs'][0]
+        view_counter.flush()
+
+        with app.app_context():
+            db.session.expire_all()
+            after = db.session.get(Vlog, vlog_id).views
+        rows.append({
+            'mode': mode,
+            'views/s': f'{total / elapsed:.0f}',
+            'counted': after - before,
+            'expected': total,
+            'errors': len(errors),
+            'top of /popular before flush': f"vlog {popular['vlog_id']} ({popular['views']} views)"
+        })
+
+    report(f'{args.threads} threads x {args.views} views of one vlog',
+           rows, ['mode', 'views/s', 'counted', 'expected', 'errors', 'top of /popular before flush'])
+    print(f"\nbuffer: {view_counter.get_stats()}")
+
+if __name__ == '__main__':
+    main()
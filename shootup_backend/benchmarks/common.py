@@ -0,0 +1,134 @@
+"""Shared helpers for the backend benchmark scripts.
+
+Every benchmark runs against a throwaway SQLite file so the tracked
+src/database/app.db is never touched. The Flask app is configured at import
+time, so the environment has to be set before load_app() imports src.main.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+def temp_database_path(prefix='shootup-bench-'):
+    directory = tempfile.mkdtemp(prefix=prefix)
+    return os.path.join(directory, 'bench.db')
+
+def load_app(db_path, profile=None, **env):
+    """Import the Flask app bound to db_path and return (app, db)"""
+    os.environ['SHOOTUP_DATABASE_URL'] = f'sqlite:///{db_path}'
+    if profile:
+        os.environ['SHOOTUP_DB_PROFILE'] = profile
+    for key, value in env.items():
+        os.environ[key] = str(value)
+
+    from src.main import app
+    from src.models.user import db
+    return app, db
+
+def login_client(app, user_id, role):
+    """Return a test client whose session is already authenticated"""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['role'] = role
+    return client
+
+def seed_catalog(db, courses=10, lessons_per_course=20, learners=100, enroll=True):
+    """Insert an instructor, learners, courses with lessons and enrollments"""
+    from werkzeug.security import generate_password_hash
+    from src.models.user import Role, Category, Course, Lesson, Enrollment, User
+
+    password_hash = generate_password_hash('benchmark')
+    roles = {role.role_name: role.role_id for role in Role.query.all()}
+    now = datetime.utcnow()
+
+    category = Category(category_name=f'Benchmark {time.time_ns()}', description='Synthetic data')
+    db.session.add(category)
+    instructor = User(
+        username=f'instructor-{time.time_ns()}',
+        email=f'instructor-{time.time_ns()}@bench.local',
+        password_hash=password_hash,
+        role_id=roles['instructor'],
+        registration_date=now
+    )
+    db.session.add(instructor)
+    db.session.flush()
+
+    learner_rows = [{
+        'username': f'learner-{i}-{time.time_ns()}',
+        'email': f'learner-{i}-{time.time_ns()}@bench.local',
+        'password_hash': password_hash,
+        'first_name': 'Bench',
+        'last_name': f'Learner {i}',
+        'role_id': roles['learner'],
+        'registration_date': now - timedelta(days=i % 60),
+        'is_active': True,
+        'email_verified': True
+    } for i in range(learners)]
+    db.session.execute(User.__table__.insert(), learner_rows)
+
+    course_rows = [{
+        'title': f'Benchmark course {i}',
+        'description': f'Synthetic course number {i} for load testing',
+        'category_id': category.category_id,
+        'instructor_id': instructor.user_id,
+        'price': 0,
+        'duration_hours': 10,
+        'created_at': now - timedelta(minutes=i),
+        'updated_at': now - timedelta(minutes=i),
+        'status': 'approved',
+        'is_featured': False
+    } for i in range(courses)]
+    db.session.execute(Course.__table__.insert(), course_rows)
+    db.session.flush()
+
+    course_ids = [row[0] for row in db.session.query(Course.course_id).filter_by(category_id=category.category_id)]
+    lesson_rows = [{
+        'course_id': course_id,
+        'title': f'Lesson {order}',
+        'lesson_order': order,
+        'progress_slot': order - 1,
+        'lesson_type': 'html',
+        'created_at': now,
+        'updated_at': now
+    } for course_id in course_ids for order in range(1, lessons_per_course + 1)]
+    if lesson_rows:
+        db.session.execute(Lesson.__table__.insert(), lesson_rows)
+        db.session.execute(
+            Course.__table__.update().where(Course.course_id.in_(course_ids)).values(lesson_slot_count=lessons_per_course)
+        )
+
+    learner_ids = [row[0] for row in db.session.query(User.user_id).filter(User.email.like('learner-%@bench.local'))]
+    if enroll and course_ids:
+        enrollment_rows = [{
+            'user_id': user_id,
+            'course_id': course_ids[i % len(course_ids)],
+            'enrollment_date': now - timedelta(days=i % 30),
+            'status': 'in_progress'
+        } for i, user_id in enumerate(learner_ids)]
+        db.session.execute(Enrollment.__table__.insert(), enrollment_rows)
+
+    # Bulk inserts bypass the counter events
+    from src.models.counters import rebuild_counters, rebuild_progress_counters
+    rebuild_counters(db.session.connection())
+    rebuild_progress_counters(db.session.connection())
+    db.session.commit()
+    return {
+        'instructor_id': instructor.user_id,
+        'category_id': category.category_id,
+        'course_ids': course_ids,
+        'learner_ids': learner_ids
+    }
+
+def report(title, rows, columns):
+    """Print a fixed-width result table"""
+    print(f'\n{title}')
+    widths = [max(len(str(column)), *(len(str(row.get(column, ''))) for row in rows)) for column in columns]
+    print('  '.join(str(column).ljust(width) for column, width in zip(columns, widths)))
+    print('  '.join('-' * width for width in widths))
+    for row in rows:
+        print('  '.join(str(row.get(column, '')).ljust(width) for column, width in zip(columns, widths)))
@@ -0,0 +1,182 @@
+"""Maintenance commands, run with ``flask --app src.main <command>``"""
+import csv
+import json
+import click
+from src.models.user import db
+from src.models.migrations import run_migrations, get_migration_status, drop_legacy_progress
+from src.models.query_plans import build_report, format_report
+from src.models.counters import rebuild_counters, rebuild_progress_counters, course_counters, touch_rebuilt_courses
+from src.models.progress_slots import assign_lesson_slots
+from src.models.rollups import METRICS, backfill_rollups
+from src.services.search import rebuild_search_index, search_available
+from src.services.cache import response_cache
+from src.services.audit_archive import audit_archive
+from src.services.user_import import UserImport, detect_format, read_rows
+from src.services.purge import purger
+from src.services.jobs import job_queue
+
+def register_commands(app):
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Apply pending schema migrations"""
+        applied = run_migrations(db)
+        if applied:
+            click.echo(f"Applied migrations: {', '.join(str(version) for version in applied)}")
+        else:
+            click.echo('Database schema is up to date')
+
+    @app.cli.command('migration-status')
+    def migration_status_command():
+        """List known migrations and whether they have been applied"""
+        for entry in get_migration_status(db):
+            mark = 'x' if entry['applied'] else ' '
+            click.echo(f"[{mark}] {entry['version']:>3}  {entry['description']}")
+
+    @app.cli.command('drop-legacy-progress')
+    @click.option('--force', is_flag=True, help='Drop even if completed rows are missing from lesson_completions')
+    def drop_legacy_progress_command(force):
+        """Drop the per-lesson progress rows kept after the bitmap migration"""
+        try:
+            with db.engine.begin() as connection:
+                status = drop_legacy_progress(connection, force=force)
+        except ValueError as e:
+            raise click.ClickException(f'{e}; check the backfill or pass --force')
+        if status['present']:
+            click.echo(f"Dropped progress_legacy ({status['rows']} rows)")
+        else:
+            click.echo('No legacy progress table to drop')
+
+    @app.cli.command('rebuild-counters')
+    def rebuild_counters_command():
+        """Recompute denormalized counters from their child tables"""
+        with db.engine.begin() as connection:
+            before = course_counters(connection)
+            touched = rebuild_counters(connection)
+            slotted = assign_lesson_slots(connection)
+            progress_touched = rebuild_progress_counters(connection)
+            changed = touch_rebuilt_courses(connection, before)
+        for table, count in touched.items():
+            click.echo(f'{table}: {count} rows rebuilt')
+        for table, count in progress_touched.items():
+            click.echo(f'{table}: {count} rows rebuilt (lesson progress)')
+        click.echo(f'lessons: {slotted} progress slots assigned')
+        response_cache.invalidate('courses', *(f'course:{course_id}' for course_id in changed))
+        click.echo(f'courses: {len(changed)} with corrected counters (content version bumped)')
+
+    @app.cli.command('backfill-rollups')
+    @click.option('--metric', 'metrics', multiple=True, type=click.Choice(METRICS),
+                  help='Metric to recompute (repeatable; default all)')
+    def backfill_rollups_command(metrics):
+        """Recompute the daily analytics rollups from the source tables"""
+        with db.engine.begin() as connection:
+            written = backfill_rollups(connection, metrics)
+        for metric, days in written.items():
+            click.echo(f'{metric}: {days} days written')
+
+    @app.cli.command('archive-audit-logs')
+    @click.option('--older-than-days', type=int, default=None,
+                  help='Archive whole months that ended more than this many days ago (default AUDIT_ARCHIVE_AFTER_DAYS)')
+    def archive_audit_logs_command(older_than_days):
+        """Move old audit_logs rows into monthly compressed archive segments"""
+        archived = audit_archive.archive(after_days=older_than_days)
+        for month, rows in archived.items():
+            click.echo(f'{month}: {rows} rows archived')
+        if not archived:
+            click.echo('No audit log months old enough to archive')
+        click.echo(f'Archive: {audit_archive.directory}')
+
+    @app.cli.command('import-users')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+                  help='File format (default from the extension, else csv)')
+    @click.option('--role', default='learner', help='Role for rows without a role column')
+    @click.option('--course-id', 'course_ids', type=int, multiple=True, help='Enroll every imported user (repeatable)')
+    @click.option('--chunk-size', type=int, default=None, help='Rows per transaction (default IMPORT_CHUNK_SIZE)')
+    @click.option('--dry-run', is_flag=True, help='Validate and check every row without writing')
+    @click.option('--errors', 'errors_path', type=click.Path(dir_okay=False), default=None,
+                  help='Write the rejected rows to this CSV file')
+    def import_users_command(path, fmt, role, course_ids, chunk_size, dry_run, errors_path):
+        """Create users in bulk from a CSV or NDJSON file"""
+        try:
+            importer = UserImport(
+                default_role=role, course_ids=course_ids,
+                chunk_size=chunk_size or app.config.get('IMPORT_CHUNK_SIZE', 1000),
+                dry_run=dry_run, max_errors=None
+            )
+            fmt = detect_format(fmt, path)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        with open(path, 'rb') as source:
+            report = importer.run(read_rows(source, fmt))
+        if importer.enrolled_course_ids:
+            response_cache.invalidate('courses', *(f'course:{course_id}' for course_id in importer.enrolled_course_ids))
+        prefix = 'Would create' if dry_run else 'Created'
+        click.echo(f"{prefix} {report['created']} users and {report['enrolled']} enrollments from {report['rows']} rows")
+        if report['failed']:
+            click.echo(f"{report['failed']} rows rejected")
+            if errors_path:
+                with open(errors_path, 'w', newline='', encoding='utf-8') as errors_file:
+                    writer = csv.DictWriter(errors_file, fieldnames=['row', 'username', 'error'])
+                    writer.writeheader()
+                    writer.writerows(report['errors'])
+                click.echo(f'Rejected rows written to {errors_path}')
+            else:
+                for error in report['errors'][:20]:
+                    click.echo(f"  row {error['row']}: {error['error']}")
+                if report['failed'] > 20:
+                    click.echo(f"  ... {report['failed'] - 20} more (use --errors to write them all)")
+
+    @app.cli.command('purge-deleted')
+    def purge_deleted_command():
+        """Finish deleting soft-deleted courses and users now instead of in the background"""
+        purged = purger.run_once()
+        click.echo(f"Purged {purged['courses']} courses and {purged['users']} users")
+        if purger.stats['errors']:
+            click.echo(f"{purger.stats['errors']} failed, last: {purger.stats['last_error']}")
+            raise SystemExit(1)
+
+    @app.cli.command('run-jobs')
+    @click.option('--schedules/--no-schedules', default=True, help='Enqueue due periodic jobs first')
+    def run_jobs_command(schedules):
+        """Run every due background job in the foreground, e.g. from cron with JOBS_BACKGROUND off"""
+        if schedules:
+            job_queue.tick()
+        ran = job_queue.run_pending()
+        click.echo(f"Ran {ran} jobs: {job_queue.stats['succeeded']} succeeded, "
+                   f"{job_queue.stats['retried']} will be retried, {job_queue.stats['failed']} failed")
+
+    @app.cli.command('enqueue-job')
+    @click.argument('name')
+    @click.option('--payload', default='{}', help='Task keyword arguments as a JSON object')
+    @click.option('--delay', type=int, default=0, help='Seconds before the job is due')
+    def enqueue_job_command(name, payload, delay):
+        """Queue a background job by task name"""
+        try:
+            job_id = job_queue.enqueue(name, json.loads(payload), delay=delay)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        click.echo(f'Queued job {job_id} ({name})')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Repopulate the course and vlog FTS5 tables from their source rows"""
+        if not search_available():
+            click.echo('Search index is not installed; run flask migrate on an FTS5-enabled SQLite')
+            raise SystemExit(1)
+        with db.engine.begin() as connection:
+            rebuild_search_index(connection)
+        click.echo('Search index rebuilt')
+
+    @app.cli.command('clear-cache')
+    def clear_cache_command():
+        """Drop every entry from the shared response cache"""
+        response_cache.clear()
+        click.echo(f'Response cache cleared ({response_cache.path})')
+
+    @app.cli.command('explain-queries')
+    def explain_queries_command():
+        """Print EXPLAIN QUERY PLAN for each hot route query; exit 1 on a table scan"""
+        report = build_report()
+        click.echo(format_report(report))
+        if not all(entry['uses_index'] for entry in report):
+            raise SystemExit(1)
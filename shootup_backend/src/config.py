@@ -0,0 +1,217 @@
+import os
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATABASE_URI = f"sqlite:///{os.path.join(BASE_DIR, 'database', 'app.db')}"
+
+# SQLite pragmas applied to every new connection, keyed by engine profile.
+# 'production' trades a little durability (synchronous=NORMAL) for concurrent
+# readers alongside a single writer (WAL) and a longer lock wait.
+SQLITE_PROFILES = {
+    'default': {
+        'foreign_keys': 'ON',
+        'busy_timeout': 5000
+    },
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 268435456,  # 256 MB
+        'cache_size': -65536,  # negative = KiB, i.e. 64 MB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+        'foreign_keys': 'ON'
+    }
+}
+
+SQLITE_PRAGMA_NAMES = (
+    'journal_mode', 'synchronous', 'mmap_size', 'cache_size',
+    'temp_store', 'busy_timeout', 'foreign_keys'
+)
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+def is_sqlite_memory(uri):
+    return uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri)
+
+def get_sqlite_pragmas(profile):
+    """Return the pragma set for a profile, with SHOOTUP_SQLITE_<PRAGMA> env overrides"""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f'Unknown database profile: {profile}')
+
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in SQLITE_PRAGMA_NAMES:
+        override = os.environ.get(f'SHOOTUP_SQLITE_{name.upper()}')
+        if override not in (None, ''):
+            pragmas[name] = override
+    return pragmas
+
+def load_database_config():
+    """Build the SQLAlchemy settings for app.config from the environment"""
+    uri = os.environ.get('SHOOTUP_DATABASE_URL', DEFAULT_DATABASE_URI)
+    profile = os.environ.get('SHOOTUP_DB_PROFILE', 'production')
+
+    engine_options = {
+        'pool_pre_ping': env_bool('SHOOTUP_DB_POOL_PRE_PING', True)
+    }
+
+    if uri.startswith('sqlite'):
+        pragmas = get_sqlite_pragmas(profile)
+        # Let the pragma govern lock waits instead of the driver's own timeout
+        engine_options['connect_args'] = {
+            'timeout': int(pragmas.get('busy_timeout', 5000)) / 1000.0,
+            'check_same_thread': False
+        }
+    else:
+        pragmas = {}
+
+    # In-memory SQLite runs on a single static connection and cannot be pooled
+    if not is_sqlite_memory(uri):
+        engine_options.update({
+            'pool_size': env_int('SHOOTUP_DB_POOL_SIZE', 10),
+            'max_overflow': env_int('SHOOTUP_DB_MAX_OVERFLOW', 20),
+            'pool_timeout': env_int('SHOOTUP_DB_POOL_TIMEOUT', 30),
+            'pool_recycle': env_int('SHOOTUP_DB_POOL_RECYCLE', 3600)
+        })
+
+    return {
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options,
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'DATABASE_PROFILE': profile,
+        'SQLITE_PRAGMAS': pragmas
+    }
+
+def default_cache_path(uri):
+    """Put the shared response cache next to a file-backed SQLite database"""
+    if uri.startswith('sqlite:///') and not is_sqlite_memory(uri):
+        return os.path.join(os.path.dirname(os.path.abspath(uri[len('sqlite:///'):])), 'response_cache.db')
+    return os.path.join(tempfile.gettempdir(), 'shootup_response_cache.db')
+
+def default_audit_spool_dir(uri):
+    """Keep the audit spool next to a file-backed SQLite database"""
+    if uri.startswith('sqlite:///') and not is_sqlite_memory(uri):
+        return os.path.join(os.path.dirname(os.path.abspath(uri[len('sqlite:///'):])), 'audit_spool')
+    return os.path.join(tempfile.gettempdir(), 'shootup_audit_spool')
+
+def default_audit_archive_dir(uri):
+    """Keep the audit archive segments next to a file-backed SQLite database"""
+    if uri.startswith('sqlite:///') and not is_sqlite_memory(uri):
+        return os.path.join(os.path.dirname(os.path.abspath(uri[len('sqlite:///'):])), 'audit_archive')
+    return os.path.join(tempfile.gettempdir(), 'shootup_audit_archive')
+
+def load_cache_config(uri):
+    """Build the response cache settings for app.config from the environment"""
+    return {
+        'RESPONSE_CACHE_ENABLED': env_bool('SHOOTUP_RESPONSE_CACHE', True),
+        'RESPONSE_CACHE_PATH': os.environ.get('SHOOTUP_RESPONSE_CACHE_PATH') or default_cache_path(uri),
+        'RESPONSE_CACHE_TTL': env_int('SHOOTUP_RESPONSE_CACHE_TTL', 60),
+        'RESPONSE_CACHE_LOCAL_SIZE': env_int('SHOOTUP_RESPONSE_CACHE_LOCAL_SIZE', 512),
+        'RESPONSE_CACHE_MAX_ENTRIES': env_int('SHOOTUP_RESPONSE_CACHE_MAX_ENTRIES', 10000)
+    }
+
+def load_view_counter_config():
+    """Build the vlog view counter buffer settings for app.config from the environment"""
+    return {
+        'VIEW_COUNTER_BUFFERED': env_bool('SHOOTUP_VIEW_COUNTER_BUFFERED', True),
+        'VIEW_COUNTER_FLUSH_INTERVAL': env_int('SHOOTUP_VIEW_COUNTER_FLUSH_INTERVAL', 5),
+        'VIEW_COUNTER_FLUSH_THRESHOLD': env_int('SHOOTUP_VIEW_COUNTER_FLUSH_THRESHOLD', 1000)
+    }
+
+def load_dashboard_stats_config():
+    """Build the admin dashboard snapshot settings for app.config from the environment"""
+    return {
+        'DASHBOARD_STATS_BACKGROUND': env_bool('SHOOTUP_DASHBOARD_STATS_BACKGROUND', True),
+        'DASHBOARD_STATS_REFRESH_INTERVAL': env_int('SHOOTUP_DASHBOARD_STATS_REFRESH_INTERVAL', 60),
+        'DASHBOARD_STATS_DEBOUNCE': env_int('SHOOTUP_DASHBOARD_STATS_DEBOUNCE', 2)
+    }
+
+def load_export_config():
+    """Build the streaming export settings for app.config from the environment"""
+    return {
+        'EXPORT_YIELD_PER': env_int('SHOOTUP_EXPORT_YIELD_PER', 1000),
+        'EXPORT_CHUNK_BYTES': env_int('SHOOTUP_EXPORT_CHUNK_BYTES', 65536)
+    }
+
+def load_audit_config(uri):
+    """Build the buffered audit log writer settings for app.config from the environment"""
+    return {
+        'AUDIT_BUFFERED': env_bool('SHOOTUP_AUDIT_BUFFERED', True),
+        'AUDIT_DURABLE': env_bool('SHOOTUP_AUDIT_DURABLE', True),
+        'AUDIT_SPOOL_DIR': os.environ.get('SHOOTUP_AUDIT_SPOOL_DIR') or default_audit_spool_dir(uri),
+        'AUDIT_FLUSH_INTERVAL': env_int('SHOOTUP_AUDIT_FLUSH_INTERVAL', 1),
+        'AUDIT_BATCH_SIZE': env_int('SHOOTUP_AUDIT_BATCH_SIZE', 500),
+        'AUDIT_ARCHIVE_DIR': os.environ.get('SHOOTUP_AUDIT_ARCHIVE_DIR') or default_audit_archive_dir(uri),
+        'AUDIT_ARCHIVE_AFTER_DAYS': env_int('SHOOTUP_AUDIT_ARCHIVE_AFTER_DAYS', 90)
+    }
+
+def load_password_config():
+    """Build the password hashing policy and pool settings for app.config from the environment"""
+    return {
+        # A werkzeug method string, e.g. scrypt:32768:8:1 or pbkdf2:sha256:1000000
+        'PASSWORD_HASH_METHOD': os.environ.get('SHOOTUP_PASSWORD_HASH_METHOD', 'scrypt'),
+        'PASSWORD_HASH_SALT_LENGTH': env_int('SHOOTUP_PASSWORD_HASH_SALT_LENGTH', 16),
+        # 0 hashes inline on the request thread
+        'PASSWORD_HASH_WORKERS': env_int('SHOOTUP_PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)),
+        'PASSWORD_HASH_START_METHOD': os.environ.get('SHOOTUP_PASSWORD_HASH_START_METHOD', 'forkserver'),
+        'PASSWORD_HASH_TIMEOUT': env_int('SHOOTUP_PASSWORD_HASH_TIMEOUT', 30)
+    }
+
+def load_import_config():
+    """Build the bulk user import and bulk user action settings for app.config from the environment"""
+    return {
+        'IMPORT_CHUNK_SIZE': env_int('SHOOTUP_IMPORT_CHUNK_SIZE', 1000),
+        'IMPORT_MAX_REPORTED_ERRORS': env_int('SHOOTUP_IMPORT_MAX_REPORTED_ERRORS', 1000),
+        # Ids per UPDATE/DELETE, well under SQLite's bound variable limit
+        'BULK_ACTION_CHUNK_SIZE': env_int('SHOOTUP_BULK_ACTION_CHUNK_SIZE', 500)
+    }
+
+def load_purge_config():
+    """Build the soft delete and background purge settings for app.config from the environment"""
+    return {
+        # Deletes that would cascade to at least this many rows are soft deletes purged in the background
+        'PURGE_THRESHOLD_ROWS': env_int('SHOOTUP_PURGE_THRESHOLD_ROWS', 10000),
+        'PURGE_BATCH_SIZE': env_int('SHOOTUP_PURGE_BATCH_SIZE', 1000),
+        'PURGE_INTERVAL': env_int('SHOOTUP_PURGE_INTERVAL', 30),
+        'PURGE_BACKGROUND': env_bool('SHOOTUP_PURGE_BACKGROUND', True)
+    }
+
+# name=cron;name=cron, in UTC; an empty cron turns a default schedule off.
+# Only the queue's own housekeeping runs by default; audit archiving and
+# counter rebuilds are opt-in, e.g.
+# SHOOTUP_JOBS_SCHEDULES='archive_audit_logs=30 3 * * *;rebuild_counters=0 4 * * 0'
+DEFAULT_JOB_SCHEDULES = 'prune_jobs=0 5 * * *'
+
+def parse_job_schedules(value):
+    schedules = {}
+    for entry in value.split(';'):
+        if entry.strip():
+            name, _, spec = entry.partition('=')
+            schedules[name.strip()] = spec.strip()
+    return schedules
+
+def load_jobs_config():
+    """Build the background job queue settings for app.config from the environment"""
+    schedules = parse_job_schedules(DEFAULT_JOB_SCHEDULES)
+    schedules.update(parse_job_schedules(os.environ.get('SHOOTUP_JOBS_SCHEDULES', '')))
+    return {
+        # Off: jobs only run through flask run-jobs
+        'JOBS_BACKGROUND': env_bool('SHOOTUP_JOBS_BACKGROUND', True),
+        'JOBS_WORKERS': env_int('SHOOTUP_JOBS_WORKERS', 2),
+        'JOBS_POLL_INTERVAL': env_int('SHOOTUP_JOBS_POLL_INTERVAL', 5),
+        'JOBS_MAX_ATTEMPTS': env_int('SHOOTUP_JOBS_MAX_ATTEMPTS', 5),
+        # Seconds before the first retry, doubling per attempt up to JOBS_MAX_BACKOFF
+        'JOBS_BACKOFF': env_int('SHOOTUP_JOBS_BACKOFF', 30),
+        'JOBS_MAX_BACKOFF': env_int('SHOOTUP_JOBS_MAX_BACKOFF', 3600),
+        # A job running this long is assumed to have died with its process and is retried
+        'JOBS_STALE_AFTER': env_int('SHOOTUP_JOBS_STALE_AFTER', 3600),
+        'JOBS_RETENTION_DAYS': env_int('SHOOTUP_JOBS_RETENTION_DAYS', 7),
+        'JOBS_SCHEDULES': {name: spec for name, spec in schedules.items() if spec}
+    }
@@ -5,7 +5,26 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory, jsonify
 from flask_cors import CORS
+from src.config import load_database_config, load_cache_config, load_view_counter_config, load_dashboard_stats_config, load_export_config, load_audit_config, load_password_config, load_import_config, load_purge_config, load_jobs_config
 from src.models.user import db, Role, Permission, User
+from src.models.engine import configure_engine, get_sqlite_settings
+from src.models.migrations import run_migrations
+from src.models import counters  # registers the counter maintenance events
+from src.models import versions  # registers the content version events
+from src.models import progress_slots  # registers the lesson progress slot event
+from src.models import rollups  # registers the daily analytics rollup events
+from src.models import cascades  # registers the cascade upkeep events
+from src.models import soft_delete  # hides soft-deleted courses and users
+from src.cli import register_commands
+from src.services.cache import response_cache
+from src.services.view_counter import view_counter
+from src.services.dashboard_stats import dashboard_stats
+from src.services.audit import audit_writer
+from src.services.audit_archive import audit_archive
+from src.services.passwords import password_hasher
+from src.services.purge import purger
+from src.services.jobs import job_queue
+from src.services import tasks  # registers the background job tasks
 from src.routes.auth import auth_bp
 from src.routes.courses import courses_bp
 from src.routes.users import users_bp
@@ -35,14 +54,48 @@ app.register_blueprint(vlogs_bp, url_prefix='/api/vlogs')
 app.register_blueprint(admin_bp, url_prefix='/api/admin')
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config.update(load_database_config())
 db.init_app(app)
+configure_engine(app, db)
+
+# Shared response cache for public GET endpoints
+app.config.update(load_cache_config(app.config['SQLALCHEMY_DATABASE_URI']))
+response_cache.init_app(app)
+
+# Write-behind vlog view counts, flushed in batches and at exit
+app.config.update(load_view_counter_config())
+view_counter.init_app(app)
+
+# Admin dashboard aggregates, materialized and refreshed in the background
+app.config.update(load_dashboard_stats_config())
+dashboard_stats.init_app(app)
+
+# Row and chunk sizes for the streaming CSV/NDJSON exports and the bulk user import
+app.config.update(load_export_config())
+app.config.update(load_import_config())
+
+# Audit entries are queued and bulk-inserted off the request path
+app.config.update(load_audit_config(app.config['SQLALCHEMY_DATABASE_URI']))
+audit_writer.init_app(app)
+audit_archive.init_app(app)
+
+# Password hashes are computed on a process pool with a tunable cost policy
+app.config.update(load_password_config())
+password_hasher.init_app(app)
+
+# Large course and user deletes are soft deletes purged in batches in the background
+app.config.update(load_purge_config())
+purger.init_app(app)
+
+# Persistent background jobs, a worker thread pool and cron-like schedules
+app.config.update(load_jobs_config())
+job_queue.init_app(app)
 
 def init_database():
     """Initialize database with default data"""
     with app.app_context():
         db.create_all()
+        run_migrations(db)
         
         # Create default roles if they don't exist
         if not Role.query.first():
@@ -85,11 +138,28 @@ def init_database():
             db.session.commit()
 
 init_database()
+register_commands(app)
 
 @app.route('/api/health')
 def health_check():
     return jsonify({'status': 'healthy', 'message': 'ShootUp LMS API is running'})
 
+@app.route('/api/health/database')
+def database_health_check():
+    try:
+        pool = db.engine.pool
+        return jsonify({
+            'status': 'healthy',
+            'profile': app.config['DATABASE_PROFILE'],
+            'sqlite': get_sqlite_settings(db),
+            'pool': {
+                'class': type(pool).__name__,
+                'status': pool.status()
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -0,0 +1,116 @@
+"""Deletes for child rows whose counters live on another row.
+
+Foreign keys delete children with ON DELETE CASCADE, and the relationships
+use passive_deletes, so deleting a course or a user never loads its
+children. The database does not run the mapper events in counters.py and
+rollups.py for rows it cascades to, though. The helpers here delete the
+children whose deletion changes a counter or a rollup on some other row
+first, with DELETE ... RETURNING (SQLite 3.35+), and apply those changes
+from the returned rows:
+
+- enrollments: the course's enrollment_count and the enrollment and
+  completion rollups
+- reviews: the course's rating_sum and rating_count
+- forum_posts: the topic's post_count and last_poster_id
+- lesson_completions: the enrollment's completed_lessons
+
+Everything else under the deleted row cascades without upkeep. The
+before_delete events below apply the same helpers to ORM deletes of
+courses, lessons and users. The bulk user actions and the background purge
+call them directly with chunked conditions.
+"""
+from collections import Counter
+from sqlalchemy import event, delete, text
+from src.models.user import User, Course, Lesson, Enrollment, Review, ForumPost, LessonCompletion
+from src.models.counters import adjust_course, LAST_POSTER_SQL
+from src.models.rollups import bump, completion_day
+
+enrollments = Enrollment.__table__
+reviews = Review.__table__
+posts = ForumPost.__table__
+completions = LessonCompletion.__table__
+users = User.__table__
+courses = Course.__table__
+
+def delete_enrollments(connection, condition):
+    """Delete matching enrollments (and their completions); returns how many"""
+    rows = connection.execute(delete(enrollments).where(condition).returning(
+        enrollments.c.course_id, enrollments.c.enrollment_date, enrollments.c.status, enrollments.c.completion_date
+    )).all()
+    per_course = Counter(row.course_id for row in rows)
+    changes = Counter()
+    for row in rows:
+        changes[('enrollments', row.enrollment_date)] -= 1
+        changes[('completions', completion_day(row.status, row.completion_date))] -= 1
+    for course_id, count in per_course.items():
+        adjust_course(connection, course_id, enrollment_count=-count)
+    bump(connection, changes)
+    return len(rows)
+
+def delete_reviews(connection, condition):
+    rows = connection.execute(delete(reviews).where(condition).returning(reviews.c.course_id, reviews.c.rating)).all()
+    ratings = {}
+    for row in rows:
+        rating_sum, rating_count = ratings.get(row.course_id, (0, 0))
+        ratings[row.course_id] = (rating_sum + row.rating, rating_count + 1)
+    for course_id, (rating_sum, rating_count) in ratings.items():
+        adjust_course(connection, course_id, rating_sum=-rating_sum, rating_count=-rating_count)
+    return len(rows)
+
+def delete_posts(connection, condition):
+    rows = connection.execute(delete(posts).where(condition).returning(posts.c.topic_id)).all()
+    for topic_id, count in Counter(row.topic_id for row in rows).items():
+        connection.execute(
+            text(f'UPDATE forum_topics SET post_count = post_count - :count, last_poster_id = {LAST_POSTER_SQL} '
+                 'WHERE topic_id = :topic_id'),
+            {'count': count, 'topic_id': topic_id}
+        )
+    return len(rows)
+
+def delete_completions(connection, condition):
+    rows = connection.execute(delete(completions).where(condition).returning(completions.c.enrollment_id)).all()
+    for enrollment_id, count in Counter(row.enrollment_id for row in rows).items():
+        connection.execute(
+            enrollments.update().where(enrollments.c.enrollment_id == enrollment_id)
+            .values(completed_lessons=enrollments.c.completed_lessons - count)
+        )
+    return len(rows)
+
+def delete_user_rows(connection, user_ids):
+    """Delete the enrollments, reviews and forum posts of users about to be deleted"""
+    delete_enrollments(connection, enrollments.c.user_id.in_(user_ids))
+    delete_reviews(connection, reviews.c.user_id.in_(user_ids))
+    delete_posts(connection, posts.c.user_id.in_(user_ids))
+
+def delete_users(connection, user_ids):
+    """Delete users and everything they own; returns how many users were deleted"""
+    delete_user_rows(connection, user_ids)
+    rows = connection.execute(delete(users).where(users.c.user_id.in_(user_ids)).returning(users.c.registration_date)).all()
+    changes = Counter()
+    for row in rows:
+        changes[('registrations', row.registration_date)] -= 1
+    bump(connection, changes)
+    return len(rows)
+
+def delete_course(connection, course_id):
+    """Delete a course and everything under it; returns whether it existed"""
+    delete_enrollments(connection, enrollments.c.course_id == course_id)
+    row = connection.execute(delete(courses).where(courses.c.course_id == course_id).returning(courses.c.created_at)).first()
+    if row is not None:
+        bump(connection, {('course_creations', row.created_at): -1})
+    return row is not None
+
+# Children loaded into the session were already deleted by the ORM cascade
+# (and counted by their own events) before the parent's before_delete runs
+
+@event.listens_for(Course, 'before_delete')
+def course_deleting(mapper, connection, target):
+    delete_enrollments(connection, enrollments.c.course_id == target.course_id)
+
+@event.listens_for(Lesson, 'before_delete')
+def lesson_deleting(mapper, connection, target):
+    delete_completions(connection, completions.c.lesson_id == target.lesson_id)
+
+@event.listens_for(User, 'before_delete')
+def user_deleting(mapper, connection, target):
+    delete_user_rows(connection, [target.user_id])
@@ -0,0 +1,137 @@
+"""Incrementally maintained aggregate columns.
+
+Course.enrollment_count / rating_sum / rating_count / lesson_count,
+Enrollment.completed_lessons and ForumTopic.post_count / last_poster_id are
+updated in the same flush as the child row through mapper events, so reads
+never have to count children. Completions written by src/services/progress.py
+adjust completed_lessons in the same UPDATE as the progress bitmap.
+Rows removed by ON DELETE CASCADE never reach these events; the deletes in
+src/models/cascades.py apply the same adjustments for them.
+Bulk query.delete()/update() calls bypass mapper events; run
+``flask --app src.main rebuild-counters`` after any such maintenance (it
+also assigns progress slots to bulk-inserted lessons).
+"""
+from datetime import datetime
+from sqlalchemy import event, inspect, text
+from src.models.user import Enrollment, Review, ForumPost, Lesson, LessonCompletion
+from src.models.versions import touch_courses
+
+COURSE_COUNTERS = ('enrollment_count', 'rating_sum', 'rating_count', 'lesson_count')
+
+LAST_POSTER_SQL = (
+    '(SELECT user_id FROM forum_posts WHERE forum_posts.topic_id = forum_topics.topic_id '
+    'ORDER BY created_at DESC, post_id DESC LIMIT 1)'
+)
+
+def adjust_course(connection, course_id, **deltas):
+    # The counters are part of the course payload, so they also bump its content version
+    assignments = ', '.join(f'{column} = {column} + :{column}' for column in deltas)
+    connection.execute(
+        text(f'UPDATE courses SET {assignments}, content_version = content_version + 1, '
+             'content_modified_at = :now WHERE course_id = :course_id'),
+        dict(deltas, course_id=course_id, now=datetime.utcnow())
+    )
+
+@event.listens_for(Enrollment, 'after_insert')
+def enrollment_inserted(mapper, connection, target):
+    adjust_course(connection, target.course_id, enrollment_count=1)
+
+@event.listens_for(Enrollment, 'after_delete')
+def enrollment_deleted(mapper, connection, target):
+    adjust_course(connection, target.course_id, enrollment_count=-1)
+
+@event.listens_for(Review, 'after_insert')
+def review_inserted(mapper, connection, target):
+    adjust_course(connection, target.course_id, rating_sum=target.rating, rating_count=1)
+
+@event.listens_for(Review, 'after_update')
+def review_updated(mapper, connection, target):
+    rating = inspect(target).attrs.rating.history
+    if rating.deleted and rating.added:
+        adjust_course(connection, target.course_id, rating_sum=rating.added[0] - rating.deleted[0])
+
+@event.listens_for(Review, 'after_delete')
+def review_deleted(mapper, connection, target):
+    adjust_course(connection, target.course_id, rating_sum=-target.rating, rating_count=-1)
+
+@event.listens_for(Lesson, 'after_insert')
+def lesson_inserted(mapper, connection, target):
+    adjust_course(connection, target.course_id, lesson_count=1)
+
+@event.listens_for(Lesson, 'after_delete')
+def lesson_deleted(mapper, connection, target):
+    adjust_course(connection, target.course_id, lesson_count=-1)
+
+@event.listens_for(LessonCompletion, 'after_delete')
+def completion_deleted(mapper, connection, target):
+    # ORM deletes happen when a lesson is deleted with its completions
+    connection.execute(
+        text('UPDATE enrollments SET completed_lessons = completed_lessons - 1 WHERE enrollment_id = :enrollment_id'),
+        {'enrollment_id': target.enrollment_id}
+    )
+
+@event.listens_for(ForumPost, 'after_insert')
+def post_inserted(mapper, connection, target):
+    connection.execute(
+        text('UPDATE forum_topics SET post_count = post_count + 1, last_poster_id = :user_id '
+             'WHERE topic_id = :topic_id'),
+        {'user_id': target.user_id, 'topic_id': target.topic_id}
+    )
+
+@event.listens_for(ForumPost, 'after_delete')
+def post_deleted(mapper, connection, target):
+    connection.execute(
+        text(f'UPDATE forum_topics SET post_count = post_count - 1, last_poster_id = {LAST_POSTER_SQL} '
+             'WHERE topic_id = :topic_id'),
+        {'topic_id': target.topic_id}
+    )
+
+REBUILD_STATEMENTS = [
+    'UPDATE courses SET '
+    'enrollment_count = (SELECT COUNT(*) FROM enrollments WHERE enrollments.course_id = courses.course_id), '
+    'rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.course_id = courses.course_id), '
+    'rating_count = (SELECT COUNT(*) FROM reviews WHERE reviews.course_id = courses.course_id)',
+    'UPDATE forum_topics SET '
+    'post_count = (SELECT COUNT(*) FROM forum_posts WHERE forum_posts.topic_id = forum_topics.topic_id), '
+    f'last_poster_id = {LAST_POSTER_SQL}'
+]
+
+# Separate from REBUILD_STATEMENTS: migration 2 rebuilds before these columns exist
+PROGRESS_REBUILD_STATEMENTS = [
+    'UPDATE courses SET '
+    'lesson_count = (SELECT COUNT(*) FROM lessons WHERE lessons.course_id = courses.course_id)',
+    'UPDATE enrollments SET '
+    'completed_lessons = (SELECT COUNT(*) FROM lesson_completions '
+    'WHERE lesson_completions.enrollment_id = enrollments.enrollment_id)'
+]
+
+def rebuild_counters(connection):
+    """Recompute the course and forum topic counters; returns rows touched per table"""
+    touched = {}
+    for table, statement in zip(('courses', 'forum_topics'), REBUILD_STATEMENTS):
+        touched[table] = connection.execute(text(statement)).rowcount
+    return touched
+
+def rebuild_progress_counters(connection):
+    """Recompute lesson counts and completed lesson counts; returns rows touched per table"""
+    touched = {}
+    for table, statement in zip(('courses', 'enrollments'), PROGRESS_REBUILD_STATEMENTS):
+        touched[table] = connection.execute(text(statement)).rowcount
+    return touched
+
+def course_counters(connection):
+    """{course_id: counter values}, taken before a rebuild for touch_rebuilt_courses"""
+    rows = connection.execute(text(f"SELECT course_id, {', '.join(COURSE_COUNTERS)} FROM courses"))
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+def touch_rebuilt_courses(connection, before, chunk_size=500):
+    """Bump the content version of courses whose counters a rebuild changed; returns their ids.
+
+    The rebuild statements are plain UPDATEs, so without this the ETags and
+    cached payloads of corrected courses would keep the old counts.
+    """
+    changed = [course_id for course_id, counters in course_counters(connection).items() if before.get(course_id) != counters]
+    for start in range(0, len(changed), chunk_size):
+        ids = ', '.join(str(int(course_id)) for course_id in changed[start:start + chunk_size])
+        touch_courses(connection, f'course_id IN ({ids})')
+    return changed
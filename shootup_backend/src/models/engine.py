@@ -0,0 +1,31 @@
+from sqlalchemy import event
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run the configured PRAGMA statements on every new DBAPI connection"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+def configure_engine(app, db):
+    """Attach connection-level settings to the app's engine after db.init_app()"""
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config.get('SQLITE_PRAGMAS', {}))
+
+def get_sqlite_settings(db):
+    """Read back the effective pragma values from a live connection"""
+    settings = {}
+    if db.engine.dialect.name != 'sqlite':
+        return settings
+
+    with db.engine.connect() as connection:
+        for name in ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'busy_timeout', 'foreign_keys'):
+            settings[name] = connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+    return settings
@@ -0,0 +1,66 @@
+"""Eager-loading profiles for the to_dict() serializers.
+
+Each to_dict() walks relationships (Course -> category, instructor -> role,
+ForumPost -> user -> role, ...). Loaded lazily, that is one SELECT per row
+per relationship. A profile is the set of loader options that pre-loads
+exactly what a serializer touches, so a list endpoint runs a fixed number of
+queries regardless of page size.
+"""
+from sqlalchemy.orm import joinedload, selectinload
+from src.models.user import (
+    User, Course, Enrollment, Review, ForumTopic, ForumPost, Vlog, Message
+)
+
+def user_with_role(relationship):
+    """joinedload a User relationship together with the role its to_dict() reads"""
+    return joinedload(relationship).joinedload(User.role)
+
+def course_relations(path=None):
+    category = path.joinedload(Course.category) if path else joinedload(Course.category)
+    instructor = path.joinedload(Course.instructor) if path else joinedload(Course.instructor)
+    return [category, instructor.joinedload(User.role)]
+
+LOADER_PROFILES = {
+    'user': lambda: [joinedload(User.role)],
+    'course': lambda: course_relations(),
+    'course_detail': lambda: course_relations() + [
+        selectinload(Course.lessons),
+        selectinload(Course.reviews).joinedload(Review.user).joinedload(User.role)
+    ],
+    'review': lambda: [user_with_role(Review.user)],
+    'enrollment_with_course': lambda: course_relations(joinedload(Enrollment.course)),
+    'enrollment_with_user': lambda: [user_with_role(Enrollment.user)],
+    'forum_topic': lambda: [user_with_role(ForumTopic.user)],
+    'forum_post': lambda: [user_with_role(ForumPost.user)],
+    'forum_post_with_topic': lambda: [
+        user_with_role(ForumPost.user),
+        joinedload(ForumPost.topic).joinedload(ForumTopic.user).joinedload(User.role)
+    ],
+    'vlog': lambda: [user_with_role(Vlog.user)],
+    'message': lambda: [user_with_role(Message.sender), user_with_role(Message.receiver)]
+}
+
+# The profile each model's to_dict() needs when no other profile is named
+DEFAULT_PROFILES = {
+    User: 'user',
+    Course: 'course',
+    Review: 'review',
+    ForumTopic: 'forum_topic',
+    ForumPost: 'forum_post',
+    Vlog: 'vlog',
+    Message: 'message'
+}
+
+def loader_options(profile):
+    if profile not in LOADER_PROFILES:
+        raise KeyError(f'Unknown loader profile: {profile}')
+    return LOADER_PROFILES[profile]()
+
+def serializable(query, profile=None):
+    """Apply a loader profile to a query, defaulting to the one for its model"""
+    if profile is None:
+        entity = query.column_descriptions[0]['entity']
+        profile = DEFAULT_PROFILES.get(entity)
+        if profile is None:
+            return query
+    return query.options(*loader_options(profile))
@@ -0,0 +1,336 @@
+"""Versioned schema migrations for databases created before a model change.
+
+db.create_all() only creates missing tables; it never adds columns or
+indexes to tables that already exist. Each migration here is applied once,
+in version order, and recorded in the schema_migrations table. Steps are
+written to be idempotent so they are safe on a freshly created schema too.
+"""
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+from src.models.counters import rebuild_counters, rebuild_progress_counters
+from src.models.progress_slots import assign_lesson_slots
+from src.models.rollups import backfill_rollups
+from src.services.progress import int_to_bitmap
+from src.services.search import create_search_index, search_tables_exist
+
+MIGRATIONS = []
+
+LEGACY_PROGRESS = 'progress_legacy'
+
+def migration(version, description, foreign_keys=True):
+    """Register a migration step; steps receive an open connection.
+
+    foreign_keys=False runs the step with foreign key enforcement off, as
+    SQLite requires for rebuilding a table that other tables reference.
+    """
+    def decorator(func):
+        func.foreign_keys = foreign_keys
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return decorator
+
+def create_indexes(connection, metadata, *names):
+    """Create the named model indexes unless they already exist.
+
+    Names no longer in the models (their table was replaced by a later
+    migration) are skipped.
+    """
+    indexes = {index.name: index for table in metadata.tables.values() for index in table.indexes}
+    for name in names:
+        if name in indexes:
+            indexes[name].create(connection, checkfirst=True)
+
+def table_exists(connection, table_name):
+    return inspect(connection).has_table(table_name)
+
+def add_column(connection, table_name, column_name, ddl):
+    """ALTER TABLE ... ADD COLUMN unless the column is already present"""
+    columns = {column['name'] for column in inspect(connection).get_columns(table_name)}
+    if column_name not in columns:
+        connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}'))
+        return True
+    return False
+
+def foreign_key_actions(connection, table_name):
+    """{(column, referenced table): ON DELETE action} as the table exists in the database"""
+    return {
+        (row[3], row[2]): row[6]
+        for row in connection.exec_driver_sql(f'PRAGMA foreign_key_list({table_name})')
+    }
+
+def model_foreign_key_actions(table):
+    return {
+        (fk.parent.name, fk.column.table.name): (fk.ondelete or 'NO ACTION').upper()
+        for fk in table.foreign_keys
+    }
+
+def rebuild_table(connection, table):
+    """Recreate a table from its model definition and copy its rows over.
+
+    SQLite cannot alter constraints in place; this is its documented
+    create-copy-drop-rename procedure, so it must run with foreign keys off.
+    Indexes are recreated from the model.
+    """
+    name = table.name
+    existing = {column['name'] for column in inspect(connection).get_columns(name)}
+    columns = ', '.join(column.name for column in table.columns if column.name in existing)
+    ddl = str(CreateTable(table).compile(connection)).replace(f'CREATE TABLE {name} ', f'CREATE TABLE {name}__new ', 1)
+    connection.exec_driver_sql(f'DROP TABLE IF EXISTS {name}__new')
+    connection.exec_driver_sql(ddl)
+    connection.exec_driver_sql(f'INSERT INTO {name}__new ({columns}) SELECT {columns} FROM {name}')
+    connection.exec_driver_sql(f'DROP TABLE {name}')
+    connection.exec_driver_sql(f'ALTER TABLE {name}__new RENAME TO {name}')
+    for index in table.indexes:
+        index.create(connection)
+
+def ensure_migrations_table(connection):
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(255) NOT NULL, '
+        'applied_at DATETIME NOT NULL)'
+    ))
+
+def get_applied_versions(connection):
+    ensure_migrations_table(connection)
+    return {row[0] for row in connection.execute(text('SELECT version FROM schema_migrations'))}
+
+def run_migrations(db):
+    """Apply every pending migration, each in its own transaction"""
+    applied = []
+    with db.engine.begin() as connection:
+        done = get_applied_versions(connection)
+
+    for version, description, step in MIGRATIONS:
+        if version in done:
+            continue
+        if step.foreign_keys:
+            with db.engine.begin() as connection:
+                apply_step(connection, db.metadata, version, description, step)
+        else:
+            with db.engine.connect() as connection:
+                apply_step_without_foreign_keys(connection, db.metadata, version, description, step)
+        applied.append(version)
+    return applied
+
+def apply_step(connection, metadata, version, description, step):
+    step(connection, metadata)
+    connection.execute(
+        text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)'),
+        {'v': version, 'd': description, 't': datetime.utcnow()}
+    )
+
+def foreign_key_violations(connection):
+    """[(table, rowid, column, ON DELETE action)] for every row whose parent is missing"""
+    violations = []
+    references = {}
+    for table_name, rowid, parent, fk_id in connection.exec_driver_sql('PRAGMA foreign_key_check').all():
+        if table_name not in references:
+            references[table_name] = {
+                row[0]: (row[3], row[6].upper())
+                for row in connection.exec_driver_sql(f'PRAGMA foreign_key_list({table_name})')
+            }
+        violations.append((table_name, rowid) + references[table_name][fk_id])
+    return violations
+
+def remove_orphans(connection):
+    """Apply each foreign key's ON DELETE action to rows whose parent is already gone.
+
+    Databases written before foreign keys were enforced can hold such rows.
+    CASCADE deletes them (and, on the next pass, their own orphaned
+    children), SET NULL clears the reference. Rows under other actions are
+    left for the caller. Returns {(table, column): rows} still orphaned.
+    """
+    while True:
+        remaining = {}
+        repaired = False
+        for table_name, rowid, column, action in foreign_key_violations(connection):
+            if action == 'CASCADE' and rowid is not None:
+                connection.exec_driver_sql(f'DELETE FROM {table_name} WHERE rowid = ?', (rowid,))
+                repaired = True
+            elif action == 'SET NULL' and rowid is not None:
+                connection.exec_driver_sql(f'UPDATE {table_name} SET {column} = NULL WHERE rowid = ?', (rowid,))
+                repaired = True
+            else:
+                remaining[table_name, column] = remaining.get((table_name, column), 0) + 1
+        if not repaired:
+            return remaining
+
+def apply_step_without_foreign_keys(connection, metadata, version, description, step):
+    # PRAGMA foreign_keys is a no-op inside a transaction, so it is switched
+    # before BEGIN, and the result is checked before the step commits
+    enabled = connection.exec_driver_sql('PRAGMA foreign_keys').scalar()
+    connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+    connection.commit()
+    try:
+        with connection.begin():
+            # Orphans left from before enforcement are not the step's doing
+            existing = {}
+            for table_name, rowid, column, action in foreign_key_violations(connection):
+                existing[table_name, column] = existing.get((table_name, column), 0) + 1
+            apply_step(connection, metadata, version, description, step)
+            introduced = {
+                reference: rows for reference, rows in remove_orphans(connection).items()
+                if rows > existing.get(reference, 0)
+            }
+            if introduced:
+                raise RuntimeError(f'Migration {version} left foreign key violations: {introduced}')
+    finally:
+        connection.exec_driver_sql(f"PRAGMA foreign_keys={'ON' if enabled else 'OFF'}")
+        connection.commit()
+
+def get_migration_status(db):
+    with db.engine.begin() as connection:
+        done = get_applied_versions(connection)
+    return [{
+        'version': version,
+        'description': description,
+        'applied': version in done
+    } for version, description, step in MIGRATIONS]
+
+@migration(1, 'Secondary indexes for hot lookup columns')
+def add_hot_lookup_indexes(connection, metadata):
+    create_indexes(
+        connection, metadata,
+        'ix_users_verification_token',
+        'ix_courses_status_created', 'ix_courses_category', 'ix_courses_instructor',
+        'ix_lessons_course_order',
+        'ix_enrollments_user_course', 'ix_enrollments_course_status', 'ix_enrollments_date',
+        'ix_progress_enrollment_lesson', 'ix_progress_lesson',
+        'ix_quizzes_lesson', 'ix_questions_quiz', 'ix_options_question',
+        'ix_quiz_attempts_quiz_user', 'ix_quiz_attempts_user', 'ix_answers_attempt',
+        'ix_reviews_course_user',
+        'ix_forum_topics_sticky_last_post', 'ix_forum_topics_user_created',
+        'ix_forum_posts_topic_created', 'ix_forum_posts_parent', 'ix_forum_posts_user_created',
+        'ix_vlogs_status_upload', 'ix_vlogs_status_views', 'ix_vlogs_user_upload',
+        'ix_audit_logs_timestamp', 'ix_audit_logs_user_timestamp'
+    )
+
+@migration(2, 'Denormalized course and forum topic counters')
+def add_counter_columns(connection, metadata):
+    add_column(connection, 'courses', 'enrollment_count', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(connection, 'courses', 'rating_sum', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(connection, 'courses', 'rating_count', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(connection, 'forum_topics', 'post_count', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(connection, 'forum_topics', 'last_poster_id', 'INTEGER REFERENCES users (user_id)')
+    create_indexes(connection, metadata, 'ix_courses_enrollment_count')
+    rebuild_counters(connection)
+
+@migration(3, 'Registration date index for user listings')
+def add_user_registration_index(connection, metadata):
+    create_indexes(connection, metadata, 'ix_users_registration')
+
+@migration(4, 'FTS5 search index for courses and vlogs')
+def add_search_index(connection, metadata):
+    # Skipped (but recorded) on builds without FTS5; search then falls back to LIKE
+    create_search_index(connection)
+
+@migration(5, 'Content versions for conditional course and quiz reads')
+def add_content_versions(connection, metadata):
+    for table in ('courses', 'quizzes'):
+        add_column(connection, table, 'content_version', 'INTEGER NOT NULL DEFAULT 0')
+        if add_column(connection, table, 'content_modified_at', 'DATETIME'):
+            source = 'updated_at' if table == 'courses' else 'created_at'
+            connection.execute(text(f'UPDATE {table} SET content_modified_at = {source}'))
+    create_indexes(connection, metadata, 'ix_reviews_user')
+
+@migration(6, 'Bitmap lesson progress replacing per-lesson progress rows')
+def add_progress_bitmaps(connection, metadata):
+    add_column(connection, 'courses', 'lesson_slot_count', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(connection, 'lessons', 'progress_slot', 'INTEGER')
+    add_column(connection, 'enrollments', 'progress_bitmap', 'BLOB')
+    metadata.tables['lesson_completions'].create(connection, checkfirst=True)
+    create_indexes(connection, metadata, 'ix_lesson_completions_lesson')
+    assign_lesson_slots(connection)
+    if not table_exists(connection, 'progress'):
+        return
+
+    # Only completed rows carry information, but the old table is kept as
+    # progress_legacy until drop_legacy_progress is run after checking the backfill
+    bitmaps = {}
+    rows = connection.execute(text(
+        'SELECT progress.enrollment_id, lessons.progress_slot FROM progress '
+        'JOIN lessons ON lessons.lesson_id = progress.lesson_id WHERE progress.is_completed = 1'
+    ))
+    for enrollment_id, slot in rows:
+        bitmaps[enrollment_id] = bitmaps.get(enrollment_id, 0) | (1 << slot)
+    if bitmaps:
+        connection.execute(
+            text('UPDATE enrollments SET progress_bitmap = :bitmap WHERE enrollment_id = :enrollment_id'),
+            [{'enrollment_id': enrollment_id, 'bitmap': int_to_bitmap(bits)} for enrollment_id, bits in bitmaps.items()]
+        )
+    connection.execute(text(
+        'INSERT INTO lesson_completions (enrollment_id, lesson_id, completion_date) '
+        'SELECT progress.enrollment_id, progress.lesson_id, MAX(progress.completion_date) FROM progress '
+        'JOIN lessons ON lessons.lesson_id = progress.lesson_id WHERE progress.is_completed = 1 '
+        'GROUP BY progress.enrollment_id, progress.lesson_id'
+    ))
+    # Copied rather than renamed so its foreign keys cannot block deletes
+    connection.execute(text(f'CREATE TABLE IF NOT EXISTS {LEGACY_PROGRESS} AS SELECT * FROM progress'))
+    connection.execute(text('DROP TABLE progress'))
+
+def legacy_progress_status(connection):
+    """Whether progress_legacy is still present and how many completed rows the backfill missed"""
+    if not table_exists(connection, LEGACY_PROGRESS):
+        return {'present': False, 'rows': 0, 'missing_completions': 0}
+    rows = connection.execute(text(f'SELECT COUNT(*) FROM {LEGACY_PROGRESS}')).scalar()
+    missing = connection.execute(text(
+        f'SELECT COUNT(*) FROM {LEGACY_PROGRESS} AS legacy '
+        'JOIN enrollments ON enrollments.enrollment_id = legacy.enrollment_id '
+        'JOIN lessons ON lessons.lesson_id = legacy.lesson_id '
+        'WHERE legacy.is_completed = 1 AND NOT EXISTS ('
+        'SELECT 1 FROM lesson_completions WHERE lesson_completions.enrollment_id = legacy.enrollment_id '
+        'AND lesson_completions.lesson_id = legacy.lesson_id)'
+    )).scalar()
+    return {'present': True, 'rows': rows, 'missing_completions': missing}
+
+def drop_legacy_progress(connection, force=False):
+    """Drop the pre-bitmap progress rows kept by migration 6.
+
+    Refuses while completed legacy rows of existing enrollments and lessons
+    have no lesson_completions row, unless force is set.
+    """
+    status = legacy_progress_status(connection)
+    if status['present'] and status['missing_completions'] and not force:
+        raise ValueError(f"{status['missing_completions']} completed legacy progress rows were not backfilled")
+    if status['present']:
+        connection.execute(text(f'DROP TABLE {LEGACY_PROGRESS}'))
+    return status
+
+@migration(7, 'Running lesson and completed lesson counters')
+def add_progress_counters(connection, metadata):
+    add_column(connection, 'courses', 'lesson_count', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(connection, 'enrollments', 'completed_lessons', 'INTEGER NOT NULL DEFAULT 0')
+    rebuild_progress_counters(connection)
+
+@migration(8, 'Daily analytics rollups')
+def add_daily_rollups(connection, metadata):
+    metadata.tables['daily_rollups'].create(connection, checkfirst=True)
+    create_indexes(connection, metadata, 'ix_users_last_login')
+    backfill_rollups(connection)
+
+@migration(9, 'ON DELETE actions on foreign keys and soft delete for courses and users', foreign_keys=False)
+def add_delete_cascades(connection, metadata):
+    add_column(connection, 'courses', 'deleted_at', 'DATETIME')
+    add_column(connection, 'users', 'deleted_at', 'DATETIME')
+    rebuilt = False
+    for table in metadata.sorted_tables:
+        if table_exists(connection, table.name) and foreign_key_actions(connection, table.name) != model_foreign_key_actions(table):
+            rebuild_table(connection, table)
+            rebuilt = True
+    create_indexes(
+        connection, metadata,
+        'ix_users_deleted', 'ix_courses_deleted', 'ix_career_roadmaps_created_by',
+        'ix_enrollments_last_lesson', 'ix_answers_question', 'ix_answers_option', 'ix_roadmap_courses_course',
+        'ix_forum_topics_last_poster', 'ix_messages_sender', 'ix_messages_receiver', 'ix_notifications_user'
+    )
+    # Dropping the old vlogs table dropped its search triggers with it
+    if rebuilt and search_tables_exist(connection):
+        create_search_index(connection)
+
+@migration(10, 'Background job queue and periodic schedules')
+def add_job_queue(connection, metadata):
+    metadata.tables['jobs'].create(connection, checkfirst=True)
+    metadata.tables['job_schedules'].create(connection, checkfirst=True)
@@ -0,0 +1,56 @@
+"""Stable per-course lesson ordinals for the progress bitmaps.
+
+Each lesson owns one bit of its course's enrollment progress bitmaps
+(Enrollment.progress_bitmap). The bit is Lesson.progress_slot, taken from
+Course.lesson_slot_count when the lesson is inserted and never reused, so
+reordering lessons leaves every bitmap valid and a deleted lesson's stale
+bits can never be read as a later lesson's. lesson_order is not usable as
+the key: instructors edit it and nothing stops two lessons sharing a value.
+Bulk inserts bypass the event; assign_lesson_slots fills in what they left.
+"""
+from sqlalchemy import event, text
+from src.models.user import Lesson
+
+@event.listens_for(Lesson, 'before_insert')
+def lesson_inserting(mapper, connection, target):
+    if target.progress_slot is not None:
+        return
+    # The UPDATE takes the write lock first, so concurrent inserts get distinct slots
+    connection.execute(
+        text('UPDATE courses SET lesson_slot_count = lesson_slot_count + 1 WHERE course_id = :course_id'),
+        {'course_id': target.course_id}
+    )
+    target.progress_slot = connection.execute(
+        text('SELECT lesson_slot_count - 1 FROM courses WHERE course_id = :course_id'),
+        {'course_id': target.course_id}
+    ).scalar()
+
+def assign_lesson_slots(connection):
+    """Give lessons without a slot the next free slots of their course, in lesson order.
+
+    Returns the number of lessons assigned.
+    """
+    rows = connection.execute(text(
+        'SELECT lesson_id, course_id FROM lessons WHERE progress_slot IS NULL '
+        'ORDER BY course_id, lesson_order, lesson_id'
+    )).fetchall()
+    if not rows:
+        return 0
+
+    next_slots = dict(connection.execute(text(
+        'SELECT courses.course_id, MAX(courses.lesson_slot_count, COALESCE(MAX(lessons.progress_slot) + 1, 0)) '
+        'FROM courses LEFT JOIN lessons ON lessons.course_id = courses.course_id '
+        'WHERE courses.course_id IN (SELECT course_id FROM lessons WHERE progress_slot IS NULL) '
+        'GROUP BY courses.course_id'
+    )).fetchall())
+    slots = []
+    for lesson_id, course_id in rows:
+        slots.append({'lesson_id': lesson_id, 'slot': next_slots[course_id]})
+        next_slots[course_id] += 1
+
+    connection.execute(text('UPDATE lessons SET progress_slot = :slot WHERE lesson_id = :lesson_id'), slots)
+    connection.execute(
+        text('UPDATE courses SET lesson_slot_count = :count WHERE course_id = :course_id'),
+        [{'course_id': course_id, 'count': count} for course_id, count in next_slots.items()]
+    )
+    return len(rows)
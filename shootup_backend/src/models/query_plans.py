@@ -0,0 +1,90 @@
+"""EXPLAIN QUERY PLAN report for the lookups the API routes run on every request.
+
+Each entry mirrors the filter/order of a route query. The report flags any
+plan step that scans a table instead of searching it through an index.
+"""
+from datetime import date
+from src.models.user import (
+    db, User, Course, Lesson, Enrollment, LessonCompletion, Quiz, Question, Option,
+    QuizAttempt, Answer, Review, ForumTopic, ForumPost, Vlog, AuditLog, DailyRollup
+)
+
+def route_queries():
+    """Return (label, query) pairs using placeholder ids"""
+    return [
+        ('courses.get_courses', Course.query.filter(Course.status == 'approved').order_by(Course.created_at.desc())),
+        ('courses.get_course version check', db.session.query(Course.content_version, Course.content_modified_at).filter_by(course_id=1)),
+        ('courses.get_course_lessons', Lesson.query.filter_by(course_id=1).order_by(Lesson.lesson_order)),
+        ('courses.get_course reviews', Review.query.filter_by(course_id=1)),
+        ('courses.create_review duplicate check', Review.query.filter_by(user_id=1, course_id=1)),
+        ('courses.get_my_courses instructor', Course.query.filter_by(instructor_id=1)),
+        ('enrollments.get_enrollments', Enrollment.query.filter_by(user_id=1)),
+        ('enrollments.enroll_course duplicate check', Enrollment.query.filter_by(user_id=1, course_id=1)),
+        ('enrollments.get_course_enrollments', Enrollment.query.filter_by(course_id=1)),
+        ('enrollments.get_enrollment completion dates', LessonCompletion.query.filter_by(enrollment_id=1)),
+        ('enrollments lesson slots', db.session.query(Lesson.lesson_id, Lesson.progress_slot).filter_by(course_id=1).order_by(Lesson.lesson_order)),
+        ('enrollments progress bitmap', db.session.query(Enrollment.progress_bitmap).filter_by(enrollment_id=1)),
+        ('enrollments.update_lesson_progress completion', LessonCompletion.query.filter_by(enrollment_id=1, lesson_id=1)),
+        ('quizzes.get_quiz version check', db.session.query(Quiz.content_version, Quiz.content_modified_at).filter_by(quiz_id=1)),
+        ('quizzes.get_lesson_quizzes', Quiz.query.filter_by(lesson_id=1)),
+        ('quizzes.get_quiz questions', Question.query.filter_by(quiz_id=1)),
+        ('quizzes question options', Option.query.filter_by(question_id=1)),
+        ('quizzes.get_quiz_attempts own', QuizAttempt.query.filter_by(quiz_id=1, user_id=1)),
+        ('quizzes.get_quiz_attempts all', QuizAttempt.query.filter_by(quiz_id=1)),
+        ('quizzes.get_quiz_attempt answers', Answer.query.filter_by(attempt_id=1)),
+        ('forum.get_topics', ForumTopic.query.order_by(ForumTopic.is_sticky.desc(), ForumTopic.last_post_at.desc())),
+        ('forum.get_topic posts', ForumPost.query.filter_by(topic_id=1).order_by(ForumPost.created_at.asc())),
+        ('forum.get_post_replies', ForumPost.query.filter_by(parent_post_id=1).order_by(ForumPost.created_at.asc())),
+        ('forum.get_my_topics', ForumTopic.query.filter_by(user_id=1).order_by(ForumTopic.created_at.desc())),
+        ('forum.get_my_posts', ForumPost.query.filter_by(user_id=1).order_by(ForumPost.created_at.desc())),
+        ('vlogs.get_vlogs', Vlog.query.filter(Vlog.status == 'approved').order_by(Vlog.upload_date.desc())),
+        ('vlogs.get_popular_vlogs', Vlog.query.filter_by(status='approved').order_by(Vlog.views.desc())),
+        ('vlogs.get_my_vlogs', Vlog.query.filter_by(user_id=1).order_by(Vlog.upload_date.desc())),
+        ('admin.get_pending_courses', Course.query.filter_by(status='pending').order_by(Course.created_at.desc())),
+        ('admin.get_audit_logs', AuditLog.query.order_by(AuditLog.timestamp.desc())),
+        ('admin.get_audit_logs by user', AuditLog.query.filter(AuditLog.user_id == 1).order_by(AuditLog.timestamp.desc())),
+        ('admin.export_enrollments by course', Enrollment.query.filter_by(course_id=1).order_by(Enrollment.course_id, Enrollment.status, Enrollment.enrollment_id)),
+        ('admin.export_quiz_attempts', QuizAttempt.query.order_by(QuizAttempt.quiz_id, QuizAttempt.user_id, QuizAttempt.attempt_id)),
+        ('admin.export_quiz_attempts by course', QuizAttempt.query.join(Quiz).join(Lesson).filter(Lesson.course_id == 1).order_by(
+            Lesson.course_id, Lesson.lesson_order, Lesson.lesson_id, Quiz.quiz_id, QuizAttempt.user_id, QuizAttempt.attempt_id)),
+        ('admin.export_audit_logs by date', AuditLog.query.filter(AuditLog.timestamp >= date(2024, 1, 1), AuditLog.timestamp < date(2024, 2, 1)).order_by(AuditLog.timestamp, AuditLog.log_id)),
+        ('admin analytics rollups', DailyRollup.query.filter(DailyRollup.metric.in_(['registrations', 'logins']), DailyRollup.day.between(date(2024, 1, 1), date(2024, 1, 31)))),
+        ('admin.get_user_analytics active users', User.query.filter(User.last_login >= date(2024, 1, 1))),
+        ('users.get_users cursor', User.query.order_by(User.registration_date.desc(), User.user_id.desc())),
+        ('versions reviewer profile change', Review.query.filter_by(user_id=1)),
+        ('auth.reset_password', User.query.filter_by(verification_token='token'))
+    ]
+
+def compile_sql(query):
+    statement = query.statement if hasattr(query, 'statement') else query
+    return str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+def explain_query(query):
+    """Return the plan detail lines and whether every table access uses an index"""
+    sql = compile_sql(query)
+    rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+    details = [row[-1] for row in rows]
+    # "SCAN <table>" without an index is a full table scan; "SCAN <table> USING INDEX"
+    # walks an index in order, which is what an ORDER BY-only listing should do.
+    scans = [detail for detail in details if detail.startswith('SCAN') and 'USING' not in detail]
+    return {
+        'sql': sql,
+        'plan': details,
+        'uses_index': not scans,
+        'temp_sort': any('TEMP B-TREE' in detail for detail in details)
+    }
+
+def build_report():
+    return [dict(label=label, **explain_query(query)) for label, query in route_queries()]
+
+def format_report(report):
+    lines = []
+    for entry in report:
+        status = 'OK  ' if entry['uses_index'] else 'SCAN'
+        sort = ' (temp sort)' if entry['temp_sort'] else ''
+        lines.append(f"[{status}] {entry['label']}{sort}")
+        for detail in entry['plan']:
+            lines.append(f'         {detail}')
+    failures = sum(1 for entry in report if not entry['uses_index'])
+    lines.append(f'{len(report) - failures}/{len(report)} route queries use an index')
+    return '\n'.join(lines)
@@ -0,0 +1,115 @@
+"""Daily event counts behind the admin analytics endpoints.
+
+daily_rollups holds one row per (metric, day) for registrations, course
+creations, enrollments, completions and logins. Mapper events add to the
+day's row in the same flush as the change, so the analytics endpoints read
+a few hundred small rows instead of grouping the source tables. Days are
+UTC dates, matching the stored timestamps. As with the counters, bulk SQL
+writes bypass the events; ``flask --app src.main backfill-rollups``
+recomputes the rollups from the source tables.
+
+Logins are events, but only users.last_login is stored, so a backfill can
+only count each user's most recent login.
+"""
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import event, inspect, text
+from src.models.user import User, Course, Enrollment
+
+METRICS = ('registrations', 'course_creations', 'enrollments', 'completions', 'logins')
+
+# metric: (table, timestamp column, row filter) counted by a backfill
+BACKFILL_SOURCES = {
+    'registrations': ('users', 'registration_date', None),
+    'course_creations': ('courses', 'created_at', None),
+    'enrollments': ('enrollments', 'enrollment_date', None),
+    'completions': ('enrollments', 'completion_date', "status = 'completed'"),
+    'logins': ('users', 'last_login', None)
+}
+
+BUMP_SQL = text(
+    'INSERT INTO daily_rollups (metric, day, count) VALUES (:metric, :day, :delta) '
+    'ON CONFLICT (metric, day) DO UPDATE SET count = daily_rollups.count + excluded.count'
+)
+
+def bump(connection, changes):
+    """Apply {(metric, datetime): delta} to the day rows"""
+    deltas = Counter()
+    for (metric, when), delta in changes.items():
+        if when is not None and delta:
+            deltas[(metric, when.date().isoformat())] += delta
+    rows = [{'metric': metric, 'day': day, 'delta': delta} for (metric, day), delta in deltas.items() if delta]
+    if rows:
+        connection.execute(BUMP_SQL, rows)
+
+def old_value(target, key):
+    """The attribute's value before this flush"""
+    history = inspect(target).attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, key) if not history.added else None
+
+def completion_day(status, completion_date):
+    if status == 'completed':
+        return completion_date or datetime.utcnow()
+    return None
+
+@event.listens_for(User, 'after_insert')
+def user_inserted(mapper, connection, target):
+    bump(connection, {('registrations', target.registration_date): 1, ('logins', target.last_login): 1})
+
+@event.listens_for(User, 'after_update')
+def user_updated(mapper, connection, target):
+    history = inspect(target).attrs.last_login.history
+    if history.added and history.added[0] is not None and history.deleted != history.added:
+        bump(connection, {('logins', history.added[0]): 1})
+
+@event.listens_for(User, 'after_delete')
+def user_deleted(mapper, connection, target):
+    bump(connection, {('registrations', target.registration_date): -1})
+
+@event.listens_for(Course, 'after_insert')
+def course_inserted(mapper, connection, target):
+    bump(connection, {('course_creations', target.created_at): 1})
+
+@event.listens_for(Course, 'after_delete')
+def course_deleted(mapper, connection, target):
+    bump(connection, {('course_creations', target.created_at): -1})
+
+@event.listens_for(Enrollment, 'after_insert')
+def enrollment_inserted(mapper, connection, target):
+    bump(connection, {
+        ('enrollments', target.enrollment_date): 1,
+        ('completions', completion_day(target.status, target.completion_date)): 1
+    })
+
+@event.listens_for(Enrollment, 'after_update')
+def enrollment_updated(mapper, connection, target):
+    # Completing, reopening or re-dating a completion moves it between days
+    before = completion_day(old_value(target, 'status'), old_value(target, 'completion_date'))
+    after = completion_day(target.status, target.completion_date)
+    if before != after:
+        changes = Counter()
+        changes[('completions', before)] -= 1
+        changes[('completions', after)] += 1
+        bump(connection, changes)
+
+@event.listens_for(Enrollment, 'after_delete')
+def enrollment_deleted(mapper, connection, target):
+    bump(connection, {
+        ('enrollments', target.enrollment_date): -1,
+        ('completions', completion_day(target.status, target.completion_date)): -1
+    })
+
+def backfill_rollups(connection, metrics=None):
+    """Recompute the given metrics (default all) from the source tables; returns days written per metric"""
+    written = {}
+    for metric in metrics or METRICS:
+        table, column, condition = BACKFILL_SOURCES[metric]
+        where = f'{column} IS NOT NULL' + (f' AND {condition}' if condition else '')
+        connection.execute(text('DELETE FROM daily_rollups WHERE metric = :metric'), {'metric': metric})
+        written[metric] = connection.execute(text(
+            f'INSERT INTO daily_rollups (metric, day, count) '
+            f'SELECT :metric, date({column}), COUNT(*) FROM {table} WHERE {where} GROUP BY date({column})'
+        ), {'metric': metric}).rowcount
+    return written
@@ -0,0 +1,37 @@
+"""Hide soft-deleted courses and users from ORM queries.
+
+A course or user whose deletion would cascade to more than
+PURGE_THRESHOLD_ROWS rows is only stamped with deleted_at by the request;
+src/services/purge.py removes it in the background. Until then every ORM
+SELECT (including Query.get and joins) gets ``deleted_at IS NULL`` for
+both models, and lessons and quizzes of a soft-deleted course are hidden
+the same way, so the row disappears from the API as soon as the request
+returns. Relationship loads are left alone, so an enrollment whose course
+is being purged still serializes. Pass the execution option
+``include_deleted=True`` to see the rows anyway; Core statements run on a
+Connection are never filtered.
+"""
+from sqlalchemy import event, exists
+from sqlalchemy.orm import Session, with_loader_criteria
+from src.models.user import User, Course, Lesson, Quiz
+
+courses = Course.__table__
+lessons = Lesson.__table__
+
+@event.listens_for(Session, 'do_orm_execute')
+def hide_soft_deleted(execute_state):
+    if (execute_state.is_select and not execute_state.is_column_load and not execute_state.is_relationship_load
+            and not execute_state.execution_options.get('include_deleted', False)):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(Course, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+            with_loader_criteria(User, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+            # Correlated explicitly: statements that already select from courses
+            # or lessons would otherwise correlate the subquery's FROM away
+            with_loader_criteria(Lesson, lambda cls: ~exists().where(
+                courses.c.course_id == cls.course_id, courses.c.deleted_at.is_not(None)
+            ).correlate_except(courses), include_aliases=True),
+            with_loader_criteria(Quiz, lambda cls: ~exists().where(
+                lessons.c.lesson_id == cls.lesson_id, courses.c.course_id == lessons.c.course_id,
+                courses.c.deleted_at.is_not(None)
+            ).correlate_except(lessons, courses), include_aliases=True)
+        )
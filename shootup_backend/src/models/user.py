@@ -1,6 +1,7 @@
+import json
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from src.services.passwords import password_hasher
 
 db = SQLAlchemy()
 
@@ -37,6 +38,12 @@ class RolePermission(db.Model):
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_verification_token', 'verification_token'),
+        db.Index('ix_users_registration', 'registration_date'),
+        db.Index('ix_users_last_login', 'last_login'),
+        db.Index('ix_users_deleted', 'deleted_at', sqlite_where=db.text('deleted_at IS NOT NULL')),
+    )
     user_id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(255), unique=True, nullable=False)
     email = db.Column(db.String(255), unique=True, nullable=False)
@@ -51,24 +58,25 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, nullable=False, default=True)
     email_verified = db.Column(db.Boolean, nullable=False, default=False)
     verification_token = db.Column(db.String(255))
+    deleted_at = db.Column(db.DateTime)  # soft-deleted, waiting for src/services/purge.py
     
     # Relationships
     courses = db.relationship('Course', backref='instructor', lazy=True)
-    enrollments = db.relationship('Enrollment', backref='user', lazy=True)
-    quiz_attempts = db.relationship('QuizAttempt', backref='user', lazy=True)
-    reviews = db.relationship('Review', backref='user', lazy=True)
-    forum_topics = db.relationship('ForumTopic', backref='user', lazy=True)
-    forum_posts = db.relationship('ForumPost', backref='user', lazy=True)
-    vlogs = db.relationship('Vlog', backref='user', lazy=True)
-    sent_messages = db.relationship('Message', foreign_keys='Message.sender_id', backref='sender', lazy=True)
-    received_messages = db.relationship('Message', foreign_keys='Message.receiver_id', backref='receiver', lazy=True)
-    notifications = db.relationship('Notification', backref='user', lazy=True)
+    enrollments = db.relationship('Enrollment', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    quiz_attempts = db.relationship('QuizAttempt', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    reviews = db.relationship('Review', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    forum_topics = db.relationship('ForumTopic', foreign_keys='ForumTopic.user_id', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    forum_posts = db.relationship('ForumPost', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    vlogs = db.relationship('Vlog', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    sent_messages = db.relationship('Message', foreign_keys='Message.sender_id', backref='sender', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    received_messages = db.relationship('Message', foreign_keys='Message.receiver_id', backref='receiver', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    notifications = db.relationship('Notification', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
     
     def to_dict(self):
         return {
@@ -106,6 +114,13 @@ class Category(db.Model):
 
 class Course(db.Model):
     __tablename__ = 'courses'
+    __table_args__ = (
+        db.Index('ix_courses_status_created', 'status', 'created_at'),
+        db.Index('ix_courses_category', 'category_id'),
+        db.Index('ix_courses_instructor', 'instructor_id'),
+        db.Index('ix_courses_enrollment_count', 'enrollment_count'),
+        db.Index('ix_courses_deleted', 'deleted_at', sqlite_where=db.text('deleted_at IS NOT NULL')),
+    )
     course_id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -120,11 +135,21 @@ class Course(db.Model):
     course_path = db.Column(db.String(255))
     is_featured = db.Column(db.Boolean, nullable=False, default=False)
     
+    # Denormalized counters, maintained by src/models/counters.py
+    enrollment_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    lesson_count = db.Column(db.Integer, nullable=False, default=0)
+    content_version = db.Column(db.Integer, nullable=False, default=0)
+    content_modified_at = db.Column(db.DateTime, default=datetime.utcnow)
+    lesson_slot_count = db.Column(db.Integer, nullable=False, default=0)  # see src/models/progress_slots.py
+    deleted_at = db.Column(db.DateTime)  # soft-deleted, waiting for src/services/purge.py
+    
     # Relationships
-    lessons = db.relationship('Lesson', backref='course', lazy=True, cascade='all, delete-orphan')
-    enrollments = db.relationship('Enrollment', backref='course', lazy=True, cascade='all, delete-orphan')
-    reviews = db.relationship('Review', backref='course', lazy=True, cascade='all, delete-orphan')
-    roadmap_courses = db.relationship('RoadmapCourse', backref='course', lazy=True, cascade='all, delete-orphan')
+    lessons = db.relationship('Lesson', backref='course', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    enrollments = db.relationship('Enrollment', backref='course', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    reviews = db.relationship('Review', backref='course', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    roadmap_courses = db.relationship('RoadmapCourse', backref='course', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -140,24 +165,31 @@ class Course(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'status': self.status,
             'course_path': self.course_path,
-            'is_featured': self.is_featured
+            'is_featured': self.is_featured,
+            'enrollment_count': self.enrollment_count or 0,
+            'average_rating': self.rating_sum / self.rating_count if self.rating_count else 0,
+            'review_count': self.rating_count or 0
         }
 
 class Lesson(db.Model):
     __tablename__ = 'lessons'
+    __table_args__ = (
+        db.Index('ix_lessons_course_order', 'course_id', 'lesson_order'),
+    )
     lesson_id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.course_id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.course_id', ondelete='CASCADE'), nullable=False)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     lesson_order = db.Column(db.Integer, nullable=False)
+    progress_slot = db.Column(db.Integer)  # bit of this lesson in enrollment progress bitmaps
     content_path = db.Column(db.String(255))
     lesson_type = db.Column(db.Enum('html', 'video', 'quiz', 'pdf', name='lesson_type'), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    quizzes = db.relationship('Quiz', backref='lesson', lazy=True, cascade='all, delete-orphan')
-    progress = db.relationship('Progress', backref='lesson', lazy=True, cascade='all, delete-orphan')
+    quizzes = db.relationship('Quiz', backref='lesson', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    completions = db.relationship('LessonCompletion', backref='lesson', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -174,16 +206,24 @@ class Lesson(db.Model):
 
 class Enrollment(db.Model):
     __tablename__ = 'enrollments'
+    __table_args__ = (
+        db.Index('ix_enrollments_user_course', 'user_id', 'course_id'),
+        db.Index('ix_enrollments_course_status', 'course_id', 'status'),
+        db.Index('ix_enrollments_date', 'enrollment_date'),
+        db.Index('ix_enrollments_last_lesson', 'last_accessed_lesson_id'),
+    )
     enrollment_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.course_id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.course_id', ondelete='CASCADE'), nullable=False)
     enrollment_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     completion_date = db.Column(db.DateTime)
     status = db.Column(db.Enum('in_progress', 'completed', 'dropped', name='enrollment_status'), nullable=False)
-    last_accessed_lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.lesson_id'))
+    last_accessed_lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.lesson_id', ondelete='SET NULL'))
+    progress_bitmap = db.Column(db.LargeBinary)  # completed lesson slots, little-endian
+    completed_lessons = db.Column(db.Integer, nullable=False, default=0)  # bits of current lessons set
     
     # Relationships
-    progress = db.relationship('Progress', backref='enrollment', lazy=True, cascade='all, delete-orphan')
+    completions = db.relationship('LessonCompletion', backref='enrollment', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -196,35 +236,32 @@ class Enrollment(db.Model):
             'last_accessed_lesson_id': self.last_accessed_lesson_id
         }
 
-class Progress(db.Model):
-    __tablename__ = 'progress'
-    progress_id = db.Column(db.Integer, primary_key=True)
-    enrollment_id = db.Column(db.Integer, db.ForeignKey('enrollments.enrollment_id'), nullable=False)
-    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.lesson_id'), nullable=False)
-    is_completed = db.Column(db.Boolean, nullable=False, default=False)
+class LessonCompletion(db.Model):
+    __tablename__ = 'lesson_completions'
+    __table_args__ = (
+        db.Index('ix_lesson_completions_lesson', 'lesson_id'),
+    )
+    enrollment_id = db.Column(db.Integer, db.ForeignKey('enrollments.enrollment_id', ondelete='CASCADE'), primary_key=True)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.lesson_id', ondelete='CASCADE'), primary_key=True)
     completion_date = db.Column(db.DateTime)
-    
-    def to_dict(self):
-        return {
-            'progress_id': self.progress_id,
-            'enrollment_id': self.enrollment_id,
-            'lesson_id': self.lesson_id,
-            'is_completed': self.is_completed,
-            'completion_date': self.completion_date.isoformat() if self.completion_date else None
-        }
 
 class Quiz(db.Model):
     __tablename__ = 'quizzes'
+    __table_args__ = (
+        db.Index('ix_quizzes_lesson', 'lesson_id'),
+    )
     quiz_id = db.Column(db.Integer, primary_key=True)
-    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.lesson_id'), nullable=False)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.lesson_id', ondelete='CASCADE'), nullable=False)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     passing_score = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    content_version = db.Column(db.Integer, nullable=False, default=0)
+    content_modified_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
-    questions = db.relationship('Question', backref='quiz', lazy=True, cascade='all, delete-orphan')
-    quiz_attempts = db.relationship('QuizAttempt', backref='quiz', lazy=True, cascade='all, delete-orphan')
+    questions = db.relationship('Question', backref='quiz', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    quiz_attempts = db.relationship('QuizAttempt', backref='quiz', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -238,15 +275,18 @@ class Quiz(db.Model):
 
 class Question(db.Model):
     __tablename__ = 'questions'
+    __table_args__ = (
+        db.Index('ix_questions_quiz', 'quiz_id'),
+    )
     question_id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.quiz_id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.quiz_id', ondelete='CASCADE'), nullable=False)
     question_text = db.Column(db.Text, nullable=False)
     question_type = db.Column(db.Enum('multiple_choice', 'true_false', 'short_answer', name='question_type'), nullable=False)
     correct_answer = db.Column(db.Text)
     
     # Relationships
-    options = db.relationship('Option', backref='question', lazy=True, cascade='all, delete-orphan')
-    answers = db.relationship('Answer', backref='question', lazy=True, cascade='all, delete-orphan')
+    options = db.relationship('Option', backref='question', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    answers = db.relationship('Answer', backref='question', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -260,13 +300,16 @@ class Question(db.Model):
 
 class Option(db.Model):
     __tablename__ = 'options'
+    __table_args__ = (
+        db.Index('ix_options_question', 'question_id'),
+    )
     option_id = db.Column(db.Integer, primary_key=True)
-    question_id = db.Column(db.Integer, db.ForeignKey('questions.question_id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.question_id', ondelete='CASCADE'), nullable=False)
     option_text = db.Column(db.String(255), nullable=False)
     is_correct = db.Column(db.Boolean, nullable=False, default=False)
     
     # Relationships
-    answers = db.relationship('Answer', backref='selected_option', lazy=True)
+    answers = db.relationship('Answer', backref='selected_option', lazy=True, passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -278,15 +321,19 @@ class Option(db.Model):
 
 class QuizAttempt(db.Model):
     __tablename__ = 'quiz_attempts'
+    __table_args__ = (
+        db.Index('ix_quiz_attempts_quiz_user', 'quiz_id', 'user_id'),
+        db.Index('ix_quiz_attempts_user', 'user_id'),
+    )
     attempt_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.quiz_id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.quiz_id', ondelete='CASCADE'), nullable=False)
     score = db.Column(db.Numeric(5, 2), nullable=False)
     attempt_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     is_passed = db.Column(db.Boolean, nullable=False, default=False)
     
     # Relationships
-    answers = db.relationship('Answer', backref='attempt', lazy=True, cascade='all, delete-orphan')
+    answers = db.relationship('Answer', backref='attempt', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -300,10 +347,15 @@ class QuizAttempt(db.Model):
 
 class Answer(db.Model):
     __tablename__ = 'answers'
+    __table_args__ = (
+        db.Index('ix_answers_attempt', 'attempt_id'),
+        db.Index('ix_answers_question', 'question_id'),
+        db.Index('ix_answers_option', 'selected_option_id'),
+    )
     answer_id = db.Column(db.Integer, primary_key=True)
-    attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempts.attempt_id'), nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey('questions.question_id'), nullable=False)
-    selected_option_id = db.Column(db.Integer, db.ForeignKey('options.option_id'))
+    attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempts.attempt_id', ondelete='CASCADE'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.question_id', ondelete='CASCADE'), nullable=False)
+    selected_option_id = db.Column(db.Integer, db.ForeignKey('options.option_id', ondelete='SET NULL'))
     answer_text = db.Column(db.Text)
     
     def to_dict(self):
@@ -317,9 +369,13 @@ class Answer(db.Model):
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.Index('ix_reviews_course_user', 'course_id', 'user_id'),
+        db.Index('ix_reviews_user', 'user_id'),
+    )
     review_id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.course_id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.course_id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     rating = db.Column(db.Integer, nullable=False)
     comment = db.Column(db.Text)
     review_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -336,6 +392,9 @@ class Review(db.Model):
 
 class CareerRoadmap(db.Model):
     __tablename__ = 'career_roadmaps'
+    __table_args__ = (
+        db.Index('ix_career_roadmaps_created_by', 'created_by'),
+    )
     roadmap_id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -343,7 +402,7 @@ class CareerRoadmap(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationships
-    roadmap_courses = db.relationship('RoadmapCourse', backref='roadmap', lazy=True, cascade='all, delete-orphan')
+    roadmap_courses = db.relationship('RoadmapCourse', backref='roadmap', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -356,8 +415,11 @@ class CareerRoadmap(db.Model):
 
 class RoadmapCourse(db.Model):
     __tablename__ = 'roadmap_courses'
-    roadmap_id = db.Column(db.Integer, db.ForeignKey('career_roadmaps.roadmap_id'), primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.course_id'), primary_key=True)
+    __table_args__ = (
+        db.Index('ix_roadmap_courses_course', 'course_id'),
+    )
+    roadmap_id = db.Column(db.Integer, db.ForeignKey('career_roadmaps.roadmap_id', ondelete='CASCADE'), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.course_id', ondelete='CASCADE'), primary_key=True)
     order_in_roadmap = db.Column(db.Integer, nullable=False)
     
     def to_dict(self):
@@ -369,16 +431,25 @@ class RoadmapCourse(db.Model):
 
 class ForumTopic(db.Model):
     __tablename__ = 'forum_topics'
+    __table_args__ = (
+        db.Index('ix_forum_topics_sticky_last_post', 'is_sticky', 'last_post_at'),
+        db.Index('ix_forum_topics_user_created', 'user_id', 'created_at'),
+        db.Index('ix_forum_topics_last_poster', 'last_poster_id'),
+    )
     topic_id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     last_post_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     is_sticky = db.Column(db.Boolean, nullable=False, default=False)
     is_locked = db.Column(db.Boolean, nullable=False, default=False)
     
+    # Denormalized counters, maintained by src/models/counters.py
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+    last_poster_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='SET NULL'))
+    
     # Relationships
-    posts = db.relationship('ForumPost', backref='topic', lazy=True, cascade='all, delete-orphan')
+    posts = db.relationship('ForumPost', backref='topic', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -388,20 +459,27 @@ class ForumTopic(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'last_post_at': self.last_post_at.isoformat() if self.last_post_at else None,
             'is_sticky': self.is_sticky,
-            'is_locked': self.is_locked
+            'is_locked': self.is_locked,
+            'post_count': self.post_count or 0,
+            'last_poster_id': self.last_poster_id
         }
 
 class ForumPost(db.Model):
     __tablename__ = 'forum_posts'
+    __table_args__ = (
+        db.Index('ix_forum_posts_topic_created', 'topic_id', 'created_at'),
+        db.Index('ix_forum_posts_parent', 'parent_post_id', 'created_at'),
+        db.Index('ix_forum_posts_user_created', 'user_id', 'created_at'),
+    )
     post_id = db.Column(db.Integer, primary_key=True)
-    topic_id = db.Column(db.Integer, db.ForeignKey('forum_topics.topic_id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    topic_id = db.Column(db.Integer, db.ForeignKey('forum_topics.topic_id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    parent_post_id = db.Column(db.Integer, db.ForeignKey('forum_posts.post_id'))
+    parent_post_id = db.Column(db.Integer, db.ForeignKey('forum_posts.post_id', ondelete='SET NULL'))
     
     # Relationships
-    replies = db.relationship('ForumPost', backref=db.backref('parent_post', remote_side='ForumPost.post_id'), lazy=True)
+    replies = db.relationship('ForumPost', backref=db.backref('parent_post', remote_side='ForumPost.post_id'), lazy=True, passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -415,8 +493,13 @@ class ForumPost(db.Model):
 
 class Vlog(db.Model):
     __tablename__ = 'vlogs'
+    __table_args__ = (
+        db.Index('ix_vlogs_status_upload', 'status', 'upload_date'),
+        db.Index('ix_vlogs_status_views', 'status', 'views'),
+        db.Index('ix_vlogs_user_upload', 'user_id', 'upload_date'),
+    )
     vlog_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     video_url = db.Column(db.String(255), nullable=False)
@@ -440,9 +523,13 @@ class Vlog(db.Model):
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_sender', 'sender_id'),
+        db.Index('ix_messages_receiver', 'receiver_id'),
+    )
     message_id = db.Column(db.Integer, primary_key=True)
-    sender_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
-    receiver_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    receiver_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     subject = db.Column(db.String(255))
     content = db.Column(db.Text, nullable=False)
     sent_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -461,8 +548,11 @@ class Message(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user', 'user_id'),
+    )
     notification_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     type = db.Column(db.String(50), nullable=False)
     message = db.Column(db.Text, nullable=False)
     link = db.Column(db.String(255))
@@ -495,8 +585,12 @@ class Setting(db.Model):
 
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        db.Index('ix_audit_logs_timestamp', 'timestamp'),
+        db.Index('ix_audit_logs_user_timestamp', 'user_id', 'timestamp'),
+    )
     log_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='SET NULL'))
     action = db.Column(db.String(255), nullable=False)
     details = db.Column(db.Text)
     ip_address = db.Column(db.String(45), nullable=False)
@@ -512,3 +606,73 @@ class AuditLog(db.Model):
             'timestamp': self.timestamp.isoformat() if self.timestamp else None
         }
 
+
+class StatsSnapshot(db.Model):
+    __tablename__ = 'stats_snapshots'
+    name = db.Column(db.String(50), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+    build_ms = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyRollup(db.Model):
+    __tablename__ = 'daily_rollups'
+    metric = db.Column(db.String(32), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        db.Index('ix_jobs_finished', 'finished_at'),
+    )
+    job_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments for the task
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed, cancelled
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # due time, pushed back on retry
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    worker = db.Column(db.String(255))
+    schedule = db.Column(db.String(100))  # the periodic schedule that enqueued it
+    checkpoint = db.Column(db.Text)  # JSON progress saved by the task, see src/services/jobs.py
+    result = db.Column(db.Text)  # JSON
+    last_error = db.Column(db.Text)
+    
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'name': self.name,
+            'payload': json.loads(self.payload) if self.payload else {},
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'worker': self.worker,
+            'schedule': self.schedule,
+            'result': json.loads(self.result) if self.result else None,
+            'last_error': self.last_error
+        }
+
+class JobSchedule(db.Model):
+    __tablename__ = 'job_schedules'
+    name = db.Column(db.String(100), primary_key=True)
+    spec = db.Column(db.String(100), nullable=False)  # cron expression
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    last_enqueued_at = db.Column(db.DateTime)
+    last_job_id = db.Column(db.Integer)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'spec': self.spec,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'last_enqueued_at': self.last_enqueued_at.isoformat() if self.last_enqueued_at else None,
+            'last_job_id': self.last_job_id
+        }
@@ -0,0 +1,91 @@
+"""Content versions behind the ETag / Last-Modified validators.
+
+Course.content_version and Quiz.content_version are bumped, together with
+content_modified_at, in the same flush as any change to something their
+detail payloads serialize: the row itself, lessons, reviews, the category,
+the instructor or reviewer profiles, questions and options. Enrollment and
+rating counter changes are bumped by counters.adjust_course. A conditional
+GET can then be answered from one indexed lookup of the version columns.
+Like the counters, bulk query.update()/delete() calls bypass these events.
+"""
+from datetime import datetime
+from sqlalchemy import event, inspect, text
+from src.models.user import Course, Lesson, Review, Category, User, Quiz, Question, Option
+
+VERSION_COLUMNS = {'content_version', 'content_modified_at'}
+# User columns that course payloads embed for the instructor and reviewers.
+# last_login is left out on purpose: bumping on every login would rewrite
+# the user's courses and drop their cached payloads, for a timestamp.
+PROFILE_COLUMNS = {
+    'username', 'email', 'first_name', 'last_name', 'role_id', 'profile_picture', 'bio',
+    'registration_date', 'is_active', 'email_verified'
+}
+
+BUMP = 'content_version = content_version + 1, content_modified_at = :now'
+
+def changed_columns(target):
+    state = inspect(target)
+    columns = state.mapper.column_attrs.keys()
+    return {key for key in columns if state.attrs[key].history.has_changes()}
+
+def touch_courses(connection, where, **params):
+    connection.execute(text(f'UPDATE courses SET {BUMP} WHERE {where}'), dict(params, now=datetime.utcnow()))
+
+def touch_quizzes(connection, where, **params):
+    connection.execute(text(f'UPDATE quizzes SET {BUMP} WHERE {where}'), dict(params, now=datetime.utcnow()))
+
+def bump_in_flush(target, table):
+    # A SQL expression, not a Python increment: counter updates may have
+    # advanced the column since this instance was loaded
+    target.content_version = table.c.content_version + 1
+    target.content_modified_at = datetime.utcnow()
+
+@event.listens_for(Course, 'before_update')
+def course_updated(mapper, connection, target):
+    if changed_columns(target) - VERSION_COLUMNS:
+        bump_in_flush(target, Course.__table__)
+
+@event.listens_for(Quiz, 'before_update')
+def quiz_updated(mapper, connection, target):
+    if changed_columns(target) - VERSION_COLUMNS:
+        bump_in_flush(target, Quiz.__table__)
+
+@event.listens_for(Lesson, 'after_insert')
+@event.listens_for(Lesson, 'after_update')
+@event.listens_for(Lesson, 'after_delete')
+def lesson_changed(mapper, connection, target):
+    touch_courses(connection, 'course_id = :course_id', course_id=target.course_id)
+
+@event.listens_for(Review, 'after_update')
+def review_updated(mapper, connection, target):
+    # Inserts and deletes already bump the course through the rating counters
+    touch_courses(connection, 'course_id = :course_id', course_id=target.course_id)
+
+@event.listens_for(Category, 'after_update')
+def category_updated(mapper, connection, target):
+    touch_courses(connection, 'category_id = :category_id', category_id=target.category_id)
+
+@event.listens_for(User, 'after_update')
+def user_updated(mapper, connection, target):
+    # Course payloads embed the instructor and every reviewer
+    if changed_columns(target) & PROFILE_COLUMNS:
+        touch_courses(
+            connection,
+            'instructor_id = :user_id OR course_id IN (SELECT course_id FROM reviews WHERE user_id = :user_id)',
+            user_id=target.user_id
+        )
+
+@event.listens_for(Question, 'after_insert')
+@event.listens_for(Question, 'after_update')
+@event.listens_for(Question, 'after_delete')
+def question_changed(mapper, connection, target):
+    touch_quizzes(connection, 'quiz_id = :quiz_id', quiz_id=target.quiz_id)
+
+@event.listens_for(Option, 'after_insert')
+@event.listens_for(Option, 'after_update')
+@event.listens_for(Option, 'after_delete')
+def option_changed(mapper, connection, target):
+    touch_quizzes(
+        connection, 'quiz_id = (SELECT quiz_id FROM questions WHERE question_id = :question_id)',
+        question_id=target.question_id
+    )
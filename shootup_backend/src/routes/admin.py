@@ -1,7 +1,22 @@
-from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, Course, Category, Enrollment, QuizAttempt, ForumTopic, ForumPost, Vlog, AuditLog
+from flask import Blueprint, request, jsonify, session, current_app
+from src.models.user import db, User, Role, Course, Category, Enrollment, Lesson, Quiz, QuizAttempt, ForumTopic, ForumPost, Vlog, AuditLog, Job
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+import io
+from sqlalchemy import func, and_, select, case, cast, Float
+from src.models.loaders import serializable
+from src.services.pagination import keyset_paginate, wants_total, decode_cursor, encode_cursor
+from src.services.cache import response_cache, invalidate_cache
+from src.services.view_counter import view_counter
+from src.services.passwords import password_hasher
+from src.services.dashboard_stats import dashboard_stats
+from src.services.analytics import parse_range, get_series, range_info
+from src.services.audit import audit, audit_writer
+from src.services.audit_archive import audit_archive, archived_log, archive_key
+from src.services.export import parse_format, parse_id, parse_date_range, filter_date_range, export_response
+from src.services.user_import import UserImport, detect_format, read_rows, parse_flag, parse_course_ids
+from src.services.bulk_users import BulkUserAction
+from src.services.purge import purger
+from src.services.jobs import job_queue, queue_overview, STATUSES as JOB_STATUSES
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -13,6 +28,18 @@ def require_admin():
         return jsonify({'error': 'Admin access required'}), 403
     return None
 
+def require_staff():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    if session.get('role') not in ('admin', 'instructor'):
+        return jsonify({'error': 'Admin or instructor access required'}), 403
+    return None
+
+def instructor_scope():
+    """The instructor whose courses an export is limited to, or None for admins"""
+    return session['user_id'] if session.get('role') == 'instructor' else None
+
 @admin_bp.route('/dashboard', methods=['GET'])
 def get_dashboard_stats():
     try:
@@ -20,47 +47,13 @@ def get_dashboard_stats():
         if auth_error:
             return auth_error
         
-        # Get basic statistics
-        total_users = User.query.count()
-        total_courses = Course.query.count()
-        total_enrollments = Enrollment.query.count()
-        pending_courses = Course.query.filter_by(status='pending').count()
-        pending_vlogs = Vlog.query.filter_by(status='pending').count()
-        
-        # Get user statistics by role
-        user_stats = db.session.query(
-            User.role.has(role_name='admin').label('is_admin'),
-            User.role.has(role_name='instructor').label('is_instructor'),
-            User.role.has(role_name='learner').label('is_learner'),
-            func.count(User.user_id).label('count')
-        ).group_by(User.role_id).all()
-        
-        # Get recent activity
-        recent_users = User.query.order_by(User.registration_date.desc()).limit(5).all()
-        recent_courses = Course.query.order_by(Course.created_at.desc()).limit(5).all()
-        recent_enrollments = Enrollment.query.order_by(Enrollment.enrollment_date.desc()).limit(5).all()
+        # Served from the materialized snapshot; ?refresh=1 rebuilds it first
+        if request.args.get('refresh') in ('1', 'true'):
+            dashboard_stats.refresh()
+        data, snapshot = dashboard_stats.get_snapshot()
+        data['snapshot'] = snapshot
         
-        # Get monthly enrollment statistics
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        monthly_enrollments = Enrollment.query.filter(
-            Enrollment.enrollment_date >= thirty_days_ago
-        ).count()
-        
-        return jsonify({
-            'stats': {
-                'total_users': total_users,
-                'total_courses': total_courses,
-                'total_enrollments': total_enrollments,
-                'pending_courses': pending_courses,
-                'pending_vlogs': pending_vlogs,
-                'monthly_enrollments': monthly_enrollments
-            },
-            'recent_activity': {
-                'users': [user.to_dict() for user in recent_users],
-                'courses': [course.to_dict() for course in recent_courses],
-                'enrollments': [enrollment.to_dict() for enrollment in recent_enrollments]
-            }
-        }), 200
+        return jsonify(data), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -75,7 +68,17 @@ def get_pending_courses():
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
         
-        courses = Course.query.filter_by(status='pending').order_by(Course.created_at.desc()).paginate(
+        query = serializable(Course.query.filter_by(status='pending'))
+        
+        # Cursor mode: keyset pagination on (created_at, course_id)
+        if 'cursor' in request.args:
+            result = keyset_paginate(
+                query, [(Course.created_at, True), (Course.course_id, True)],
+                request.args.get('cursor'), per_page, include_total=wants_total(request.args)
+            )
+            return jsonify(dict(courses=[course.to_dict() for course in result.items], **result.meta())), 200
+        
+        courses = query.order_by(Course.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
@@ -87,6 +90,8 @@ def get_pending_courses():
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -101,17 +106,11 @@ def approve_course(course_id):
         course.status = 'approved'
         course.updated_at = datetime.utcnow()
         
-        # Log the action
-        log = AuditLog(
-            user_id=session['user_id'],
-            action='approve_course',
-            details=f'Approved course: {course.title} (ID: {course_id})',
-            ip_address=request.remote_addr,
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(log)
-        
         db.session.commit()
+        invalidate_cache('courses', f'course:{course_id}')
+        
+        # Log the action
+        audit('approve_course', f'Approved course: {course.title} (ID: {course_id})')
         
         return jsonify({
             'message': 'Course approved successfully',
@@ -136,17 +135,11 @@ def reject_course(course_id):
         course.status = 'rejected'
         course.updated_at = datetime.utcnow()
         
-        # Log the action
-        log = AuditLog(
-            user_id=session['user_id'],
-            action='reject_course',
-            details=f'Rejected course: {course.title} (ID: {course_id}). Reason: {reason}',
-            ip_address=request.remote_addr,
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(log)
-        
         db.session.commit()
+        invalidate_cache('courses', f'course:{course_id}')
+        
+        # Log the action
+        audit('reject_course', f'Rejected course: {course.title} (ID: {course_id}). Reason: {reason}')
         
         return jsonify({
             'message': 'Course rejected successfully',
@@ -164,16 +157,13 @@ def get_user_analytics():
         if auth_error:
             return auth_error
         
-        # User registration trends (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        daily_registrations = db.session.query(
-            func.date(User.registration_date).label('date'),
-            func.count(User.user_id).label('count')
-        ).filter(
-            User.registration_date >= thirty_days_ago
-        ).group_by(
-            func.date(User.registration_date)
-        ).all()
+        try:
+            start, end, granularity = parse_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Registration and login trends from the daily rollups
+        series = get_series(['registrations', 'logins'], start, end, granularity)
         
         # User activity (last login)
         active_users_7d = User.query.filter(
@@ -186,15 +176,14 @@ def get_user_analytics():
         
         # Users by role
         users_by_role = db.session.query(
-            User.role.has().label('role_name'),
+            Role.role_name,
             func.count(User.user_id).label('count')
-        ).group_by(User.role_id).all()
+        ).join(User, User.role_id == Role.role_id).group_by(Role.role_name).all()
         
         return jsonify({
-            'daily_registrations': [
-                {'date': str(reg.date), 'count': reg.count}
-                for reg in daily_registrations
-            ],
+            'range': range_info(start, end, granularity),
+            'daily_registrations': series['registrations'],
+            'logins': series['logins'],
             'active_users': {
                 'last_7_days': active_users_7d,
                 'last_30_days': active_users_30d
@@ -215,16 +204,13 @@ def get_course_analytics():
         if auth_error:
             return auth_error
         
-        # Course creation trends
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        daily_courses = db.session.query(
-            func.date(Course.created_at).label('date'),
-            func.count(Course.course_id).label('count')
-        ).filter(
-            Course.created_at >= thirty_days_ago
-        ).group_by(
-            func.date(Course.created_at)
-        ).all()
+        try:
+            start, end, granularity = parse_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Course creation trends from the daily rollups
+        series = get_series(['course_creations'], start, end, granularity)
         
         # Courses by category
         courses_by_category = db.session.query(
@@ -241,16 +227,14 @@ def get_course_analytics():
         # Most popular courses (by enrollment)
         popular_courses = db.session.query(
             Course.title,
-            func.count(Enrollment.enrollment_id).label('enrollment_count')
-        ).join(Enrollment).group_by(Course.course_id).order_by(
-            func.count(Enrollment.enrollment_id).desc()
+            Course.enrollment_count
+        ).filter(Course.enrollment_count > 0).order_by(
+            Course.enrollment_count.desc()
         ).limit(10).all()
         
         return jsonify({
-            'daily_courses': [
-                {'date': str(course.date), 'count': course.count}
-                for course in daily_courses
-            ],
+            'range': range_info(start, end, granularity),
+            'daily_courses': series['course_creations'],
             'courses_by_category': [
                 {'category': cat.category_name, 'count': cat.count}
                 for cat in courses_by_category
@@ -275,33 +259,27 @@ def get_enrollment_analytics():
         if auth_error:
             return auth_error
         
-        # Enrollment trends
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        daily_enrollments = db.session.query(
-            func.date(Enrollment.enrollment_date).label('date'),
-            func.count(Enrollment.enrollment_id).label('count')
-        ).filter(
-            Enrollment.enrollment_date >= thirty_days_ago
-        ).group_by(
-            func.date(Enrollment.enrollment_date)
-        ).all()
-        
-        # Completion rates
-        total_enrollments = Enrollment.query.count()
-        completed_enrollments = Enrollment.query.filter_by(status='completed').count()
-        completion_rate = (completed_enrollments / total_enrollments * 100) if total_enrollments > 0 else 0
+        try:
+            start, end, granularity = parse_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Enrollments by status
+        # Enrollment and completion trends from the daily rollups
+        series = get_series(['enrollments', 'completions'], start, end, granularity)
+        
+        # Enrollments by status, which also give the completion rate
         enrollments_by_status = db.session.query(
             Enrollment.status,
             func.count(Enrollment.enrollment_id).label('count')
         ).group_by(Enrollment.status).all()
+        total_enrollments = sum(status.count for status in enrollments_by_status)
+        completed_enrollments = sum(status.count for status in enrollments_by_status if status.status == 'completed')
+        completion_rate = (completed_enrollments / total_enrollments * 100) if total_enrollments > 0 else 0
         
         return jsonify({
-            'daily_enrollments': [
-                {'date': str(enroll.date), 'count': enroll.count}
-                for enroll in daily_enrollments
-            ],
+            'range': range_info(start, end, granularity),
+            'daily_enrollments': series['enrollments'],
+            'daily_completions': series['completions'],
             'completion_rate': completion_rate,
             'enrollments_by_status': [
                 {'status': status.status, 'count': status.count}
@@ -324,6 +302,9 @@ def get_audit_logs():
         action_filter = request.args.get('action')
         user_id_filter = request.args.get('user_id')
         
+        # Entries queued by this process become visible now; other workers' within a flush interval
+        audit_writer.flush()
+        
         query = AuditLog.query
         
         # Filter by action
@@ -331,9 +312,41 @@ def get_audit_logs():
             query = query.filter(AuditLog.action.contains(action_filter))
         
         # Filter by user
+        archive_user_id = None
         if user_id_filter:
+            archive_user_id = parse_id(request.args, 'user_id')
             query = query.filter(AuditLog.user_id == user_id_filter)
         
+        # Archived months are older than every live row, so in both modes they
+        # continue the newest-first listing once the live table runs out
+        
+        # Cursor mode: keyset pagination on (timestamp, log_id)
+        if 'cursor' in request.args:
+            cursor = request.args.get('cursor')
+            result = keyset_paginate(
+                query, [(AuditLog.timestamp, True), (AuditLog.log_id, True)],
+                cursor, per_page, include_total=wants_total(request.args)
+            )
+            logs = [log.to_dict() for log in result.items]
+            meta = result.meta()
+            if result.next_cursor is None:
+                # Live rows exhausted: continue after the last row listed so far
+                room = result.per_page - len(logs)
+                if result.items:
+                    before = [result.items[-1].timestamp, result.items[-1].log_id]
+                else:
+                    before = decode_cursor(cursor, 2) if cursor else None
+                archived = audit_archive.query(action_filter, archive_user_id, archive_key(before), limit=room + 1)
+                logs += [archived_log(row) for row in archived[:room]]
+                if len(archived) > room:
+                    last = logs[-1]
+                    meta['next_cursor'] = encode_cursor([datetime.fromisoformat(last['timestamp']), last['log_id']])
+                    meta['has_more'] = True
+            if 'total' in meta:
+                meta['total'] += audit_archive.count(action_filter, archive_user_id)
+                meta['pages'] = -(-meta['total'] // result.per_page)
+            return jsonify(dict(logs=logs, **meta)), 200
+        
         # Order by timestamp
         query = query.order_by(AuditLog.timestamp.desc())
         
@@ -341,15 +354,167 @@ def get_audit_logs():
         logs = query.paginate(
             page=page, per_page=per_page, error_out=False
         )
+        items = [log.to_dict() for log in logs.items]
+        archived_total = audit_archive.count(action_filter, archive_user_id)
+        if len(items) < per_page and archived_total:
+            offset = max(0, (page - 1) * per_page - logs.total)
+            archived = audit_archive.query(action_filter, archive_user_id, offset=offset, limit=per_page - len(items))
+            items += [archived_log(row) for row in archived]
+        total = logs.total + archived_total
         
         return jsonify({
-            'logs': [log.to_dict() for log in logs.items],
-            'total': logs.total,
-            'pages': logs.pages,
+            'logs': items,
+            'total': total,
+            'pages': -(-total // per_page) if per_page else 0,
             'current_page': page,
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/export/enrollments', methods=['GET'])
+def export_enrollments():
+    try:
+        auth_error = require_staff()
+        if auth_error:
+            return auth_error
+        
+        try:
+            fmt = parse_format(request.args)
+            course_id = parse_id(request.args, 'course_id')
+            user_id = parse_id(request.args, 'user_id')
+            start, end = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        status = request.args.get('status')
+        if status and status not in Enrollment.status.type.enums:
+            return jsonify({'error': f"status must be one of: {', '.join(Enrollment.status.type.enums)}"}), 400
+        
+        # Exports stream Core rows, which src/models/soft_delete.py does not
+        # filter, so soft-deleted courses and users are excluded here
+        statement = select(
+            Enrollment.enrollment_id, Enrollment.user_id, User.username, User.email,
+            Enrollment.course_id, Course.title.label('course_title'), Enrollment.status,
+            Enrollment.enrollment_date, Enrollment.completion_date,
+            Enrollment.completed_lessons, Course.lesson_count.label('total_lessons'),
+            case(
+                (Course.lesson_count > 0, func.round(cast(Enrollment.completed_lessons, Float) * 100 / Course.lesson_count, 1)),
+                else_=0
+            ).label('progress_percentage')
+        ).join(User, User.user_id == Enrollment.user_id).join(Course, Course.course_id == Enrollment.course_id) \
+         .where(User.deleted_at.is_(None), Course.deleted_at.is_(None))
+        
+        if instructor_scope() is not None:
+            statement = statement.where(Course.instructor_id == instructor_scope())
+        if course_id is not None:
+            statement = statement.where(Enrollment.course_id == course_id)
+        if user_id is not None:
+            statement = statement.where(Enrollment.user_id == user_id)
+        if status:
+            statement = statement.where(Enrollment.status == status)
+        statement = filter_date_range(statement, Enrollment.enrollment_date, start, end)
+        
+        # Grouped by course in ix_enrollments_course_status order, so SQLite streams
+        # rows without sorting; scoped to an instructor the courses table drives the loop
+        course_key = Course.course_id if instructor_scope() is not None else Enrollment.course_id
+        statement = statement.order_by(course_key, Enrollment.status, Enrollment.enrollment_id)
+        
+        return export_response(statement, fmt, 'enrollments')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/export/quiz-attempts', methods=['GET'])
+def export_quiz_attempts():
+    try:
+        auth_error = require_staff()
+        if auth_error:
+            return auth_error
+        
+        try:
+            fmt = parse_format(request.args)
+            course_id = parse_id(request.args, 'course_id')
+            quiz_id = parse_id(request.args, 'quiz_id')
+            user_id = parse_id(request.args, 'user_id')
+            start, end = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        status = request.args.get('status')
+        if status and status not in ('passed', 'failed'):
+            return jsonify({'error': 'status must be one of: passed, failed'}), 400
+        
+        # The gradebook: one row per attempt with the learner, quiz and course,
+        # leaving out soft-deleted ones as the Core rows are not filtered for us
+        statement = select(
+            QuizAttempt.attempt_id, QuizAttempt.user_id, User.username,
+            Lesson.course_id, Course.title.label('course_title'), Quiz.lesson_id,
+            QuizAttempt.quiz_id, Quiz.title.label('quiz_title'),
+            QuizAttempt.score, Quiz.passing_score, QuizAttempt.is_passed, QuizAttempt.attempt_date
+        ).join(User, User.user_id == QuizAttempt.user_id) \
+         .join(Quiz, Quiz.quiz_id == QuizAttempt.quiz_id) \
+         .join(Lesson, Lesson.lesson_id == Quiz.lesson_id) \
+         .join(Course, Course.course_id == Lesson.course_id) \
+         .where(User.deleted_at.is_(None), Course.deleted_at.is_(None))
+        
+        if instructor_scope() is not None:
+            statement = statement.where(Course.instructor_id == instructor_scope())
+        if course_id is not None:
+            statement = statement.where(Lesson.course_id == course_id)
+        if quiz_id is not None:
+            statement = statement.where(QuizAttempt.quiz_id == quiz_id)
+        if user_id is not None:
+            statement = statement.where(QuizAttempt.user_id == user_id)
+        if status:
+            statement = statement.where(QuizAttempt.is_passed == (status == 'passed'))
+        statement = filter_date_range(statement, QuizAttempt.attempt_date, start, end)
+        
+        # Orders that follow the indexes, so SQLite streams rows without sorting:
+        # course-scoped exports in curriculum order, the rest by quiz and learner
+        if course_id is not None or instructor_scope() is not None:
+            statement = statement.order_by(Course.course_id, Lesson.lesson_order, Lesson.lesson_id,
+                                           Quiz.quiz_id, QuizAttempt.user_id, QuizAttempt.attempt_id)
+        else:
+            statement = statement.order_by(QuizAttempt.quiz_id, QuizAttempt.user_id, QuizAttempt.attempt_id)
+        
+        return export_response(statement, fmt, 'quiz-attempts')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/export/audit-logs', methods=['GET'])
+def export_audit_logs():
+    try:
+        auth_error = require_admin()
+        if auth_error:
+            return auth_error
+        
+        try:
+            fmt = parse_format(request.args)
+            user_id = parse_id(request.args, 'user_id')
+            start, end = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        action_filter = request.args.get('action')
+        audit_writer.flush()
+        
+        statement = select(
+            AuditLog.log_id, AuditLog.timestamp, AuditLog.user_id, User.username,
+            AuditLog.action, AuditLog.details, AuditLog.ip_address
+        ).outerjoin(User, User.user_id == AuditLog.user_id)
+        
+        if action_filter:
+            statement = statement.where(AuditLog.action.contains(action_filter))
+        if user_id is not None:
+            statement = statement.where(AuditLog.user_id == user_id)
+        statement = filter_date_range(statement, AuditLog.timestamp, start, end)
+        
+        # Archived months first: they are older than every live row
+        archived = audit_archive.iter_rows(action_filter, user_id, start, end)
+        return export_response(statement.order_by(AuditLog.timestamp, AuditLog.log_id), fmt, 'audit-logs', archived)
+        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -360,22 +525,32 @@ def get_system_health():
         if auth_error:
             return auth_error
         
-        # Database connection test
+        # Reading the dashboard snapshot doubles as the database connection test
         try:
-            db.session.execute('SELECT 1')
+            dashboard, snapshot = dashboard_stats.get_snapshot()
             db_status = 'healthy'
         except Exception:
+            db.session.rollback()
+            dashboard, snapshot = {'stats': {}}, None
             db_status = 'unhealthy'
         
         # Get system statistics
         stats = {
             'database_status': db_status,
-            'total_users': User.query.count(),
+            'total_users': dashboard['stats'].get('total_users'),
             'active_sessions': 1,  # Simplified for this implementation
             'pending_approvals': {
-                'courses': Course.query.filter_by(status='pending').count(),
-                'vlogs': Vlog.query.filter_by(status='pending').count()
+                'courses': dashboard['stats'].get('pending_courses'),
+                'vlogs': dashboard['stats'].get('pending_vlogs')
             },
+            'dashboard_snapshot': snapshot,
+            'dashboard_stats_refresher': dashboard_stats.get_stats(),
+            'vlog_view_buffer': view_counter.get_stats(),
+            'audit_writer': audit_writer.get_stats(),
+            'audit_archive': audit_archive.get_stats(),
+            'password_hasher': password_hasher.get_stats(),
+            'purger': purger.get_stats(),
+            'job_queue': job_queue.get_stats(),
             'system_uptime': '24h',  # Simplified for this implementation
             'last_backup': 'N/A'  # Would be implemented with actual backup system
         }
@@ -389,6 +564,74 @@ def get_system_health():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/cache', methods=['GET'])
+def get_cache_stats():
+    try:
+        auth_error = require_admin()
+        if auth_error:
+            return auth_error
+        
+        # Hit/miss counters are per worker process; entry counts are shared
+        return jsonify({'cache': response_cache.get_stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/cache', methods=['DELETE'])
+def clear_cache():
+    try:
+        auth_error = require_admin()
+        if auth_error:
+            return auth_error
+        
+        response_cache.clear()
+        response_cache.reset_stats()
+        
+        return jsonify({'message': 'Response cache cleared'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/import/users', methods=['POST'])
+def import_users():
+    try:
+        auth_error = require_admin()
+        if auth_error:
+            return auth_error
+        
+        # The file is either a multipart upload named "file" or the raw request body
+        upload = request.files.get('file')
+        try:
+            fmt = detect_format(
+                request.args.get('format'),
+                upload.filename if upload else None,
+                upload.content_type if upload else request.content_type
+            )
+            importer = UserImport(
+                default_role=request.args.get('role', 'learner'),
+                course_ids=parse_course_ids(request.args.get('course_ids')),
+                chunk_size=current_app.config.get('IMPORT_CHUNK_SIZE', 1000),
+                dry_run=parse_flag(request.args.get('dry_run'), False),
+                max_errors=current_app.config.get('IMPORT_MAX_REPORTED_ERRORS', 1000)
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        stream = upload.stream if upload else io.BufferedReader(request.stream)
+        report = importer.run(read_rows(stream, fmt))
+        
+        if importer.enrolled_course_ids:
+            invalidate_cache('courses', *(f'course:{course_id}' for course_id in importer.enrolled_course_ids))
+        if not importer.dry_run:
+            audit('bulk_import_users', f"Imported {report['created']} users with {report['enrolled']} enrollments; "
+                                       f"{report['failed']} of {report['rows']} rows rejected")
+        
+        return jsonify(report), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/bulk-actions/users', methods=['POST'])
 def bulk_user_actions():
     try:
@@ -396,44 +639,174 @@ def bulk_user_actions():
         if auth_error:
             return auth_error
         
-        data = request.get_json()
-        action = data.get('action')
-        user_ids = data.get('user_ids', [])
-        
-        if not action or not user_ids:
-            return jsonify({'error': 'Action and user IDs are required'}), 400
-        
-        users = User.query.filter(User.user_id.in_(user_ids)).all()
-        
-        if action == 'activate':
-            for user in users:
-                user.is_active = True
-        elif action == 'deactivate':
-            for user in users:
-                user.is_active = False
-        elif action == 'verify_email':
-            for user in users:
-                user.email_verified = True
-        else:
-            return jsonify({'error': 'Invalid action'}), 400
+        data = request.get_json() or {}
+        try:
+            bulk_action = BulkUserAction(
+                data.get('action'),
+                user_ids=data.get('user_ids'),
+                user_filter=data.get('filter'),
+                role=data.get('role'),
+                actor_id=session['user_id'],
+                dry_run=parse_flag(data.get('dry_run'), False),
+                chunk_size=current_app.config.get('BULK_ACTION_CHUNK_SIZE', 500)
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Deferred: validated now, applied by a background job
+        if parse_flag(data.get('async'), False) and not bulk_action.dry_run:
+            job_id = job_queue.enqueue('bulk_user_action', {
+                'action': bulk_action.action,
+                'user_ids': data.get('user_ids'),
+                'user_filter': data.get('filter'),
+                'role': data.get('role'),
+                'actor_id': session['user_id'],
+                'chunk_size': bulk_action.chunk_size,
+                'ip_address': request.remote_addr
+            })
+            return jsonify({'message': 'Bulk action queued', 'job_id': job_id}), 202
+        
+        result = bulk_action.run()
+        
+        # One summary entry for the whole action
+        if not bulk_action.dry_run:
+            audit(f"bulk_{result['action']}_users", bulk_action.summary())
+        
+        return jsonify(dict(result, message=bulk_action.summary())), 200
         
-        # Log the action
-        log = AuditLog(
-            user_id=session['user_id'],
-            action=f'bulk_{action}_users',
-            details=f'Applied {action} to {len(users)} users',
-            ip_address=request.remote_addr,
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(log)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/notifications/broadcast', methods=['POST'])
+def broadcast_notification():
+    try:
+        auth_error = require_admin()
+        if auth_error:
+            return auth_error
+        
+        data = request.get_json() or {}
+        message = (data.get('message') or '').strip()
+        if not message:
+            return jsonify({'error': 'message is required'}), 400
+        role = data.get('role')
+        if role is not None and not Role.query.filter_by(role_name=role).first():
+            return jsonify({'error': f'Invalid role: {role}'}), 400
+        
+        # One notification row per recipient is written by a background job
+        job_id = job_queue.enqueue('notify_users', {
+            'message': message,
+            'type': data.get('type') or 'announcement',
+            'link': data.get('link'),
+            'role': role
+        })
+        audit('broadcast_notification', f"Queued notification to {role or 'all'} users as job {job_id}")
+        
+        return jsonify({'message': 'Notification queued', 'job_id': job_id}), 202
         
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    try:
+        auth_error = require_admin()
+        if auth_error:
+            return auth_error
+        
+        per_page = min(int(request.args.get('per_page', 20)), 100)
+        hours = int(request.args.get('hours', 24))
+        status = request.args.get('status')
+        name = request.args.get('name')
+        if status and status not in JOB_STATUSES:
+            return jsonify({'error': f"status must be one of: {', '.join(JOB_STATUSES)}"}), 400
+        
+        query = Job.query
+        if status:
+            query = query.filter(Job.status == status)
+        if name:
+            query = query.filter(Job.name == name)
+        result = keyset_paginate(query, [(Job.job_id, True)], request.args.get('cursor'), per_page)
+        
+        return jsonify(dict(
+            queue_overview(hours),
+            workers=job_queue.get_stats(),
+            jobs=[job.to_dict() for job in result.items],
+            **result.meta()
+        )), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/jobs', methods=['POST'])
+def create_job():
+    try:
+        auth_error = require_admin()
+        if auth_error:
+            return auth_error
+        
+        data = request.get_json() or {}
+        try:
+            job_id = job_queue.enqueue(data.get('name'), data.get('payload'), delay=int(data.get('delay', 0)))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        audit('enqueue_job', f"Queued job {job_id} ({data.get('name')})")
+        
+        return jsonify({'message': 'Job queued', 'job': db.session.get(Job, job_id).to_dict()}), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/jobs/<int:job_id>/retry', methods=['POST'])
+def retry_job(job_id):
+    try:
+        auth_error = require_admin()
+        if auth_error:
+            return auth_error
+        
+        job = Job.query.get_or_404(job_id)
+        if job.status not in ('failed', 'cancelled'):
+            return jsonify({'error': 'Only failed or cancelled jobs can be retried'}), 400
+        
+        job.status = 'queued'
+        job.attempts = 0
+        job.run_at = datetime.utcnow()
+        job.finished_at = None
+        job.worker = None
         db.session.commit()
+        job_queue.wake()
+        audit('retry_job', f'Requeued job {job_id} ({job.name})')
         
-        return jsonify({
-            'message': f'Successfully applied {action} to {len(users)} users'
-        }), 200
+        return jsonify({'message': 'Job requeued', 'job': job.to_dict()}), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/jobs/<int:job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    try:
+        auth_error = require_admin()
+        if auth_error:
+            return auth_error
+        
+        # Only a job no worker has claimed yet can be cancelled
+        cancelled = db.session.execute(
+            Job.__table__.update().where(Job.job_id == job_id, Job.status == 'queued')
+            .values(status='cancelled', finished_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if not cancelled:
+            job = Job.query.get_or_404(job_id)
+            return jsonify({'error': f'Job is {job.status}, not queued'}), 400
+        audit('cancel_job', f'Cancelled job {job_id}')
+        
+        return jsonify({'message': 'Job cancelled'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
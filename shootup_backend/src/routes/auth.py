@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, User, Role
+from src.services.passwords import password_hasher
 from datetime import datetime
 import secrets
 
@@ -72,6 +73,11 @@ def login():
         if not user.is_active:
             return jsonify({'error': 'Account is deactivated'}), 401
         
+        # Upgrade a hash made under an older cost policy while the password is at hand
+        if password_hasher.needs_rehash(user.password_hash):
+            user.set_password(data['password'])
+            password_hasher.count_rehash()
+        
         # Update last login
         user.last_login = datetime.utcnow()
         db.session.commit()
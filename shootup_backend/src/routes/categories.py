@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, Category
+from src.services.cache import cached_response, invalidate_cache
 
 categories_bp = Blueprint('categories', __name__)
 
@@ -18,6 +19,7 @@ def require_role(allowed_roles):
     return None
 
 @categories_bp.route('/', methods=['GET'])
+@cached_response(tags=('categories',))
 def get_categories():
     try:
         categories = Category.query.all()
@@ -29,6 +31,7 @@ def get_categories():
         return jsonify({'error': str(e)}), 500
 
 @categories_bp.route('/<int:category_id>', methods=['GET'])
+@cached_response(tags=('categories',))
 def get_category(category_id):
     try:
         category = Category.query.get_or_404(category_id)
@@ -64,6 +67,7 @@ def create_category():
         
         db.session.add(category)
         db.session.commit()
+        invalidate_cache('categories')
         
         return jsonify({
             'message': 'Category created successfully',
@@ -99,6 +103,7 @@ def update_category(category_id):
             category.icon_class = data['icon_class']
         
         db.session.commit()
+        invalidate_cache('categories', 'courses')
         
         return jsonify({
             'message': 'Category updated successfully',
@@ -124,6 +129,7 @@ def delete_category(category_id):
         
         db.session.delete(category)
         db.session.commit()
+        invalidate_cache('categories')
         
         return jsonify({'message': 'Category deleted successfully'}), 200
         
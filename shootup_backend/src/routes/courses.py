@@ -1,5 +1,12 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, Course, Category, User, Lesson, Enrollment, Review
+from src.models.loaders import serializable, loader_options
+from src.services.progress import with_progress
+from src.services.pagination import keyset_paginate, wants_total
+from src.services.search import search_courses, serialize_courses
+from src.services.cache import cached_response, invalidate_cache
+from src.services.conditional import course_validators, not_modified, add_validators
+from src.services.purge import purger
 from datetime import datetime
 from sqlalchemy import or_, and_
 
@@ -20,6 +27,7 @@ def require_role(allowed_roles):
     return None
 
 @courses_bp.route('/', methods=['GET'])
+@cached_response(tags=('courses',))
 def get_courses():
     try:
         # Get query parameters
@@ -31,7 +39,7 @@ def get_courses():
         featured = request.args.get('featured')
         
         # Build query
-        query = Course.query
+        query = serializable(Course.query)
         
         # Filter by status
         if status:
@@ -45,14 +53,20 @@ def get_courses():
         if featured == 'true':
             query = query.filter(Course.is_featured == True)
         
-        # Search functionality
+        # Search functionality (full-text, ranked by relevance). Ranked results
+        # have no keyset to resume from, so they are paged with page/per_page
+        if search and 'cursor' in request.args:
+            return jsonify({'error': 'cursor cannot be combined with search; use page'}), 400
         if search:
-            query = query.filter(
-                or_(
-                    Course.title.contains(search),
-                    Course.description.contains(search)
-                )
+            query = search_courses(query, search)
+        
+        # Cursor mode: keyset pagination on (created_at, course_id)
+        if 'cursor' in request.args:
+            result = keyset_paginate(
+                query, [(Course.created_at, True), (Course.course_id, True)],
+                request.args.get('cursor'), per_page, include_total=wants_total(request.args)
             )
+            return jsonify(dict(courses=serialize_courses(result.items, search), **result.meta())), 200
         
         # Order by creation date
         query = query.order_by(Course.created_at.desc())
@@ -63,37 +77,36 @@ def get_courses():
         )
         
         return jsonify({
-            'courses': [course.to_dict() for course in courses.items],
+            'courses': serialize_courses(courses.items, search),
             'total': courses.total,
             'pages': courses.pages,
             'current_page': page,
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @courses_bp.route('/<int:course_id>', methods=['GET'])
+@cached_response(tags=('courses', 'course:{course_id}'), anonymous_only=True)
 def get_course(course_id):
     try:
-        course = Course.query.get_or_404(course_id)
+        # Answer revalidation from the version columns before loading anything
+        validators = course_validators(course_id, user_id=session.get('user_id'))
+        response = not_modified(validators)
+        if response:
+            return response
+        
+        course = Course.query.options(*loader_options('course_detail')).get_or_404(course_id)
         
         # Get course details with lessons
         course_data = course.to_dict()
         course_data['lessons'] = [lesson.to_dict() for lesson in course.lessons]
         
-        # Get reviews
-        reviews = Review.query.filter_by(course_id=course_id).all()
-        course_data['reviews'] = [review.to_dict() for review in reviews]
-        
-        # Calculate average rating
-        if reviews:
-            total_rating = sum(review.rating for review in reviews)
-            course_data['average_rating'] = total_rating / len(reviews)
-            course_data['review_count'] = len(reviews)
-        else:
-            course_data['average_rating'] = 0
-            course_data['review_count'] = 0
+        # Get reviews (average_rating/review_count come from the course counters)
+        course_data['reviews'] = [review.to_dict() for review in course.reviews]
         
         # Check if current user is enrolled
         if 'user_id' in session:
@@ -107,7 +120,7 @@ def get_course(course_id):
             course_data['is_enrolled'] = False
             course_data['enrollment_status'] = None
         
-        return jsonify(course_data), 200
+        return add_validators(jsonify(course_data), validators), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -150,6 +163,7 @@ def create_course():
         
         db.session.add(course)
         db.session.commit()
+        invalidate_cache('courses')
         
         return jsonify({
             'message': 'Course created successfully',
@@ -196,6 +210,7 @@ def update_course(course_id):
         
         course.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_cache('courses', f'course:{course_id}')
         
         return jsonify({
             'message': 'Course updated successfully',
@@ -215,8 +230,17 @@ def delete_course(course_id):
         if session.get('role') != 'admin' and course.instructor_id != session.get('user_id'):
             return jsonify({'error': 'Insufficient permissions'}), 403
         
+        # Big courses are hidden now and deleted in batches by the purger
+        if purger.needs_purge('courses', course_id):
+            course.deleted_at = datetime.utcnow()
+            db.session.commit()
+            invalidate_cache('courses', f'course:{course_id}')
+            purger.schedule()
+            return jsonify({'message': 'Course scheduled for deletion', 'purge_pending': True}), 202
+        
         db.session.delete(course)
         db.session.commit()
+        invalidate_cache('courses', f'course:{course_id}')
         
         return jsonify({'message': 'Course deleted successfully'}), 200
         
@@ -227,12 +251,17 @@ def delete_course(course_id):
 @courses_bp.route('/<int:course_id>/lessons', methods=['GET'])
 def get_course_lessons(course_id):
     try:
+        validators = course_validators(course_id, kind='lessons')
+        response = not_modified(validators)
+        if response:
+            return response
+        
         course = Course.query.get_or_404(course_id)
         lessons = Lesson.query.filter_by(course_id=course_id).order_by(Lesson.lesson_order).all()
         
-        return jsonify({
+        return add_validators(jsonify({
             'lessons': [lesson.to_dict() for lesson in lessons]
-        }), 200
+        }), validators), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -268,6 +297,7 @@ def create_lesson(course_id):
         
         db.session.add(lesson)
         db.session.commit()
+        invalidate_cache(f'course:{course_id}')
         
         return jsonify({
             'message': 'Lesson created successfully',
@@ -304,6 +334,7 @@ def update_lesson(course_id, lesson_id):
         
         lesson.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_cache(f'course:{course_id}')
         
         return jsonify({
             'message': 'Lesson updated successfully',
@@ -326,6 +357,7 @@ def delete_lesson(course_id, lesson_id):
         
         db.session.delete(lesson)
         db.session.commit()
+        invalidate_cache(f'course:{course_id}')
         
         return jsonify({'message': 'Lesson deleted successfully'}), 200
         
@@ -336,7 +368,7 @@ def delete_lesson(course_id, lesson_id):
 @courses_bp.route('/<int:course_id>/reviews', methods=['GET'])
 def get_course_reviews(course_id):
     try:
-        reviews = Review.query.filter_by(course_id=course_id).all()
+        reviews = serializable(Review.query.filter_by(course_id=course_id)).all()
         
         return jsonify({
             'reviews': [review.to_dict() for review in reviews]
@@ -386,6 +418,7 @@ def create_review(course_id):
         
         db.session.add(review)
         db.session.commit()
+        invalidate_cache('courses', f'course:{course_id}')
         
         return jsonify({
             'message': 'Review created successfully',
@@ -405,17 +438,20 @@ def get_my_courses():
         
         if session['role'] == 'instructor':
             # Get courses created by instructor
-            courses = Course.query.filter_by(instructor_id=session['user_id']).all()
+            courses = serializable(Course.query.filter_by(instructor_id=session['user_id'])).all()
             return jsonify({
                 'courses': [course.to_dict() for course in courses]
             }), 200
         else:
             # Get enrolled courses for learners
-            enrollments = Enrollment.query.filter_by(user_id=session['user_id']).all()
+            enrollments = with_progress(
+                Enrollment.query.filter_by(user_id=session['user_id']), 'enrollment_with_course'
+            )
             courses = []
-            for enrollment in enrollments:
+            for enrollment, progress in enrollments:
                 course_data = enrollment.course.to_dict()
                 course_data['enrollment'] = enrollment.to_dict()
+                course_data['enrollment'].update(progress)
                 courses.append(course_data)
             
             return jsonify({
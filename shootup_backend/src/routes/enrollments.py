@@ -1,9 +1,16 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, Enrollment, Course, Progress, Lesson
+from src.models.user import db, Enrollment, Course
+from src.services.progress import (
+    serialize_enrollments, get_slot_maps, get_lesson_progress, save_lesson_states,
+    check_course_completed, progress_entry, progress_delta
+)
+from src.services.grading import as_id
 from datetime import datetime
 
 enrollments_bp = Blueprint('enrollments', __name__)
 
+MAX_BATCH_CHANGES = 1000
+
 def require_auth():
     if 'user_id' not in session:
         return jsonify({'error': 'Authentication required'}), 401
@@ -18,6 +25,13 @@ def require_role(allowed_roles):
         return jsonify({'error': 'Insufficient permissions'}), 403
     return None
 
+def parse_completed(data):
+    """is_completed from a progress change: a JSON boolean, true when omitted"""
+    value = data.get('is_completed', True)
+    if not isinstance(value, bool):
+        raise ValueError('is_completed must be true or false')
+    return value
+
 @enrollments_bp.route('/', methods=['GET'])
 def get_enrollments():
     try:
@@ -25,26 +39,10 @@ def get_enrollments():
         if auth_error:
             return auth_error
         
-        # Get user's enrollments
-        enrollments = Enrollment.query.filter_by(user_id=session['user_id']).all()
-        
-        enrollment_data = []
-        for enrollment in enrollments:
-            data = enrollment.to_dict()
-            data['course'] = enrollment.course.to_dict()
-            
-            # Calculate progress
-            total_lessons = Lesson.query.filter_by(course_id=enrollment.course_id).count()
-            completed_lessons = Progress.query.filter_by(
-                enrollment_id=enrollment.enrollment_id,
-                is_completed=True
-            ).count()
-            
-            data['progress_percentage'] = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
-            data['completed_lessons'] = completed_lessons
-            data['total_lessons'] = total_lessons
-            
-            enrollment_data.append(data)
+        # Get user's enrollments with course and progress in one query
+        enrollment_data = serialize_enrollments(
+            Enrollment.query.filter_by(user_id=session['user_id']), include='course'
+        )
         
         return jsonify({
             'enrollments': enrollment_data
@@ -88,19 +86,8 @@ def enroll_course():
             status='in_progress'
         )
         
+        # Progress starts as an empty bitmap, so no per-lesson rows are needed
         db.session.add(enrollment)
-        db.session.flush()  # To get the enrollment ID
-        
-        # Create progress records for all lessons
-        lessons = Lesson.query.filter_by(course_id=data['course_id']).all()
-        for lesson in lessons:
-            progress = Progress(
-                enrollment_id=enrollment.enrollment_id,
-                lesson_id=lesson.lesson_id,
-                is_completed=False
-            )
-            db.session.add(progress)
-        
         db.session.commit()
         
         return jsonify({
@@ -129,8 +116,7 @@ def get_enrollment(enrollment_id):
         data['course'] = enrollment.course.to_dict()
         
         # Get progress details
-        progress_records = Progress.query.filter_by(enrollment_id=enrollment_id).all()
-        data['progress'] = [progress.to_dict() for progress in progress_records]
+        data['progress'] = get_lesson_progress(enrollment)
         
         return jsonify(data), 200
         
@@ -138,7 +124,7 @@ def get_enrollment(enrollment_id):
         return jsonify({'error': str(e)}), 500
 
 @enrollments_bp.route('/<int:enrollment_id>/progress', methods=['POST'])
-def update_lesson_progress():
+def update_lesson_progress(enrollment_id):
     try:
         auth_error = require_auth()
         if auth_error:
@@ -148,54 +134,118 @@ def update_lesson_progress():
         
         if not data.get('lesson_id'):
             return jsonify({'error': 'Lesson ID is required'}), 400
+        try:
+            is_completed = parse_completed(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        enrollment = Enrollment.query.get_or_404(data.get('enrollment_id'))
+        enrollment = Enrollment.query.get_or_404(enrollment_id)
         
         # Check if user owns this enrollment
         if enrollment.user_id != session['user_id']:
             return jsonify({'error': 'Insufficient permissions'}), 403
         
-        # Find progress record
-        progress = Progress.query.filter_by(
-            enrollment_id=enrollment.enrollment_id,
-            lesson_id=data['lesson_id']
-        ).first()
+        # Find the lesson's bit in the course
+        slots, total_lessons = get_slot_maps([enrollment.course_id])[enrollment.course_id]
+        lesson_id = as_id(data['lesson_id'])
         
-        if not progress:
+        if lesson_id not in slots:
             return jsonify({'error': 'Progress record not found'}), 404
         
         # Update progress
-        progress.is_completed = data.get('is_completed', True)
-        if progress.is_completed:
-            progress.completion_date = datetime.utcnow()
-        else:
-            progress.completion_date = None
+        now = datetime.utcnow()
+        completion_date = now if is_completed else None
+        save_lesson_states(enrollment, slots, {lesson_id: is_completed}, now)
         
         # Update last accessed lesson
-        enrollment.last_accessed_lesson_id = data['lesson_id']
+        enrollment.last_accessed_lesson_id = lesson_id
         
         # Check if course is completed
-        total_lessons = Lesson.query.filter_by(course_id=enrollment.course_id).count()
-        completed_lessons = Progress.query.filter_by(
-            enrollment_id=enrollment.enrollment_id,
-            is_completed=True
-        ).count()
-        
-        if completed_lessons == total_lessons:
-            enrollment.status = 'completed'
-            enrollment.completion_date = datetime.utcnow()
+        check_course_completed(enrollment, total_lessons, now)
         
         db.session.commit()
         
         return jsonify({
             'message': 'Progress updated successfully',
-            'progress': progress.to_dict()
+            'progress': progress_entry(enrollment.enrollment_id, lesson_id, is_completed, completion_date)
         }), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@enrollments_bp.route('/progress/batch', methods=['POST'])
+def sync_lesson_progress():
+    try:
+        auth_error = require_auth()
+        if auth_error:
+            return auth_error
+        
+        data = request.get_json() or {}
+        changes = data.get('changes')
+        
+        if not isinstance(changes, list) or not changes:
+            return jsonify({'error': 'Changes are required'}), 400
+        if len(changes) > MAX_BATCH_CHANGES:
+            return jsonify({'error': f'At most {MAX_BATCH_CHANGES} changes per batch'}), 400
+        changes = [change if isinstance(change, dict) else {} for change in changes]
+        
+        # Every enrollment and course lesson map is loaded once for the batch
+        enrollment_ids = {as_id(change.get('enrollment_id')) for change in changes} - {None}
+        enrollments = {
+            enrollment.enrollment_id: enrollment
+            for enrollment in Enrollment.query.filter(Enrollment.enrollment_id.in_(enrollment_ids))
+        }
+        slot_maps = get_slot_maps({enrollment.course_id for enrollment in enrollments.values()})
+        
+        # Later changes to the same lesson win; the last lesson is the last accessed
+        states = {}
+        errors = []
+        for index, change in enumerate(changes):
+            enrollment = enrollments.get(as_id(change.get('enrollment_id')))
+            lesson_id = as_id(change.get('lesson_id'))
+            
+            if enrollment is None:
+                error = 'Enrollment not found'
+            elif enrollment.user_id != session['user_id']:
+                error = 'Insufficient permissions'
+            elif lesson_id not in slot_maps[enrollment.course_id][0]:
+                error = 'Progress record not found'
+            elif not isinstance(change.get('is_completed', True), bool):
+                error = 'is_completed must be true or false'
+            else:
+                lesson_states = states.setdefault(enrollment.enrollment_id, {})
+                lesson_states.pop(lesson_id, None)
+                lesson_states[lesson_id] = parse_completed(change)
+                continue
+            errors.append({'index': index, 'error': error})
+        
+        # One bitmap write per enrollment, however many lessons changed
+        now = datetime.utcnow()
+        deltas = []
+        for enrollment_id in sorted(states):
+            enrollment = enrollments[enrollment_id]
+            slots, total_lessons = slot_maps[enrollment.course_id]
+            save_lesson_states(enrollment, slots, states[enrollment_id], now)
+            enrollment.last_accessed_lesson_id = list(states[enrollment_id])[-1]
+            check_course_completed(enrollment, total_lessons, now)
+            deltas.append(progress_delta(enrollment, total_lessons))
+        
+        db.session.commit()
+        
+        applied = len(changes) - len(errors)
+        return jsonify({
+            'message': f'{applied} of {len(changes)} progress changes applied',
+            'applied': applied,
+            'failed': len(errors),
+            'enrollments': deltas,
+            'errors': errors
+        }), 200 if applied else 400
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @enrollments_bp.route('/<int:enrollment_id>', methods=['PUT'])
 def update_enrollment(enrollment_id):
     try:
@@ -272,25 +322,10 @@ def get_course_enrollments(course_id):
         if course.instructor_id != session['user_id'] and session.get('role') != 'admin':
             return jsonify({'error': 'Insufficient permissions'}), 403
         
-        enrollments = Enrollment.query.filter_by(course_id=course_id).all()
-        
-        enrollment_data = []
-        for enrollment in enrollments:
-            data = enrollment.to_dict()
-            data['user'] = enrollment.user.to_dict()
-            
-            # Calculate progress
-            total_lessons = Lesson.query.filter_by(course_id=course_id).count()
-            completed_lessons = Progress.query.filter_by(
-                enrollment_id=enrollment.enrollment_id,
-                is_completed=True
-            ).count()
-            
-            data['progress_percentage'] = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
-            data['completed_lessons'] = completed_lessons
-            data['total_lessons'] = total_lessons
-            
-            enrollment_data.append(data)
+        # Get learners with progress in one query
+        enrollment_data = serialize_enrollments(
+            Enrollment.query.filter_by(course_id=course_id), include='user'
+        )
         
         return jsonify({
             'enrollments': enrollment_data
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, ForumTopic, ForumPost
+from src.models.loaders import serializable
+from src.services.pagination import keyset_paginate, wants_total
 from datetime import datetime
 
 forum_bp = Blueprint('forum', __name__)
@@ -25,12 +27,20 @@ def get_topics():
         per_page = int(request.args.get('per_page', 10))
         search = request.args.get('search')
         
-        query = ForumTopic.query
+        query = serializable(ForumTopic.query)
         
         # Search functionality
         if search:
             query = query.filter(ForumTopic.title.contains(search))
         
+        # Cursor mode: keyset pagination on (is_sticky, last_post_at, topic_id)
+        if 'cursor' in request.args:
+            result = keyset_paginate(
+                query, [(ForumTopic.is_sticky, True), (ForumTopic.last_post_at, True), (ForumTopic.topic_id, True)],
+                request.args.get('cursor'), per_page, include_total=wants_total(request.args)
+            )
+            return jsonify(dict(topics=[topic.to_dict() for topic in result.items], **result.meta())), 200
+        
         # Order by sticky first, then by last post date
         query = query.order_by(ForumTopic.is_sticky.desc(), ForumTopic.last_post_at.desc())
         
@@ -39,35 +49,42 @@ def get_topics():
             page=page, per_page=per_page, error_out=False
         )
         
-        topic_data = []
-        for topic in topics.items:
-            data = topic.to_dict()
-            # Get post count
-            post_count = ForumPost.query.filter_by(topic_id=topic.topic_id).count()
-            data['post_count'] = post_count
-            topic_data.append(data)
-        
         return jsonify({
-            'topics': topic_data,
+            'topics': [topic.to_dict() for topic in topics.items],
             'total': topics.total,
             'pages': topics.pages,
             'current_page': page,
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @forum_bp.route('/topics/<int:topic_id>', methods=['GET'])
 def get_topic(topic_id):
     try:
-        topic = ForumTopic.query.get_or_404(topic_id)
+        topic = serializable(ForumTopic.query).get_or_404(topic_id)
         
         # Get posts for this topic
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
         
-        posts = ForumPost.query.filter_by(topic_id=topic_id).order_by(ForumPost.created_at.asc()).paginate(
+        posts_query = serializable(ForumPost.query.filter_by(topic_id=topic_id))
+        
+        # Cursor mode: keyset pagination on (created_at, post_id), oldest first
+        if 'cursor' in request.args:
+            result = keyset_paginate(
+                posts_query, [(ForumPost.created_at, False), (ForumPost.post_id, False)],
+                request.args.get('cursor'), per_page, include_total=wants_total(request.args)
+            )
+            topic_data = topic.to_dict()
+            topic_data['posts'] = [post.to_dict() for post in result.items]
+            topic_data.update(result.meta())
+            return jsonify(topic_data), 200
+        
+        posts = posts_query.order_by(ForumPost.created_at.asc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
@@ -80,6 +97,8 @@ def get_topic(topic_id):
         
         return jsonify(topic_data), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -273,7 +292,7 @@ def delete_post(post_id):
 def get_post_replies(post_id):
     try:
         post = ForumPost.query.get_or_404(post_id)
-        replies = ForumPost.query.filter_by(parent_post_id=post_id).order_by(ForumPost.created_at.asc()).all()
+        replies = serializable(ForumPost.query.filter_by(parent_post_id=post_id)).order_by(ForumPost.created_at.asc()).all()
         
         return jsonify({
             'replies': [reply.to_dict() for reply in replies]
@@ -289,18 +308,10 @@ def get_my_topics():
         if auth_error:
             return auth_error
         
-        topics = ForumTopic.query.filter_by(user_id=session['user_id']).order_by(ForumTopic.created_at.desc()).all()
-        
-        topic_data = []
-        for topic in topics:
-            data = topic.to_dict()
-            # Get post count
-            post_count = ForumPost.query.filter_by(topic_id=topic.topic_id).count()
-            data['post_count'] = post_count
-            topic_data.append(data)
+        topics = serializable(ForumTopic.query.filter_by(user_id=session['user_id'])).order_by(ForumTopic.created_at.desc()).all()
         
         return jsonify({
-            'topics': topic_data
+            'topics': [topic.to_dict() for topic in topics]
         }), 200
         
     except Exception as e:
@@ -313,7 +324,9 @@ def get_my_posts():
         if auth_error:
             return auth_error
         
-        posts = ForumPost.query.filter_by(user_id=session['user_id']).order_by(ForumPost.created_at.desc()).all()
+        posts = serializable(
+            ForumPost.query.filter_by(user_id=session['user_id']), 'forum_post_with_topic'
+        ).order_by(ForumPost.created_at.desc()).all()
         
         post_data = []
         for post in posts:
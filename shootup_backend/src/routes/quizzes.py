@@ -1,9 +1,16 @@
-from flask import Blueprint, request, jsonify, session
-from src.models.user import db, Quiz, Question, Option, QuizAttempt, Answer, Lesson, Course
+from flask import Blueprint, request, jsonify, session, current_app
+from src.models.user import db, Quiz, Question, Option, QuizAttempt, Answer, Lesson, Course, User
+from src.services.conditional import quiz_validators, not_modified, add_validators
+from src.services.quiz_payloads import AUTHORING, LEARNER, get_quiz_payload, discard_quiz_payloads
+from src.services.grading import (
+    get_answer_key, get_answer_keys, get_quiz_instructors, parse_attempt_date, save_answers, save_attempts, as_id
+)
 from datetime import datetime
 
 quizzes_bp = Blueprint('quizzes', __name__)
 
+MAX_BATCH_ATTEMPTS = 1000
+
 def require_auth():
     if 'user_id' not in session:
         return jsonify({'error': 'Authentication required'}), 401
@@ -34,24 +41,19 @@ def get_lesson_quizzes(lesson_id):
 @quizzes_bp.route('/<int:quiz_id>', methods=['GET'])
 def get_quiz(quiz_id):
     try:
-        quiz = Quiz.query.get_or_404(quiz_id)
-        quiz_data = quiz.to_dict()
+        # Only admins get the authoring view with the correct answers
+        view = AUTHORING if session.get('role') == 'admin' else LEARNER
+        validators = quiz_validators(quiz_id, include_answers=view == AUTHORING)
+        response = not_modified(validators)
+        if response:
+            return response
         
-        # Get questions with options
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
-        quiz_data['questions'] = []
+        # Pre-encoded payload, rebuilt only when the quiz content changes
+        payload = get_quiz_payload(quiz_id, view, validators.version if validators else None)
+        if payload is None:
+            return jsonify({'error': 'Quiz not found'}), 404
         
-        for question in questions:
-            question_data = question.to_dict()
-            # Don't include correct answers for non-admin users taking the quiz
-            if session.get('role') != 'admin':
-                question_data.pop('correct_answer', None)
-                # Remove is_correct from options
-                for option in question_data.get('options', []):
-                    option.pop('is_correct', None)
-            quiz_data['questions'].append(question_data)
-        
-        return jsonify(quiz_data), 200
+        return add_validators(current_app.response_class(payload, mimetype='application/json'), validators), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -118,6 +120,7 @@ def update_quiz(quiz_id):
             quiz.passing_score = data['passing_score']
         
         db.session.commit()
+        discard_quiz_payloads(quiz_id)
         
         return jsonify({
             'message': 'Quiz updated successfully',
@@ -139,6 +142,7 @@ def delete_quiz(quiz_id):
         
         db.session.delete(quiz)
         db.session.commit()
+        discard_quiz_payloads(quiz_id)
         
         return jsonify({'message': 'Quiz deleted successfully'}), 200
         
@@ -185,6 +189,7 @@ def create_question(quiz_id):
                 db.session.add(option)
         
         db.session.commit()
+        discard_quiz_payloads(quiz_id)
         
         return jsonify({
             'message': 'Question created successfully',
@@ -217,8 +222,9 @@ def update_question(quiz_id, question_id):
         
         # Update options if provided
         if 'options' in data:
-            # Delete existing options
-            Option.query.filter_by(question_id=question_id).delete()
+            # Delete existing options through the ORM, so the quiz version
+            # bumps and cached answer keys and payloads are rebuilt
+            question.options = []
             
             # Create new options
             for option_data in data['options']:
@@ -230,6 +236,7 @@ def update_question(quiz_id, question_id):
                 db.session.add(option)
         
         db.session.commit()
+        discard_quiz_payloads(quiz_id)
         
         return jsonify({
             'message': 'Question updated successfully',
@@ -252,6 +259,7 @@ def delete_question(quiz_id, question_id):
         
         db.session.delete(question)
         db.session.commit()
+        discard_quiz_payloads(quiz_id)
         
         return jsonify({'message': 'Question deleted successfully'}), 200
         
@@ -260,84 +268,51 @@ def delete_question(quiz_id, question_id):
         return jsonify({'error': str(e)}), 500
 
 @quizzes_bp.route('/<int:quiz_id>/attempt', methods=['POST'])
-def submit_quiz_attempt():
+def submit_quiz_attempt(quiz_id):
     try:
         auth_error = require_auth()
         if auth_error:
             return auth_error
         
-        quiz = Quiz.query.get_or_404(quiz_id)
+        # Compiled answer key: one version lookup, rebuilt only after quiz edits
+        answer_key = get_answer_key(quiz_id)
+        if answer_key is None:
+            return jsonify({'error': 'Quiz not found'}), 404
+        
         data = request.get_json()
         
         if not data.get('answers'):
             return jsonify({'error': 'Answers are required'}), 400
         
-        # Calculate score
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
-        total_questions = len(questions)
-        correct_answers = 0
+        # Calculate score in memory
+        try:
+            result = answer_key.grade(data['answers'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Create quiz attempt
         attempt = QuizAttempt(
             user_id=session['user_id'],
             quiz_id=quiz_id,
-            score=0,  # Will be updated after calculation
+            score=result.score,
             attempt_date=datetime.utcnow(),
-            is_passed=False  # Will be updated after calculation
+            is_passed=result.is_passed
         )
         
         db.session.add(attempt)
         db.session.flush()  # To get the attempt ID
         
-        # Process answers and calculate score
-        for answer_data in data['answers']:
-            question = Question.query.get(answer_data['question_id'])
-            if not question:
-                continue
-            
-            # Create answer record
-            answer = Answer(
-                attempt_id=attempt.attempt_id,
-                question_id=answer_data['question_id'],
-                selected_option_id=answer_data.get('selected_option_id'),
-                answer_text=answer_data.get('answer_text')
-            )
-            db.session.add(answer)
-            
-            # Check if answer is correct
-            is_correct = False
-            if question.question_type == 'multiple_choice':
-                if answer_data.get('selected_option_id'):
-                    option = Option.query.get(answer_data['selected_option_id'])
-                    if option and option.is_correct:
-                        is_correct = True
-            elif question.question_type == 'true_false':
-                if answer_data.get('selected_option_id'):
-                    option = Option.query.get(answer_data['selected_option_id'])
-                    if option and option.is_correct:
-                        is_correct = True
-            elif question.question_type == 'short_answer':
-                if (answer_data.get('answer_text') and 
-                    question.correct_answer and
-                    answer_data['answer_text'].lower().strip() == question.correct_answer.lower().strip()):
-                    is_correct = True
-            
-            if is_correct:
-                correct_answers += 1
-        
-        # Calculate final score
-        score = (correct_answers / total_questions * 100) if total_questions > 0 else 0
-        attempt.score = score
-        attempt.is_passed = score >= quiz.passing_score
+        # Store the answers in one bulk insert
+        save_answers(attempt.attempt_id, result.answers)
         
         db.session.commit()
         
         return jsonify({
             'message': 'Quiz attempt submitted successfully',
             'attempt': attempt.to_dict(),
-            'score': score,
-            'correct_answers': correct_answers,
-            'total_questions': total_questions,
+            'score': result.score,
+            'correct_answers': result.correct_answers,
+            'total_questions': result.total_questions,
             'is_passed': attempt.is_passed
         }), 201
         
@@ -345,6 +320,102 @@ def submit_quiz_attempt():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@quizzes_bp.route('/attempts/batch', methods=['POST'])
+def submit_quiz_attempts_batch():
+    try:
+        auth_error = require_auth()
+        if auth_error:
+            return auth_error
+        
+        data = request.get_json() or {}
+        submissions = data.get('attempts')
+        
+        if not isinstance(submissions, list) or not submissions:
+            return jsonify({'error': 'Attempts are required'}), 400
+        if len(submissions) > MAX_BATCH_ATTEMPTS:
+            return jsonify({'error': f'At most {MAX_BATCH_ATTEMPTS} attempts per batch'}), 400
+        submissions = [submission if isinstance(submission, dict) else {} for submission in submissions]
+        
+        # Learners sync their own attempts; instructors and admins may upload
+        # proctored attempts on behalf of learners
+        current_user_id = session['user_id']
+        role = session.get('role')
+        other_user_ids = {
+            as_id(submission.get('user_id')) for submission in submissions
+            if submission.get('user_id') is not None and as_id(submission.get('user_id')) != current_user_id
+        }
+        if other_user_ids and role not in ('admin', 'instructor'):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        # Every quiz's answer key is loaded once for the whole batch
+        answer_keys = get_answer_keys(submission.get('quiz_id') for submission in submissions)
+        instructors = get_quiz_instructors(answer_keys) if other_user_ids and role != 'admin' else {}
+        known_user_ids = {
+            row[0] for row in db.session.query(User.user_id).filter(User.user_id.in_(other_user_ids - {None}))
+        } if other_user_ids else set()
+        
+        now = datetime.utcnow()
+        results = []
+        graded = []
+        for index, submission in enumerate(submissions):
+            result = {'index': index, 'client_ref': submission.get('client_ref')}
+            results.append(result)
+            
+            quiz_id = as_id(submission.get('quiz_id'))
+            user_id = as_id(submission.get('user_id')) if submission.get('user_id') is not None else current_user_id
+            answer_key = answer_keys.get(quiz_id)
+            
+            if answer_key is None:
+                result['error'] = 'Quiz not found'
+            elif not submission.get('answers') or not isinstance(submission['answers'], list):
+                result['error'] = 'Answers are required'
+            elif user_id != current_user_id and user_id not in known_user_ids:
+                result['error'] = 'User not found'
+            elif user_id != current_user_id and role != 'admin' and instructors.get(quiz_id) != current_user_id:
+                result['error'] = 'Insufficient permissions'
+            else:
+                # Invalid attempts are reported here so the valid ones still insert
+                try:
+                    attempt_date = parse_attempt_date(submission.get('attempt_date'), now)
+                    grade = answer_key.grade(submission['answers'])
+                except ValueError as e:
+                    result['error'] = str(e)
+                    continue
+                
+                result.update({
+                    'quiz_id': quiz_id,
+                    'user_id': user_id,
+                    'score': grade.score,
+                    'correct_answers': grade.correct_answers,
+                    'total_questions': grade.total_questions,
+                    'is_passed': grade.is_passed
+                })
+                graded.append((result, {
+                    'user_id': user_id,
+                    'quiz_id': quiz_id,
+                    'score': grade.score,
+                    'attempt_date': attempt_date,
+                    'is_passed': grade.is_passed
+                }, grade.answers))
+        
+        # All attempts and all answers go in as two bulk inserts
+        attempt_ids = save_attempts([(attempt, answers) for result, attempt, answers in graded])
+        for (result, attempt, answers), attempt_id in zip(graded, attempt_ids):
+            result['attempt_id'] = attempt_id
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'{len(graded)} of {len(submissions)} quiz attempts submitted',
+            'created': len(graded),
+            'failed': len(submissions) - len(graded),
+            'results': results
+        }), 201 if graded else 400
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @quizzes_bp.route('/<int:quiz_id>/attempts', methods=['GET'])
 def get_quiz_attempts(quiz_id):
     try:
@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, Role
+from src.models.user import db, User, Role, Course, CareerRoadmap
+from src.models.loaders import serializable
+from src.services.pagination import keyset_paginate, wants_total
+from src.services.purge import purger
 from datetime import datetime
 
 users_bp = Blueprint('users', __name__)
@@ -30,7 +33,7 @@ def get_users():
         role_filter = request.args.get('role')
         search = request.args.get('search')
         
-        query = User.query
+        query = serializable(User.query)
         
         # Filter by role
         if role_filter:
@@ -47,6 +50,14 @@ def get_users():
                 (User.last_name.contains(search))
             )
         
+        # Cursor mode: keyset pagination on (registration_date, user_id)
+        if 'cursor' in request.args:
+            result = keyset_paginate(
+                query, [(User.registration_date, True), (User.user_id, True)],
+                request.args.get('cursor'), per_page, include_total=wants_total(request.args)
+            )
+            return jsonify(dict(users=[user.to_dict() for user in result.items], **result.meta())), 200
+        
         # Paginate
         users = query.paginate(
             page=page, per_page=per_page, error_out=False
@@ -60,6 +71,8 @@ def get_users():
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -156,6 +169,23 @@ def delete_user(user_id):
         if user_id == session['user_id']:
             return jsonify({'error': 'Cannot delete your own account'}), 400
         
+        # Courses and roadmaps are not deleted with their author; reassign or delete them first
+        owned_courses = Course.query.filter_by(instructor_id=user_id).execution_options(include_deleted=True).count()
+        owned_roadmaps = CareerRoadmap.query.filter_by(created_by=user_id).count()
+        if owned_courses or owned_roadmaps:
+            return jsonify({
+                'error': 'User still owns courses or roadmaps',
+                'courses': owned_courses,
+                'roadmaps': owned_roadmaps
+            }), 400
+        
+        # Users with a lot of activity are hidden now and deleted in batches by the purger
+        if purger.needs_purge('users', user_id):
+            user.deleted_at = datetime.utcnow()
+            db.session.commit()
+            purger.schedule()
+            return jsonify({'message': 'User scheduled for deletion', 'purge_pending': True}), 202
+        
         db.session.delete(user)
         db.session.commit()
         
@@ -1,5 +1,10 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, Vlog
+from src.models.loaders import serializable
+from src.services.pagination import keyset_paginate, wants_total
+from src.services.search import search_vlogs, serialize_vlogs
+from src.services.cache import cached_response, invalidate_cache
+from src.services.view_counter import view_counter, with_pending_views
 from datetime import datetime
 
 vlogs_bp = Blueprint('vlogs', __name__)
@@ -27,7 +32,7 @@ def get_vlogs():
         search = request.args.get('search')
         user_id = request.args.get('user_id')
         
-        query = Vlog.query
+        query = serializable(Vlog.query)
         
         # Filter by status (only admins can see pending/rejected vlogs)
         if session.get('role') == 'admin':
@@ -40,12 +45,20 @@ def get_vlogs():
         if user_id:
             query = query.filter(Vlog.user_id == user_id)
         
-        # Search functionality
+        # Search functionality (full-text, ranked by relevance). Ranked results
+        # have no keyset to resume from, so they are paged with page/per_page
+        if search and 'cursor' in request.args:
+            return jsonify({'error': 'cursor cannot be combined with search; use page'}), 400
         if search:
-            query = query.filter(
-                (Vlog.title.contains(search)) |
-                (Vlog.description.contains(search))
+            query = search_vlogs(query, search)
+        
+        # Cursor mode: keyset pagination on (upload_date, vlog_id)
+        if 'cursor' in request.args:
+            result = keyset_paginate(
+                query, [(Vlog.upload_date, True), (Vlog.vlog_id, True)],
+                request.args.get('cursor'), per_page, include_total=wants_total(request.args)
             )
+            return jsonify(dict(vlogs=serialize_vlogs(result.items, search), **result.meta())), 200
         
         # Order by upload date
         query = query.order_by(Vlog.upload_date.desc())
@@ -56,13 +69,15 @@ def get_vlogs():
         )
         
         return jsonify({
-            'vlogs': [vlog.to_dict() for vlog in vlogs.items],
+            'vlogs': serialize_vlogs(vlogs.items, search),
             'total': vlogs.total,
             'pages': vlogs.pages,
             'current_page': page,
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -77,11 +92,10 @@ def get_vlog(vlog_id):
             session.get('role') != 'admin'):
             return jsonify({'error': 'Vlog not found or not accessible'}), 404
         
-        # Increment view count
-        vlog.views += 1
-        db.session.commit()
+        # Count the view in the write-behind buffer instead of committing per read
+        view_counter.increment(vlog_id)
         
-        return jsonify(vlog.to_dict()), 200
+        return jsonify(with_pending_views(vlog.to_dict())), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -115,6 +129,7 @@ def create_vlog():
         
         db.session.add(vlog)
         db.session.commit()
+        invalidate_cache('vlogs')
         
         return jsonify({
             'message': 'Vlog uploaded successfully and is pending approval',
@@ -154,6 +169,7 @@ def update_vlog(vlog_id):
                     vlog.status = data['status']
         
         db.session.commit()
+        invalidate_cache('vlogs')
         
         return jsonify({
             'message': 'Vlog updated successfully',
@@ -175,6 +191,7 @@ def delete_vlog(vlog_id):
         
         db.session.delete(vlog)
         db.session.commit()
+        invalidate_cache('vlogs')
         
         return jsonify({'message': 'Vlog deleted successfully'}), 200
         
@@ -193,7 +210,7 @@ def get_my_vlogs():
         per_page = int(request.args.get('per_page', 10))
         status = request.args.get('status')
         
-        query = Vlog.query.filter_by(user_id=session['user_id'])
+        query = serializable(Vlog.query.filter_by(user_id=session['user_id']))
         
         # Filter by status
         if status:
@@ -228,7 +245,7 @@ def get_pending_vlogs():
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
         
-        vlogs = Vlog.query.filter_by(status='pending').order_by(Vlog.upload_date.desc()).paginate(
+        vlogs = serializable(Vlog.query.filter_by(status='pending')).order_by(Vlog.upload_date.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
@@ -253,6 +270,7 @@ def approve_vlog(vlog_id):
         vlog = Vlog.query.get_or_404(vlog_id)
         vlog.status = 'approved'
         db.session.commit()
+        invalidate_cache('vlogs')
         
         return jsonify({
             'message': 'Vlog approved successfully',
@@ -273,6 +291,7 @@ def reject_vlog(vlog_id):
         vlog = Vlog.query.get_or_404(vlog_id)
         vlog.status = 'rejected'
         db.session.commit()
+        invalidate_cache('vlogs')
         
         return jsonify({
             'message': 'Vlog rejected successfully',
@@ -284,25 +303,39 @@ def reject_vlog(vlog_id):
         return jsonify({'error': str(e)}), 500
 
 @vlogs_bp.route('/popular', methods=['GET'])
+@cached_response(tags=('vlogs',), ttl=5)
 def get_popular_vlogs():
     try:
         limit = int(request.args.get('limit', 10))
         
-        vlogs = Vlog.query.filter_by(status='approved').order_by(Vlog.views.desc()).limit(limit).all()
+        query = serializable(Vlog.query.filter_by(status='approved'))
+        vlogs = query.order_by(Vlog.views.desc()).limit(limit).all()
+        
+        # Merge unflushed views: only a vlog with a pending delta can move
+        # into the stored top `limit`, so those are the only extra candidates
+        pending = view_counter.pending_snapshot()
+        if pending:
+            listed = {vlog.vlog_id for vlog in vlogs}
+            extra_ids = [vlog_id for vlog_id in pending if vlog_id not in listed]
+            if extra_ids:
+                vlogs += query.filter(Vlog.vlog_id.in_(extra_ids)).all()
+            vlogs.sort(key=lambda vlog: (vlog.views or 0) + pending.get(vlog.vlog_id, 0), reverse=True)
+            vlogs = vlogs[:limit]
         
         return jsonify({
-            'vlogs': [vlog.to_dict() for vlog in vlogs]
+            'vlogs': [with_pending_views(vlog.to_dict(), pending) for vlog in vlogs]
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @vlogs_bp.route('/recent', methods=['GET'])
+@cached_response(tags=('vlogs',))
 def get_recent_vlogs():
     try:
         limit = int(request.args.get('limit', 10))
         
-        vlogs = Vlog.query.filter_by(status='approved').order_by(Vlog.upload_date.desc()).limit(limit).all()
+        vlogs = serializable(Vlog.query.filter_by(status='approved')).order_by(Vlog.upload_date.desc()).limit(limit).all()
         
         return jsonify({
             'vlogs': [vlog.to_dict() for vlog in vlogs]
@@ -0,0 +1,231 @@
+"""Buffered audit log writer.
+
+``audit()`` records an admin action without touching the request's
+transaction: the entry (stamped with the time of the call) is queued in
+memory and a background thread bulk-inserts the queue into audit_logs every
+AUDIT_FLUSH_INTERVAL seconds, as soon as AUDIT_BATCH_SIZE entries are
+waiting, and once more at interpreter exit, so a new entry shows up in
+get_audit_logs within about AUDIT_FLUSH_INTERVAL seconds.
+
+With AUDIT_DURABLE, ``audit()`` also appends the entry to a spool segment
+in AUDIT_SPOOL_DIR and fsyncs it before returning. A flush closes the
+current segment and deletes it once its entries are committed, and segments
+left behind by a process that died are replayed by the next writer to
+start, so an entry can be written twice after a crash but is never lost.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from flask import has_request_context, request, session
+from src.models.user import db, AuditLog
+from src.services.background import ProcessLocal, start_thread
+
+# The token tells a restarted process that reuses a PID (PID 1 in a container)
+# apart from the one that wrote the segment
+SPOOL_PATTERN = 'audit-{pid}-{token}-{seq}.jsonl'
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def fsync_directory(path):
+    # Makes a newly created segment's directory entry survive a crash too
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class AuditWriter:
+    def __init__(self, app=None):
+        self.app = None
+        self.buffered = True
+        self.durable = True
+        self.spool_dir = None
+        self.flush_interval = 1
+        self.batch_size = 500
+        self._pending = []
+        self._segment = None  # (path, file) being appended to
+        self._segment_seq = 0
+        self._token = uuid.uuid4().hex[:12]
+        self._closed_segments = []  # segments whose entries are queued for the next flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher = ProcessLocal(lambda: start_thread(self._run, 'audit-log-writer'), on_fork=self._reset)
+        self.stats = {'entries': 0, 'flushes': 0, 'rows_flushed': 0, 'recovered': 0, 'errors': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.buffered = app.config.get('AUDIT_BUFFERED', True)
+        self.durable = app.config.get('AUDIT_DURABLE', True)
+        self.spool_dir = app.config.get('AUDIT_SPOOL_DIR')
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL', 1)
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', 500)
+        app.extensions['audit_writer'] = self
+        atexit.register(self.flush)
+
+    def _reset(self):
+        # The parent's queue and spool segments stay the parent's
+        with self._lock:
+            self._pending = []
+            self._segment = None
+            self._closed_segments = []
+            self._token = uuid.uuid4().hex[:12]
+
+    def _run(self):
+        if self.durable:
+            self.recover()
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def record(self, entry):
+        """Queue one audit_logs row (a dict of its columns)"""
+        if not self.buffered:
+            self._write([entry])
+            with self._lock:
+                self.stats['entries'] += 1
+            return
+
+        self._flusher.get()
+        with self._lock:
+            if self.durable:
+                self._spool(entry)
+            self._pending.append(entry)
+            self.stats['entries'] += 1
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def _spool(self, entry):
+        # Called with self._lock held, so lines from concurrent requests never interleave
+        if self._segment is None:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._segment_seq += 1
+            path = os.path.join(self.spool_dir, SPOOL_PATTERN.format(pid=os.getpid(), token=self._token, seq=self._segment_seq))
+            self._segment = (path, open(path, 'a', encoding='utf-8'))
+            fsync_directory(self.spool_dir)
+        spool_file = self._segment[1]
+        spool_file.write(json.dumps(dict(entry, timestamp=entry['timestamp'].isoformat())) + '\n')
+        spool_file.flush()
+        os.fsync(spool_file.fileno())
+
+    def flush(self):
+        """Insert every queued entry in one transaction; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                entries = self._pending
+                self._pending = []
+                if self._segment is not None:
+                    self._segment[1].close()
+                    self._closed_segments.append(self._segment[0])
+                    self._segment = None
+                segments = list(self._closed_segments)
+            if entries:
+                try:
+                    self._write(entries)
+                except Exception:
+                    # Keep the entries (and their segments) for the next attempt
+                    with self._lock:
+                        self._pending[:0] = entries
+                        self.stats['errors'] += 1
+                    return 0
+            with self._lock:
+                self._closed_segments = [path for path in self._closed_segments if path not in segments]
+                if entries:
+                    self.stats['flushes'] += 1
+                    self.stats['rows_flushed'] += len(entries)
+            for path in segments:
+                self._remove(path)
+            return len(entries)
+
+    def recover(self):
+        """Requeue spool segments left by processes that are no longer running"""
+        recovered = 0
+        pattern = os.path.join(self.spool_dir, SPOOL_PATTERN.format(pid='*', token='*', seq='*'))
+        for path in sorted(glob.glob(pattern)):
+            try:
+                pid, token = os.path.basename(path).split('-')[1:3]
+                pid = int(pid)
+            except ValueError:
+                continue
+            if token == self._token or (pid != os.getpid() and process_alive(pid)):
+                continue
+            # Claim the segment by moving it into this process's namespace, so two
+            # workers starting together replay it once, and a crash here leaves it
+            # for the next writer again
+            with self._lock:
+                self._segment_seq += 1
+                claimed = os.path.join(self.spool_dir, SPOOL_PATTERN.format(
+                    pid=os.getpid(), token=self._token, seq=f'r{self._segment_seq}'))
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            path = claimed
+            entries = []
+            with open(path, encoding='utf-8') as spool_file:
+                for line in spool_file:
+                    try:
+                        entry = json.loads(line)
+                        entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
+                    except (ValueError, KeyError):
+                        continue  # a line torn by the crash was never acknowledged
+                    entries.append(entry)
+            # Queued with the segment, which the flush deletes once they are committed
+            with self._lock:
+                self._pending[:0] = entries
+                self._closed_segments.append(path)
+                self.stats['recovered'] += len(entries)
+            recovered += len(entries)
+        if recovered:
+            self.flush()
+        return recovered
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, entries):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(AuditLog.__table__.insert(), entries)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._pending)
+            stats['spool_segments'] = len(self._closed_segments) + (self._segment is not None)
+        stats['buffered'] = self.buffered
+        stats['durable'] = self.durable
+        return stats
+
+audit_writer = AuditWriter()
+
+def audit(action, details=None, user_id=None, ip_address=None):
+    """Record an audit log entry; defaults to the current session's user and client address"""
+    if has_request_context():
+        user_id = user_id if user_id is not None else session.get('user_id')
+        ip_address = ip_address or request.remote_addr
+    audit_writer.record({
+        'user_id': user_id,
+        'action': action,
+        'details': details,
+        'ip_address': ip_address or 'unknown',
+        'timestamp': datetime.utcnow()
+    })
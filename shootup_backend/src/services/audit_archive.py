@@ -0,0 +1,393 @@
+"""Monthly compressed archive of old audit log rows.
+
+``flask --app src.main archive-audit-logs`` moves every whole month of
+audit_logs rows older than AUDIT_ARCHIVE_AFTER_DAYS into AUDIT_ARCHIVE_DIR,
+so the live table only holds recent activity. A month is written as
+
+* ``audit-YYYY-MM-<part>.jsonl.gz``: the rows as JSON lines, newest first,
+  gzipped in independent members of BLOCK_ROWS rows so one block can be read
+  without inflating the whole month, and
+* ``audit-YYYY-MM-<part>.idx``: a sidecar index with the timestamp and
+  log_id of every row plus posting lists (row numbers) per action and per
+  user_id. The index is memory-mapped, so filtering a month by action or
+  user reads a few pages of it and then only the blocks holding matches.
+
+Rows that reach an already archived month later (a replayed audit spool)
+go into the month's next part. The segment is written and fsynced before
+its sidecar, and the sidecar is renamed into place last, so a segment
+without a sidecar is an interrupted run and is ignored. Rows are deleted
+from audit_logs only after both files are durable, and a rerun skips
+log_ids a month's parts already hold.
+"""
+import bisect
+import glob
+import gzip
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from datetime import datetime, timedelta
+from sqlalchemy import select, text
+from src.models.user import db, AuditLog, User
+
+BLOCK_ROWS = 1024
+INDEX_MAGIC = b'SHAI'
+INDEX_VERSION = 1
+HEADER = struct.Struct('<4sHIII')  # magic, version, block_rows, row_count, meta length
+DELETE_BATCH = 20000
+SEGMENT_NAME = re.compile(r'audit-(\d{4})-(\d{2})-(\d+)\.idx$')
+EPOCH = datetime(1970, 1, 1)
+LOG_FIELDS = ('log_id', 'user_id', 'action', 'details', 'ip_address', 'timestamp')  # AuditLog.to_dict()
+
+def to_micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+def archive_key(values):
+    """A (timestamp, log_id) pagination key in the archive's (micros, log_id) form"""
+    if values is None:
+        return None
+    timestamp, log_id = values
+    return (to_micros(timestamp), log_id)
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+def next_month(value):
+    return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def archive_cutoff(now, after_days):
+    """Rows before this instant are archivable: months that ended more than after_days ago"""
+    return month_start(now - timedelta(days=after_days))
+
+def fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class Segment:
+    """One archived part of a month: the gzipped rows and their memory-mapped sidecar index"""
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.data_path = index_path[:-len('.idx')] + '.jsonl.gz'
+        year, month, part = SEGMENT_NAME.search(index_path).groups()
+        self.month = datetime(int(year), int(month), 1)
+        self.part = int(part)
+        with open(index_path, 'rb') as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.block_rows, self.row_count, meta_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f'Not an audit archive index: {index_path}')
+        meta_end = HEADER.size + meta_length
+        meta = json.loads(self._mmap[HEADER.size:meta_end])
+        self.blocks = meta['blocks']
+        self.actions = meta['actions']
+        self.action_postings = meta['action_postings']
+        self.user_postings = meta['user_postings']
+
+        view = memoryview(self._mmap)
+        columns = meta_end + (-meta_end % 8)
+        size = self.row_count * 8
+        self.timestamps = view[columns:columns + size].cast('q')
+        self.log_ids = view[columns + size:columns + 2 * size].cast('q')
+        self._postings = view[columns + 2 * size:].cast('I')
+
+    def _posting(self, entry):
+        offset, count = entry
+        return self._postings[offset:offset + count]
+
+    def candidates(self, action=None, user_id=None):
+        """Ascending row numbers (newest first) matching the filters"""
+        by_action = by_user = None
+        if action:
+            needle = action.lower()
+            matched = [self._posting(self.action_postings[i])
+                       for i, name in enumerate(self.actions) if needle in name.lower()]
+            by_action = matched[0] if len(matched) == 1 else list(heapq.merge(*matched))
+        if user_id is not None:
+            entry = self.user_postings.get(str(user_id))
+            by_user = self._posting(entry) if entry else []
+        if by_action is None and by_user is None:
+            return range(self.row_count)
+        if by_action is None or by_user is None:
+            return by_action if by_user is None else by_user
+        smaller, larger = sorted((by_action, by_user), key=len)
+        larger = set(larger)
+        return [row for row in smaller if row in larger]
+
+    def first_row_before(self, key):
+        """Row number of the first row strictly older than key = (timestamp micros, log_id)"""
+        low, high = 0, self.row_count
+        while low < high:
+            middle = (low + high) // 2
+            if (self.timestamps[middle], self.log_ids[middle]) < key:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def read_rows(self, rows):
+        """Decode the given row numbers, inflating each block they fall in once"""
+        wanted = {}
+        for row in rows:
+            wanted.setdefault(row // self.block_rows, []).append(row)
+        decoded = {}
+        with open(self.data_path, 'rb') as data_file:
+            for block, block_rows in sorted(wanted.items()):
+                data_file.seek(self.blocks[block])
+                lines = gzip.decompress(data_file.read(self.blocks[block + 1] - self.blocks[block])).splitlines()
+                for row in block_rows:
+                    decoded[row] = json.loads(lines[row - block * self.block_rows])
+        return [decoded[row] for row in rows]
+
+def write_segment(index_path, rows):
+    """Write one part from rows (dicts, newest first); returns the number written"""
+    data_path = index_path[:-len('.idx')] + '.jsonl.gz'
+    timestamps, log_ids = array('q'), array('q')
+    actions, users = {}, {}
+    blocks = [0]
+    with open(data_path + '.tmp', 'wb') as data_file:
+        lines = []
+        for row_number, row in enumerate(rows):
+            timestamps.append(to_micros(row['timestamp']))
+            log_ids.append(row['log_id'])
+            actions.setdefault(row['action'], array('I')).append(row_number)
+            if row['user_id'] is not None:
+                users.setdefault(str(row['user_id']), array('I')).append(row_number)
+            lines.append(json.dumps(dict(row, timestamp=row['timestamp'].isoformat()), separators=(',', ':')))
+            if len(lines) == BLOCK_ROWS:
+                data_file.write(gzip.compress('\n'.join(lines).encode() + b'\n', compresslevel=6, mtime=0))
+                blocks.append(data_file.tell())
+                lines = []
+        if lines:
+            data_file.write(gzip.compress('\n'.join(lines).encode() + b'\n', compresslevel=6, mtime=0))
+            blocks.append(data_file.tell())
+        data_file.flush()
+        os.fsync(data_file.fileno())
+    if not timestamps:
+        os.remove(data_path + '.tmp')
+        return 0
+
+    postings = array('I')
+    action_names = sorted(actions)
+    action_postings = []
+    for name in action_names:
+        action_postings.append([len(postings), len(actions[name])])
+        postings.extend(actions[name])
+    user_postings = {}
+    for user_id, rows_of_user in users.items():
+        user_postings[user_id] = [len(postings), len(rows_of_user)]
+        postings.extend(rows_of_user)
+    meta = json.dumps({
+        'blocks': blocks,
+        'actions': action_names,
+        'action_postings': action_postings,
+        'user_postings': user_postings
+    }, separators=(',', ':')).encode()
+
+    with open(index_path + '.tmp', 'wb') as index_file:
+        index_file.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, BLOCK_ROWS, len(timestamps), len(meta)))
+        index_file.write(meta)
+        index_file.write(b'\0' * (-(HEADER.size + len(meta)) % 8))
+        index_file.write(timestamps.tobytes())
+        index_file.write(log_ids.tobytes())
+        index_file.write(postings.tobytes())
+        index_file.flush()
+        os.fsync(index_file.fileno())
+    # Data first: a sidecar in place means its segment is complete
+    os.replace(data_path + '.tmp', data_path)
+    os.replace(index_path + '.tmp', index_path)
+    fsync_path(os.path.dirname(index_path))
+    return len(timestamps)
+
+class AuditArchive:
+    def __init__(self, app=None):
+        self.app = None
+        self.directory = None
+        self.after_days = 90
+        self._segments = {}  # index path -> Segment
+        self._listing = (None, [])  # (directory mtime, segments newest first)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.directory = app.config.get('AUDIT_ARCHIVE_DIR')
+        self.after_days = app.config.get('AUDIT_ARCHIVE_AFTER_DAYS', 90)
+        app.extensions['audit_archive'] = self
+
+    def segments(self):
+        """Every archived part, newest month (and latest part) first"""
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if self._listing[0] == mtime:
+                return self._listing[1]
+            paths = [path for path in glob.glob(os.path.join(self.directory, 'audit-*.idx')) if SEGMENT_NAME.search(path)]
+            for path in set(self._segments) - set(paths):
+                # Not closed: a request may still hold views into its mapping
+                self._segments.pop(path)
+            for path in paths:
+                if path not in self._segments:
+                    self._segments[path] = Segment(path)
+            listing = sorted(self._segments.values(), key=lambda segment: (segment.month, segment.part), reverse=True)
+            self._listing = (mtime, listing)
+            return listing
+
+    def _matches(self, action, user_id, before=None, after=None):
+        """(segment, matching row numbers) newest first; before/after bound the (timestamp, log_id) key"""
+        for segment in self.segments():
+            rows = segment.candidates(action, user_id)
+            if before is not None:
+                rows = rows[bisect.bisect_left(rows, segment.first_row_before(before)):]
+            if after is not None:
+                rows = rows[:bisect.bisect_left(rows, segment.first_row_before(after))]
+            if len(rows):
+                yield segment, rows
+
+    def _by_month(self, matches):
+        month, parts = None, []
+        for segment, rows in matches:
+            if segment.month != month and parts:
+                yield month, parts
+                parts = []
+            month = segment.month
+            parts.append((segment, rows))
+        if parts:
+            yield month, parts
+
+    def _merged(self, parts):
+        # Only a month with late rows has several parts; interleave them by (timestamp, log_id)
+        keyed = []
+        for segment, rows in parts:
+            keyed += [((segment.timestamps[row], segment.log_ids[row]), segment, row) for row in rows]
+        keyed.sort(key=lambda item: item[0], reverse=True)
+        return [(segment, row) for key, segment, row in keyed]
+
+    def _decode(self, items):
+        """Row dicts for (segment, row number) pairs, in order"""
+        by_segment = {}
+        for segment, row in items:
+            by_segment.setdefault(segment, []).append(row)
+        decoded = {}
+        for segment, rows in by_segment.items():
+            for row, data in zip(rows, segment.read_rows(rows)):
+                decoded[(segment, row)] = data
+        return [decoded[item] for item in items]
+
+    def count(self, action=None, user_id=None, before=None):
+        return sum(len(rows) for segment, rows in self._matches(action, user_id, before))
+
+    def query(self, action=None, user_id=None, before=None, offset=0, limit=20):
+        """Archived rows newest first, skipping `offset` matches (or starting after the `before` key)"""
+        page = []
+        for month, parts in self._by_month(self._matches(action, user_id, before)):
+            total = sum(len(rows) for segment, rows in parts)
+            if offset >= total:
+                offset -= total
+                continue
+            wanted = limit - len(page)
+            if len(parts) == 1:
+                segment, rows = parts[0]
+                page += segment.read_rows(list(rows[offset:offset + wanted]))
+            else:
+                page += self._decode(self._merged(parts)[offset:offset + wanted])
+            offset = 0
+            if len(page) >= limit:
+                break
+        return page
+
+    def iter_rows(self, action=None, user_id=None, start=None, end=None):
+        """Yield matching archived rows oldest first, reading one block's worth at a time"""
+        after = (to_micros(start), 0) if start is not None else None
+        before = (to_micros(end), 0) if end is not None else None
+        months = list(self._by_month(self._matches(action, user_id, before, after)))
+        for month, parts in reversed(months):
+            if len(parts) == 1:
+                segment, rows = parts[0]
+                items = [(segment, row) for row in reversed(rows)]
+            else:
+                items = self._merged(parts)[::-1]
+            for offset in range(0, len(items), BLOCK_ROWS):
+                yield from self._decode(items[offset:offset + BLOCK_ROWS])
+
+    def archive(self, now=None, after_days=None):
+        """Move whole months older than after_days out of audit_logs; returns {month: rows archived}"""
+        now = now or datetime.utcnow()
+        cutoff = archive_cutoff(now, self.after_days if after_days is None else after_days)
+        os.makedirs(self.directory, exist_ok=True)
+        archived = {}
+        while True:
+            oldest = db.session.execute(select(AuditLog.timestamp).order_by(AuditLog.timestamp).limit(1)).scalar()
+            db.session.rollback()
+            if oldest is None or oldest >= cutoff:
+                break
+            month = month_start(oldest)
+            archived[month.strftime('%Y-%m')] = self._archive_month(month, next_month(month))
+        return archived
+
+    def _archive_month(self, start, end):
+        existing = [segment for segment in self.segments() if segment.month == start]
+        archived_ids = set()
+        for segment in existing:
+            archived_ids.update(segment.log_ids)
+        part = max((segment.part for segment in existing), default=0) + 1
+        index_path = os.path.join(self.directory, f'audit-{start:%Y-%m}-{part}.idx')
+
+        statement = select(
+            AuditLog.log_id, AuditLog.timestamp, AuditLog.user_id, User.username,
+            AuditLog.action, AuditLog.details, AuditLog.ip_address
+        ).outerjoin(User, User.user_id == AuditLog.user_id) \
+         .where(AuditLog.timestamp >= start, AuditLog.timestamp < end) \
+         .order_by(AuditLog.timestamp.desc(), AuditLog.log_id.desc())
+        with db.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=BLOCK_ROWS).execute(statement)
+            rows = (row._asdict() for row in result if row.log_id not in archived_ids)
+            highest = [0]
+
+            def track(rows):
+                for row in rows:
+                    highest[0] = max(highest[0], row['log_id'])
+                    yield row
+            written = write_segment(index_path, track(rows))
+
+        # Delete only what the read saw, in short transactions the request path can interleave with
+        limit_id = max(highest[0], max(archived_ids, default=0))
+        delete = text(
+            'DELETE FROM audit_logs WHERE log_id IN (SELECT log_id FROM audit_logs '
+            'WHERE timestamp >= :start AND timestamp < :end AND log_id <= :limit_id LIMIT :batch)'
+        )
+        while True:
+            with db.engine.begin() as connection:
+                deleted = connection.execute(delete, {
+                    'start': start, 'end': end, 'limit_id': limit_id, 'batch': DELETE_BATCH
+                }).rowcount
+            if deleted < DELETE_BATCH:
+                break
+        return written
+
+    def get_stats(self):
+        segments = self.segments()
+        return {
+            'directory': self.directory,
+            'after_days': self.after_days,
+            'segments': len(segments),
+            'archived_rows': sum(segment.row_count for segment in segments),
+            'oldest_month': segments[-1].month.strftime('%Y-%m') if segments else None,
+            'newest_month': segments[0].month.strftime('%Y-%m') if segments else None
+        }
+
+audit_archive = AuditArchive()
+
+def archived_log(row):
+    """An archived row in the shape of AuditLog.to_dict()"""
+    return {field: row.get(field) for field in LOG_FIELDS}
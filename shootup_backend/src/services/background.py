@@ -0,0 +1,60 @@
+"""Per-process background threads and pools for the in-process services.
+
+Gunicorn-style servers import the app once and then fork workers. Threads
+do not survive a fork, and a process pool must not be shared with a child,
+so each service creates its threads or pool on first use and again in every
+process forked after that. ProcessLocal holds that lazily created value
+together with the pid that created it.
+"""
+import os
+import threading
+
+def start_thread(target, name, *args):
+    """Start a daemon thread and return it"""
+    thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+    thread.start()
+    return thread
+
+class ProcessLocal:
+    """A value built by factory on first use, and built again after a fork.
+
+    on_fork, if given, runs before each build in a new process (including
+    the first), to drop state inherited from the parent.
+    """
+    def __init__(self, factory, on_fork=None):
+        self.factory = factory
+        self.on_fork = on_fork
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        value = self._value
+        if value is not None and self._pid == os.getpid():
+            return value
+        with self._lock:
+            if self._pid != os.getpid():
+                if self.on_fork is not None:
+                    self.on_fork()
+                self._pid = os.getpid()
+                self._value = None
+            if self._value is None:
+                self._value = self.factory()
+            return self._value
+
+    def peek(self):
+        """The value if this process built it, without building one"""
+        value = self._value
+        return value if self._pid == os.getpid() else None
+
+    def discard(self, value=None):
+        """Forget the value (only if it is still value, when given) so the next get() builds a new one.
+
+        Returns the forgotten value if this process built it, else None.
+        """
+        with self._lock:
+            current = self._value
+            if current is None or (value is not None and current is not value):
+                return None
+            self._value = None
+            return current if self._pid == os.getpid() else None
@@ -0,0 +1,185 @@
+"""Set-based bulk actions on users.
+
+Targets are an explicit list of user ids or a filter (role, inactive since
+a date, registered before a date, is_active, email_verified), resolved
+BULK_ACTION_CHUNK_SIZE ids at a time: ids lists are cut into chunks, and
+filters are walked in user_id order with keyset pagination. Each chunk is
+one UPDATE or DELETE with a bounded IN list, committed on its own, so no
+statement runs into SQLite's variable limit, nothing is loaded into the
+ORM, and the write lock is released between chunks.
+
+Counts distinguish users that matched from users the action changed (an
+activate skips users that are already active). A dry run reports the same
+counts without writing. The acting admin is never deactivated, demoted or
+deleted by their own bulk action.
+
+A delete removes everything the users own through the cascading foreign
+keys, with the counter upkeep in src/models/cascades.py, and keeps users
+who still author courses or roadmaps. There is no soft delete here: each
+chunk is already its own short transaction.
+"""
+from datetime import datetime
+from sqlalchemy import select, update, func, or_, and_
+from src.models.user import db, User, Role
+from src.models.cascades import delete_users
+from src.services.analytics import parse_day
+
+ACTIONS = ('activate', 'deactivate', 'verify_email', 'change_role', 'delete')
+FILTERS = ('role', 'inactive_since', 'registered_before', 'is_active', 'email_verified')
+SAMPLE_SIZE = 20
+
+def parse_filter(spec, roles):
+    """Build the WHERE conditions for a filter object; raises ValueError"""
+    if not isinstance(spec, dict) or not spec:
+        raise ValueError(f"filter must be an object with at least one of: {', '.join(FILTERS)}")
+    unknown = sorted(set(spec) - set(FILTERS))
+    if unknown:
+        raise ValueError(f"Unknown filter: {', '.join(unknown)}")
+    conditions = []
+    if spec.get('role') is not None:
+        if spec['role'] not in roles:
+            raise ValueError(f"Invalid role: {spec['role']}")
+        conditions.append(User.role_id == roles[spec['role']])
+    inactive_since = parse_day(spec.get('inactive_since'), 'inactive_since')
+    if inactive_since:
+        # No login since the date; users who never logged in count from registration
+        since = datetime.combine(inactive_since, datetime.min.time())
+        conditions.append(or_(User.last_login < since, and_(User.last_login.is_(None), User.registration_date < since)))
+    registered_before = parse_day(spec.get('registered_before'), 'registered_before')
+    if registered_before:
+        conditions.append(User.registration_date < datetime.combine(registered_before, datetime.min.time()))
+    for flag in ('is_active', 'email_verified'):
+        if spec.get(flag) is not None:
+            if not isinstance(spec[flag], bool):
+                raise ValueError(f'{flag} must be true or false')
+            conditions.append(getattr(User, flag).is_(spec[flag]))
+    if not conditions:
+        raise ValueError(f"filter must be an object with at least one of: {', '.join(FILTERS)}")
+    return conditions
+
+def parse_user_ids(value):
+    if not isinstance(value, list) or not value:
+        raise ValueError('user_ids must be a non-empty list')
+    try:
+        return sorted({int(user_id) for user_id in value})
+    except (TypeError, ValueError):
+        raise ValueError('user_ids must be integers')
+
+def referencing_columns():
+    """Foreign key columns pointing at users.user_id that do not cascade (courses, roadmaps)"""
+    users = User.__table__
+    return [
+        fk.parent for table in db.metadata.sorted_tables for fk in table.foreign_keys
+        if fk.column.table is users and table is not users and fk.ondelete is None
+    ]
+
+class BulkUserAction:
+    def __init__(self, action, user_ids=None, user_filter=None, role=None, actor_id=None, dry_run=False, chunk_size=500):
+        if action not in ACTIONS:
+            raise ValueError(f"action must be one of: {', '.join(ACTIONS)}")
+        if (user_ids is None) == (user_filter is None):
+            raise ValueError('Give either user_ids or filter')
+        roles = {role.role_name: role.role_id for role in Role.query.all()}
+        self.action = action
+        self.user_ids = parse_user_ids(user_ids) if user_ids is not None else None
+        self.conditions = parse_filter(user_filter, roles) if user_filter is not None else []
+        self.role_id = None
+        if action == 'change_role':
+            if role not in roles:
+                raise ValueError(f"role must be one of: {', '.join(roles)}")
+            self.role_id = roles[role]
+        self.actor_id = actor_id
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.result = {'action': action, 'dry_run': dry_run, 'matched': 0, 'affected': 0, 'sample_user_ids': []}
+        if action == 'delete':
+            self.result['blocked'] = 0
+
+    def _chunks(self):
+        """Yield sorted lists of at most chunk_size target user ids"""
+        if self.user_ids is not None:
+            for start in range(0, len(self.user_ids), self.chunk_size):
+                chunk = self.user_ids[start:start + self.chunk_size]
+                # Ids that no longer exist simply do not match
+                yield list(db.session.scalars(select(User.user_id).where(User.user_id.in_(chunk)).order_by(User.user_id)))
+            return
+        last_id = 0
+        while True:
+            chunk = list(db.session.scalars(
+                select(User.user_id).where(*self.conditions, User.user_id > last_id)
+                .order_by(User.user_id).limit(self.chunk_size)
+            ))
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1]
+
+    def _change_condition(self):
+        """Rows the action would actually change"""
+        return {
+            'activate': User.is_active.is_(False),
+            'deactivate': User.is_active.is_(True),
+            'verify_email': User.email_verified.is_(False),
+            'change_role': User.role_id != self.role_id
+        }[self.action]
+
+    def _values(self):
+        return {
+            'activate': {'is_active': True},
+            'deactivate': {'is_active': False},
+            'verify_email': {'email_verified': True},
+            'change_role': {'role_id': self.role_id}
+        }[self.action]
+
+    def run(self):
+        """Apply the action chunk by chunk; returns the counts"""
+        protect_actor = self.action in ('deactivate', 'change_role', 'delete')
+        for chunk in self._chunks():
+            if protect_actor and self.actor_id in chunk:
+                chunk = [user_id for user_id in chunk if user_id != self.actor_id]
+            if not chunk:
+                continue
+            self.result['matched'] += len(chunk)
+            room = SAMPLE_SIZE - len(self.result['sample_user_ids'])
+            self.result['sample_user_ids'].extend(chunk[:room])
+            if self.action == 'delete':
+                self._delete(chunk)
+            else:
+                self._update(chunk)
+        return self.result
+
+    def _update(self, chunk):
+        targets = [User.user_id.in_(chunk), self._change_condition()]
+        if self.dry_run:
+            self.result['affected'] += db.session.scalar(select(func.count()).select_from(User).where(*targets))
+            return
+        self.result['affected'] += db.session.execute(
+            update(User).where(*targets).values(**self._values()), execution_options={'synchronize_session': False}
+        ).rowcount
+        db.session.commit()
+
+    def _delete(self, chunk):
+        # Authors of courses and roadmaps are kept; everything else they own cascades
+        blocked = set()
+        for column in referencing_columns():
+            blocked.update(db.session.scalars(
+                select(column).where(column.in_(chunk)).distinct().execution_options(include_deleted=True)
+            ))
+        deletable = [user_id for user_id in chunk if user_id not in blocked]
+        self.result['blocked'] += len(chunk) - len(deletable)
+        if not deletable:
+            return
+        if self.dry_run:
+            self.result['affected'] += len(deletable)
+            return
+        self.result['affected'] += delete_users(db.session.connection(), deletable)
+        db.session.commit()
+
+    def summary(self):
+        """One line for the audit log"""
+        target = f'{len(self.user_ids)} user ids' if self.user_ids is not None else 'a filter'
+        verb = 'Would apply' if self.dry_run else 'Applied'
+        line = f"{verb} {self.action} to {self.result['affected']} of {self.result['matched']} users matched by {target}"
+        if self.action == 'delete' and self.result['blocked']:
+            line += f"; {self.result['blocked']} still own courses or roadmaps and were kept"
+        return line
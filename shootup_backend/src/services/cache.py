@@ -0,0 +1,279 @@
+"""Response cache for public GET endpoints, shared by every worker process.
+
+Each process keeps a small LRU of encoded responses in front of a SQLite
+store that all workers read and write. Entries are tagged ('courses',
+'course:12', ...) and remember the version of each tag they were built
+from; a write bumps the tag version in the shared store, so every process
+sees the entry as stale on its next lookup without any messaging between
+workers. Entries also expire after a TTL, which bounds staleness for data
+the routes do not invalidate explicitly (counters, vlog view counts).
+"""
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import Response, current_app, request, session
+
+# Bump when the tables change; an older store is dropped and recreated
+SCHEMA_VERSION = 2
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS cache_entries ("
+    "key TEXT PRIMARY KEY, body BLOB NOT NULL, status INTEGER NOT NULL, mimetype TEXT NOT NULL, "
+    "headers TEXT NOT NULL, tags TEXT NOT NULL, expires_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_cache_entries_expires ON cache_entries (expires_at)",
+    "CREATE TABLE IF NOT EXISTS cache_tags (tag TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+]
+
+PRUNE_EVERY = 200  # stores between expiry sweeps of the shared table
+
+# Validators are kept with the body so hits can still answer with a 304
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+class CacheEntry:
+    def __init__(self, body, status, mimetype, headers, tags, expires_at):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.headers = headers
+        self.tags = tags  # {tag: version}
+        self.expires_at = expires_at
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.path = None
+        self.ttl = 60
+        self.local_size = 512
+        self.max_entries = 10000
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._connections = threading.local()
+        self._stores = 0
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0, 'errors': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.path = app.config['RESPONSE_CACHE_PATH']
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', 60)
+        self.local_size = app.config.get('RESPONSE_CACHE_LOCAL_SIZE', 512)
+        self.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 10000)
+        app.extensions['response_cache'] = self
+        if self.enabled:
+            self._create_schema(self._connect())
+
+    def _create_schema(self, connection):
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            if connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                connection.execute('DROP TABLE IF EXISTS cache_entries')
+                connection.execute('DROP TABLE IF EXISTS cache_tags')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+
+    def _connect(self):
+        """One autocommit connection per thread (sqlite3 connections are not shareable)"""
+        connection = getattr(self._connections, 'connection', None)
+        if connection is None or getattr(self._connections, 'path', None) != self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._connections.connection = connection
+            self._connections.path = self.path
+        return connection
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    # Tag versions
+
+    def tag_versions(self, tags):
+        """Current {tag: version} from the shared store (0 for a tag never invalidated)"""
+        if not tags:
+            return {}
+        placeholders = ', '.join('?' for _ in tags)
+        rows = self._connect().execute(
+            f'SELECT tag, version FROM cache_tags WHERE tag IN ({placeholders})', list(tags)
+        ).fetchall()
+        versions = dict.fromkeys(tags, 0)
+        versions.update(rows)
+        return versions
+
+    def invalidate(self, *tags):
+        """Mark every entry built from any of `tags` stale, in all processes"""
+        if not self.enabled or not tags:
+            return
+        try:
+            connection = self._connect()
+            connection.executemany(
+                'INSERT INTO cache_tags (tag, version) VALUES (?, 1) '
+                'ON CONFLICT(tag) DO UPDATE SET version = version + 1',
+                [(tag,) for tag in tags]
+            )
+        except sqlite3.Error:
+            self._count('errors')
+            return
+        with self._lock:
+            self.stats['invalidations'] += 1
+            for key in [key for key, entry in self._local.items() if any(tag in entry.tags for tag in tags)]:
+                del self._local[key]
+
+    # Entries
+
+    def _is_fresh(self, entry, now):
+        return entry.expires_at > now and self.tag_versions(list(entry.tags)) == entry.tags
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                entry = self._local.get(key)
+                if entry is not None:
+                    self._local.move_to_end(key)
+            if entry is not None and self._is_fresh(entry, now):
+                self._count('local_hits')
+                return entry
+
+            row = self._connect().execute(
+                'SELECT body, status, mimetype, headers, tags, expires_at FROM cache_entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None:
+                entry = CacheEntry(row[0], row[1], row[2], json.loads(row[3]), json.loads(row[4]), row[5])
+                if self._is_fresh(entry, now):
+                    self._remember(key, entry)
+                    self._count('shared_hits')
+                    return entry
+        except sqlite3.Error:
+            self._count('errors')
+        self._count('misses')
+        return None
+
+    def set(self, key, body, status, mimetype, versions, ttl=None, headers=None):
+        """Store a response built while the tags were at `versions`"""
+        if not self.enabled:
+            return
+        entry = CacheEntry(body, status, mimetype, headers or {}, versions, time.time() + (ttl or self.ttl))
+        try:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO cache_entries (key, body, status, mimetype, headers, tags, expires_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, body, status, mimetype, json.dumps(entry.headers), json.dumps(versions), entry.expires_at)
+            )
+        except sqlite3.Error:
+            self._count('errors')
+            return
+        self._remember(key, entry)
+        with self._lock:
+            self.stats['stores'] += 1
+            self._stores += 1
+            prune = self._stores % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def prune(self):
+        """Drop expired shared entries, then the soonest-expiring ones beyond max_entries"""
+        try:
+            connection = self._connect()
+            connection.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (time.time(),))
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries '
+                'ORDER BY expires_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+            )
+        except sqlite3.Error:
+            self._count('errors')
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        if self.enabled:
+            self._connect().execute('DELETE FROM cache_entries')
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['local_entries'] = len(self._local)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 4) if lookups else 0
+        stats['enabled'] = self.enabled
+        stats['pid'] = os.getpid()
+        if self.enabled:
+            try:
+                stats['shared_entries'] = self._connect().execute(
+                    'SELECT COUNT(*) FROM cache_entries WHERE expires_at > ?', (time.time(),)
+                ).fetchone()[0]
+            except sqlite3.Error:
+                stats['shared_entries'] = None
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self.stats:
+                self.stats[name] = 0
+
+response_cache = ResponseCache()
+
+def cache_key():
+    """Route + normalized query args + role of the caller"""
+    args = sorted((name, value) for name, value in request.args.items(multi=True) if value != '')
+    query = '&'.join(f'{name}={value}' for name, value in args)
+    return f"{request.path}?{query}|{session.get('role') or 'anonymous'}"
+
+def cached_response(tags, ttl=None, anonymous_only=False):
+    """Cache a GET view's 200 responses in the shared response cache.
+
+    `tags` are format strings filled from the view arguments, e.g.
+    ('courses', 'course:{course_id}'). Views whose body depends on the
+    signed-in user pass anonymous_only=True and are only cached for guests.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not response_cache.enabled or (anonymous_only and 'user_id' in session):
+                return view(*args, **kwargs)
+
+            key = cache_key()
+            entry = response_cache.get(key)
+            if entry is not None:
+                response = Response(entry.body, status=entry.status, mimetype=entry.mimetype, headers=entry.headers)
+                response.headers['X-Cache'] = 'HIT'
+                return response.make_conditional(request)
+
+            # Read the versions before building the response, so a write that
+            # lands while it is being built leaves the entry already stale
+            entry_tags = [tag.format(**kwargs) for tag in tags]
+            try:
+                versions = response_cache.tag_versions(entry_tags)
+            except sqlite3.Error:
+                versions = None
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if versions is not None and response.status_code == 200 and not response.direct_passthrough:
+                headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+                response_cache.set(key, response.get_data(), response.status_code, response.mimetype, versions, ttl, headers)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+def invalidate_cache(*tags):
+    response_cache.invalidate(*tags)
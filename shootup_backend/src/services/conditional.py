@@ -0,0 +1,63 @@
+"""Conditional GET (ETag / Last-Modified) for course, lesson and quiz reads.
+
+The validators come from the content version columns maintained by
+src/models/versions.py, read with a single primary-key lookup, so a client
+holding a current copy gets a 304 before anything is loaded or serialized.
+"""
+import hashlib
+from flask import current_app, request
+from sqlalchemy import select
+from werkzeug.http import is_resource_modified
+from src.models.user import db, Course, Quiz, Enrollment
+
+class Validators:
+    def __init__(self, etag, last_modified, version=None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.version = version
+
+def make_etag(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+def course_validators(course_id, kind='course', user_id=None):
+    """Validators for a course payload; user_id adds the caller's enrollment status.
+
+    Returns None when the course does not exist.
+    """
+    columns = [Course.content_version, Course.content_modified_at]
+    if user_id is not None:
+        columns.append(
+            select(Enrollment.status)
+            .where(Enrollment.user_id == user_id, Enrollment.course_id == Course.course_id)
+            .limit(1).scalar_subquery()
+        )
+    row = db.session.execute(select(*columns).where(Course.course_id == course_id)).first()
+    if row is None:
+        return None
+    return Validators(make_etag(kind, course_id, row[0], *row[2:]), row[1], row[0])
+
+def quiz_validators(quiz_id, include_answers=False):
+    row = db.session.execute(
+        select(Quiz.content_version, Quiz.content_modified_at).where(Quiz.quiz_id == quiz_id)
+    ).first()
+    if row is None:
+        return None
+    return Validators(make_etag('quiz', quiz_id, row[0], include_answers), row[1], row[0])
+
+def not_modified(validators):
+    """A 304 response if the client's copy is still current, else None"""
+    if validators is None:
+        return None
+    if is_resource_modified(request.environ, etag=validators.etag, last_modified=validators.last_modified):
+        return None
+    return add_validators(current_app.response_class(status=304), validators)
+
+def add_validators(response, validators):
+    if validators is None:
+        return response
+    response.set_etag(validators.etag)
+    if validators.last_modified is not None:
+        response.last_modified = validators.last_modified
+    # Clients may keep the body but must revalidate before reusing it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,203 @@
+"""Materialized admin dashboard statistics.
+
+The dashboard aggregates (entity counts, pending approvals, users per role
+and the recent activity lists) are built off the request path and stored as
+one JSON row in stats_snapshots, shared by every worker process, so the
+dashboard and system health endpoints read them with a single query. A
+background thread rebuilds the row every DASHBOARD_STATS_REFRESH_INTERVAL
+seconds unless another process already did, and DASHBOARD_STATS_DEBOUNCE
+seconds after a commit that adds or removes users, courses, enrollments or
+vlogs or changes a course or vlog, so a burst of writes costs one rebuild.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from src.models.user import db, User, Role, Course, Enrollment, Vlog, StatsSnapshot
+from src.models.loaders import serializable
+from src.services.background import ProcessLocal, start_thread
+from src.services.progress import get_progress_map
+
+SNAPSHOT_NAME = 'dashboard'
+RECENT_LIMIT = 5
+WATCHED_MODELS = (User, Course, Enrollment, Vlog)  # inserts and deletes change the counts
+STATUS_MODELS = (Course, Vlog)  # updates may change the pending counts
+
+def count_of(model, *criteria):
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+def build_dashboard_stats():
+    """Run every dashboard aggregate; returns the JSON-ready payload"""
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    stats = db.session.execute(select(
+        count_of(User).label('total_users'),
+        count_of(Course).label('total_courses'),
+        count_of(Enrollment).label('total_enrollments'),
+        count_of(Course, Course.status == 'pending').label('pending_courses'),
+        count_of(Vlog, Vlog.status == 'pending').label('pending_vlogs'),
+        count_of(Enrollment, Enrollment.enrollment_date >= thirty_days_ago).label('monthly_enrollments')
+    )).one()._asdict()
+    stats['users_by_role'] = dict(db.session.execute(
+        select(Role.role_name, func.count(User.user_id))
+        .outerjoin(User, User.role_id == Role.role_id)
+        .group_by(Role.role_name)
+    ).all())
+
+    recent_users = serializable(User.query).order_by(User.registration_date.desc()).limit(RECENT_LIMIT).all()
+    recent_courses = serializable(Course.query).order_by(Course.created_at.desc()).limit(RECENT_LIMIT).all()
+    recent_enrollments = Enrollment.query.order_by(Enrollment.enrollment_date.desc()).limit(RECENT_LIMIT).all()
+    enrollment_progress = get_progress_map([enrollment.enrollment_id for enrollment in recent_enrollments])
+
+    return {
+        'stats': stats,
+        'recent_activity': {
+            'users': [user.to_dict() for user in recent_users],
+            'courses': [course.to_dict() for course in recent_courses],
+            'enrollments': [
+                dict(enrollment.to_dict(), **enrollment_progress.get(enrollment.enrollment_id, {}))
+                for enrollment in recent_enrollments
+            ]
+        }
+    }
+
+class DashboardStats:
+    def __init__(self, app=None):
+        self.app = None
+        self.background = True
+        self.refresh_interval = 60
+        self.debounce = 2
+        self._stale = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._refresher = ProcessLocal(lambda: start_thread(self._run, 'dashboard-stats-refresher'))
+        self.stats = {'refreshes': 0, 'skipped': 0, 'errors': 0, 'last_build_ms': None}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.background = app.config.get('DASHBOARD_STATS_BACKGROUND', True)
+        self.refresh_interval = app.config.get('DASHBOARD_STATS_REFRESH_INTERVAL', 60)
+        self.debounce = app.config.get('DASHBOARD_STATS_DEBOUNCE', 2)
+        app.extensions['dashboard_stats'] = self
+
+    def _ensure_refresher(self):
+        if self.background:
+            self._refresher.get()
+
+    def _run(self):
+        while True:
+            if self._wakeup.wait(self.refresh_interval):
+                # Let the rest of a burst of writes land before rebuilding
+                time.sleep(self.debounce)
+                self._wakeup.clear()
+                self.refresh()
+            else:
+                self.refresh(max_age=self.refresh_interval)
+
+    def mark_stale(self):
+        """Schedule a rebuild after a relevant write"""
+        if self.app is None:
+            return
+        with self._lock:
+            self._stale = True
+        self._ensure_refresher()
+        self._wakeup.set()
+
+    def refresh(self, max_age=None):
+        """Rebuild and store the snapshot; with max_age, only if it is older than that.
+
+        Returns whether the snapshot was rebuilt.
+        """
+        with self._refresh_lock, self.app.app_context():
+            try:
+                if max_age is not None:
+                    refreshed_at = db.session.execute(
+                        select(StatsSnapshot.refreshed_at).where(StatsSnapshot.name == SNAPSHOT_NAME)
+                    ).scalar()
+                    if refreshed_at is not None and datetime.utcnow() - refreshed_at < timedelta(seconds=max_age):
+                        with self._lock:
+                            self.stats['skipped'] += 1
+                        return False
+
+                # Cleared first: a write that commits during the build marks it stale again
+                with self._lock:
+                    self._stale = False
+                started = time.perf_counter()
+                payload = build_dashboard_stats()
+                build_ms = int((time.perf_counter() - started) * 1000)
+                self._store(json.dumps(payload), build_ms)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    self._stale = True
+                    self.stats['errors'] += 1
+                return False
+        with self._lock:
+            self.stats['refreshes'] += 1
+            self.stats['last_build_ms'] = build_ms
+        return True
+
+    def _store(self, payload, build_ms):
+        table = StatsSnapshot.__table__
+        values = {'payload': payload, 'refreshed_at': datetime.utcnow(), 'build_ms': build_ms}
+        updated = db.session.execute(table.update().where(table.c.name == SNAPSHOT_NAME).values(**values))
+        if not updated.rowcount:
+            db.session.execute(table.insert().values(name=SNAPSHOT_NAME, **values))
+
+    def _read(self):
+        return db.session.execute(
+            select(StatsSnapshot.payload, StatsSnapshot.refreshed_at, StatsSnapshot.build_ms)
+            .where(StatsSnapshot.name == SNAPSHOT_NAME)
+        ).first()
+
+    def get_snapshot(self):
+        """Return (payload, snapshot info) with one query, building the first snapshot inline"""
+        self._ensure_refresher()
+        row = self._read()
+        if row is None or (not self.background and (self._stale or self._age(row.refreshed_at) >= self.refresh_interval)):
+            self.refresh()
+            row = self._read()
+        if row is None:
+            raise RuntimeError('Dashboard statistics are unavailable')
+        return json.loads(row.payload), {
+            'refreshed_at': row.refreshed_at.isoformat(),
+            'age_seconds': round(self._age(row.refreshed_at), 1),
+            'build_ms': row.build_ms,
+            'refresh_interval': self.refresh_interval,
+            'refresh_pending': self._stale
+        }
+
+    def _age(self, refreshed_at):
+        return (datetime.utcnow() - refreshed_at).total_seconds()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['refresh_pending'] = self._stale
+        stats['background'] = self.background
+        stats['pid'] = os.getpid()
+        return stats
+
+dashboard_stats = DashboardStats()
+
+@event.listens_for(Session, 'after_flush')
+def track_dashboard_writes(session, flush_context):
+    if (any(isinstance(instance, WATCHED_MODELS) for instance in session.new)
+            or any(isinstance(instance, WATCHED_MODELS) for instance in session.deleted)
+            or any(isinstance(instance, STATUS_MODELS) for instance in session.dirty)):
+        session.info['dashboard_stale'] = True
+
+@event.listens_for(Session, 'after_commit')
+def refresh_after_commit(session):
+    if session.info.pop('dashboard_stale', False):
+        dashboard_stats.mark_stale()
+
+@event.listens_for(Session, 'after_rollback')
+def discard_after_rollback(session):
+    session.info.pop('dashboard_stale', None)
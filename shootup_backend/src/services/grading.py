@@ -0,0 +1,227 @@
+"""Compiled quiz answer keys for in-memory grading.
+
+An AnswerKey holds, per question, its type, the ids of all its options and
+of its correct ones, and the normalized short-answer text, built for any number of quizzes with
+one query. Keys are cached per process and tagged with the quiz's
+content_version (see src/models/versions.py), which every quiz, question and
+option edit bumps, so a submission costs one version lookup plus the
+inserts, and a stale key is rebuilt on the next submission after an edit.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select
+from src.models.user import db, Quiz, Question, Option, QuizAttempt, Answer, Lesson, Course
+
+KEY_CACHE_SIZE = 256
+CLOCK_SKEW = timedelta(minutes=5)  # allowed lead of a client-supplied attempt_date
+
+_keys = OrderedDict()
+_keys_lock = threading.Lock()
+
+def normalize_answer(text):
+    return text.lower().strip() if text else None
+
+def as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class GradeResult:
+    def __init__(self, correct_answers, total_questions, score, is_passed, answers):
+        self.correct_answers = correct_answers
+        self.total_questions = total_questions
+        self.score = score
+        self.is_passed = is_passed
+        self.answers = answers  # Answer row values, without attempt_id
+
+class AnswerKey:
+    def __init__(self, quiz_id, version, passing_score):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.passing_score = passing_score
+        self.questions = {}  # question_id: (question_type, option ids, correct option ids, normalized answer)
+
+    def add_question(self, question_id, question_type, correct_answer):
+        self.questions[question_id] = (question_type, set(), set(), normalize_answer(correct_answer))
+
+    def grade(self, submitted):
+        """Score a list of {question_id, selected_option_id, answer_text} dicts.
+
+        Answers to questions outside this quiz, and repeats of a question
+        already answered, are ignored. An option only counts when it is a
+        correct option of the question it was submitted for. Raises
+        ValueError for malformed entries and for options of another question.
+        """
+        if not isinstance(submitted, list):
+            raise ValueError('Answers must be a list')
+        correct_answers = 0
+        answers = []
+        seen = set()
+        for answer_data in submitted:
+            if not isinstance(answer_data, dict):
+                raise ValueError('Each answer must be an object')
+            question_id = as_id(answer_data.get('question_id'))
+            if question_id not in self.questions or question_id in seen:
+                continue
+            seen.add(question_id)
+
+            question_type, options, correct_options, correct_text = self.questions[question_id]
+            selected_option_id = as_id(answer_data.get('selected_option_id'))
+            if selected_option_id is not None and selected_option_id not in options:
+                raise ValueError(f'Option {selected_option_id} does not belong to question {question_id}')
+            answer_text = answer_data.get('answer_text')
+            if answer_text is not None and not isinstance(answer_text, str):
+                raise ValueError('answer_text must be a string')
+            answers.append({
+                'question_id': question_id,
+                'selected_option_id': selected_option_id,
+                'answer_text': answer_text
+            })
+
+            if question_type in ('multiple_choice', 'true_false'):
+                is_correct = selected_option_id in correct_options
+            elif question_type == 'short_answer':
+                is_correct = correct_text is not None and normalize_answer(answer_text) == correct_text
+            else:
+                is_correct = False
+            if is_correct:
+                correct_answers += 1
+
+        total_questions = len(self.questions)
+        score = (correct_answers / total_questions * 100) if total_questions > 0 else 0
+        return GradeResult(correct_answers, total_questions, score, score >= self.passing_score, answers)
+
+def build_answer_keys(quiz_rows):
+    """Compile keys for {quiz_id: (content_version, passing_score)} with a single query"""
+    keys = {quiz_id: AnswerKey(quiz_id, version, passing_score) for quiz_id, (version, passing_score) in quiz_rows.items()}
+    if not keys:
+        return keys
+    rows = db.session.execute(
+        select(
+            Question.quiz_id, Question.question_id, Question.question_type, Question.correct_answer,
+            Option.option_id, Option.is_correct
+        )
+        .outerjoin(Option, Option.question_id == Question.question_id)
+        .where(Question.quiz_id.in_(list(keys)))
+    )
+    for quiz_id, question_id, question_type, correct_answer, option_id, is_correct in rows:
+        key = keys[quiz_id]
+        if question_id not in key.questions:
+            key.add_question(question_id, question_type, correct_answer)
+        if option_id is not None:
+            key.questions[question_id][1].add(option_id)
+            if is_correct:
+                key.questions[question_id][2].add(option_id)
+    return keys
+
+def get_answer_keys(quiz_ids):
+    """Return {quiz_id: AnswerKey} for the quizzes that exist, rebuilding stale keys"""
+    quiz_ids = {quiz_id for quiz_id in (as_id(value) for value in quiz_ids) if quiz_id is not None}
+    if not quiz_ids:
+        return {}
+    versions = {
+        quiz_id: (version, passing_score) for quiz_id, version, passing_score in db.session.execute(
+            select(Quiz.quiz_id, Quiz.content_version, Quiz.passing_score).where(Quiz.quiz_id.in_(quiz_ids))
+        )
+    }
+
+    keys = {}
+    with _keys_lock:
+        for quiz_id, (version, passing_score) in versions.items():
+            key = _keys.get(quiz_id)
+            if key is not None and key.version == version:
+                _keys.move_to_end(quiz_id)
+                keys[quiz_id] = key
+
+    stale = {quiz_id: row for quiz_id, row in versions.items() if quiz_id not in keys}
+    if stale:
+        built = build_answer_keys(stale)
+        keys.update(built)
+        with _keys_lock:
+            _keys.update(built)
+            while len(_keys) > KEY_CACHE_SIZE:
+                _keys.popitem(last=False)
+    return keys
+
+def get_answer_key(quiz_id):
+    """The compiled key for one quiz, or None if the quiz does not exist"""
+    return get_answer_keys([quiz_id]).get(quiz_id)
+
+def save_answers(attempt_id, answers):
+    """Insert a graded attempt's Answer rows in one executemany statement"""
+    if answers:
+        # Core insert: the ORM bulk path splits rows into batches by which columns are NULL
+        db.session.execute(Answer.__table__.insert(), [dict(answer, attempt_id=attempt_id) for answer in answers])
+
+def get_quiz_instructors(quiz_ids):
+    """Return {quiz_id: instructor_id} through lesson and course, in one query"""
+    quiz_ids = list(quiz_ids)
+    if not quiz_ids:
+        return {}
+    return dict(db.session.execute(
+        select(Quiz.quiz_id, Course.instructor_id)
+        .join(Lesson, Lesson.lesson_id == Quiz.lesson_id)
+        .join(Course, Course.course_id == Lesson.course_id)
+        .where(Quiz.quiz_id.in_(quiz_ids))
+    ).all())
+
+def parse_attempt_date(value, now):
+    """When an offline attempt was taken: ISO 8601 (stored as naive UTC), defaulting to now"""
+    if value in (None, ''):
+        return now
+    try:
+        attempt_date = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError('Invalid attempt_date')
+    if attempt_date.tzinfo is not None:
+        attempt_date = attempt_date.astimezone(timezone.utc).replace(tzinfo=None)
+    if attempt_date > now + CLOCK_SKEW:
+        raise ValueError('attempt_date is in the future')
+    return attempt_date
+
+def save_attempts(graded):
+    """Persist [(attempt row values, answers)] with two executemany inserts.
+
+    Returns the new attempt ids in input order.
+    """
+    if not graded:
+        return []
+    table = QuizAttempt.__table__
+    rows = [attempt for attempt, answers in graded]
+    if db.session.get_bind().dialect.name == 'sqlite':
+        attempt_ids = insert_sqlite_block(table, rows)
+    else:
+        attempt_ids = db.session.execute(
+            table.insert().returning(table.c.attempt_id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+    answer_rows = [
+        dict(answer, attempt_id=attempt_id)
+        for attempt_id, (attempt, answers) in zip(attempt_ids, graded) for answer in answers
+    ]
+    if answer_rows:
+        db.session.execute(Answer.__table__.insert(), answer_rows)
+    return attempt_ids
+
+def insert_sqlite_block(table, rows):
+    """executemany insert on SQLite, returning the new ids in input order.
+
+    SQLite cannot order RETURNING rows for a batched insert, and SQLAlchemy
+    falls back to one INSERT per row. Instead: SQLite assigns each new
+    INTEGER PRIMARY KEY max(rowid) + 1, and this transaction holds the write
+    lock from its first insert, so the rows take a contiguous block of ids
+    ending at the new maximum. The block's ends are checked against the input.
+    """
+    key = table.c.attempt_id
+    db.session.execute(table.insert(), rows)
+    last_id = db.session.execute(select(func.max(key))).scalar()
+    attempt_ids = list(range(last_id - len(rows) + 1, last_id + 1))
+
+    ends = {row.attempt_id: (row.user_id, row.quiz_id) for row in db.session.execute(
+        select(key, table.c.user_id, table.c.quiz_id).where(key.in_({attempt_ids[0], attempt_ids[-1]}))
+    )}
+    for attempt_id, row in ((attempt_ids[0], rows[0]), (attempt_ids[-1], rows[-1])):
+        if ends.get(attempt_id) != (row['user_id'], row['quiz_id']):
+            raise RuntimeError('Could not resolve the ids of the inserted quiz attempts')
+    return attempt_ids
@@ -0,0 +1,466 @@
+"""Background jobs persisted in SQLite and run by a worker thread pool.
+
+``job_queue.enqueue(name, payload)`` inserts a row into jobs and wakes the
+workers. Tasks are plain functions registered with ``@job_queue.task(name)``
+(see src/services/tasks.py) and called inside an app context with the
+payload as keyword arguments; whatever JSON they return is kept as the
+result. JOBS_WORKERS threads per process claim due jobs with a single
+UPDATE ... RETURNING, which SQLite serializes, so every process can run
+workers against the same queue without a broker.
+
+A job that raises is retried JOBS_BACKOFF seconds later, doubling per
+attempt up to JOBS_MAX_BACKOFF with a little jitter, until max_attempts,
+and then marked failed. A job still running after JOBS_STALE_AFTER is
+assumed to have died with its process and is queued again. Tasks may
+therefore run more than once: keep them idempotent, or save progress with
+checkpoint() in the same transaction as the writes it covers and pick it
+up from resume_state() on the next attempt.
+
+A scheduler thread enqueues the periodic jobs in JOBS_SCHEDULES, five-field
+cron expressions evaluated in UTC; only prune_jobs is scheduled unless
+SHOOTUP_JOBS_SCHEDULES adds more. Payloads are checked against the task's
+signature when a job is enqueued. Next run times live in job_schedules
+and are claimed with a conditional UPDATE, so each run is enqueued once
+however many processes tick; runs missed while nothing was ticking
+collapse into one.
+
+The threads start with the first request. With JOBS_BACKGROUND off, jobs
+wait for ``flask --app src.main run-jobs``.
+"""
+import contextvars
+import inspect
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, func
+from src.models.user import db, Job, JobSchedule
+from src.services.background import ProcessLocal, start_thread
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+SCHEDULER_TICK = 15  # seconds; cron resolution is one minute
+ERROR_LENGTH = 4000
+
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *'
+}
+CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))  # minute, hour, day of month, month, day of week
+
+jobs = Job.__table__
+schedules = JobSchedule.__table__
+_current_job = contextvars.ContextVar('current_job', default=None)
+
+def parse_cron_field(field, low, high):
+    """The set of values a cron field matches: *, n, a-b, comma lists and /step"""
+    values = set()
+    for part in field.split(','):
+        base, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if base == '*':
+            start, end = low, high
+        elif '-' in base:
+            start, end = (int(value) for value in base.split('-', 1))
+        else:
+            start = int(base)
+            end = high if step > 1 else start
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f'Cron field out of range: {field}')
+        values.update(range(start, end + 1, step))
+    return values
+
+class Cron:
+    """A five-field cron expression (minute hour day-of-month month day-of-week)"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        fields = CRON_ALIASES.get(spec.strip(), spec).split()
+        if len(fields) != 5:
+            raise ValueError(f'Cron expression needs five fields: {spec}')
+        try:
+            self.minutes, self.hours, self.days, self.months, weekdays = (
+                parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_RANGES)
+            )
+        except ValueError:
+            raise ValueError(f'Invalid cron expression: {spec}')
+        self.weekdays = {day % 7 for day in weekdays}  # 7 is Sunday too
+        # As in cron, a restricted day of month and day of week match either
+        self.either_day = fields[2] != '*' and fields[4] != '*'
+
+    def _day_matches(self, value):
+        weekday = (value.weekday() + 1) % 7  # cron counts from Sunday
+        if self.either_day:
+            return value.day in self.days or weekday in self.weekdays
+        return value.day in self.days and weekday in self.weekdays
+
+    def next_after(self, value):
+        """The first matching minute strictly after value"""
+        value = value.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = value + timedelta(days=366 * 4)
+        while value < limit:
+            if value.month not in self.months:
+                value = (value.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(value):
+                value = value.replace(hour=0, minute=0) + timedelta(days=1)
+            elif value.hour not in self.hours:
+                value = value.replace(minute=0) + timedelta(hours=1)
+            elif value.minute not in self.minutes:
+                value += timedelta(minutes=1)
+            else:
+                return value
+        raise ValueError(f'Cron expression never matches: {self.spec}')
+
+class Task:
+    def __init__(self, name, func, max_attempts=None):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+
+class JobQueue:
+    def __init__(self, app=None):
+        self.app = None
+        self.background = True
+        self.workers = 2
+        self.poll_interval = 5
+        self.max_attempts = 5
+        self.backoff = 30
+        self.max_backoff = 3600
+        self.stale_after = 3600
+        self.retention_days = 7
+        self.schedules = {}  # name -> Cron
+        self.tasks = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads = ProcessLocal(self._start_threads)
+        self.stats = {
+            'enqueued': 0, 'succeeded': 0, 'retried': 0, 'failed': 0,
+            'scheduled': 0, 'recovered': 0, 'errors': 0, 'last_error': None
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.background = app.config.get('JOBS_BACKGROUND', True)
+        self.workers = app.config.get('JOBS_WORKERS', 2)
+        self.poll_interval = app.config.get('JOBS_POLL_INTERVAL', 5)
+        self.max_attempts = app.config.get('JOBS_MAX_ATTEMPTS', 5)
+        self.backoff = app.config.get('JOBS_BACKOFF', 30)
+        self.max_backoff = app.config.get('JOBS_MAX_BACKOFF', 3600)
+        self.stale_after = app.config.get('JOBS_STALE_AFTER', 3600)
+        self.retention_days = app.config.get('JOBS_RETENTION_DAYS', 7)
+        self.schedules = {name: Cron(spec) for name, spec in app.config.get('JOBS_SCHEDULES', {}).items()}
+        app.extensions['job_queue'] = self
+        # Due jobs and schedules are picked up again after a restart
+        app.before_request(self._ensure_workers)
+
+    def task(self, name, max_attempts=None):
+        """Register a function as the task run for jobs called name"""
+        def decorator(func):
+            self.tasks[name] = Task(name, func, max_attempts)
+            return func
+        return decorator
+
+    def _start_threads(self):
+        threads = [start_thread(self._work, f'jobs-worker-{number}', f'jobs-worker-{number}') for number in range(1, self.workers + 1)]
+        return threads + [start_thread(self._schedule, 'jobs-scheduler')]
+
+    def _ensure_workers(self):
+        if self.background:
+            self._threads.get()
+
+    def wake(self):
+        self._ensure_workers()
+        self._wakeup.set()
+
+    def enqueue(self, name, payload=None, delay=0, max_attempts=None, connection=None, schedule=None):
+        """Queue a job and return its id.
+
+        With a connection the job is inserted in the caller's transaction and
+        only becomes visible to workers when that commits.
+        """
+        task = self.tasks.get(name)
+        if task is None:
+            raise ValueError(f'Unknown job: {name}')
+        if payload is not None and not isinstance(payload, dict):
+            raise ValueError('Job payload must be a JSON object')
+        # Checked here so a bad payload is rejected now, not after every retry
+        try:
+            inspect.signature(task.func).bind(**(payload or {}))
+        except TypeError as e:
+            raise ValueError(f'Invalid payload for {name}: {e}')
+        try:
+            payload = json.dumps(payload or {})
+        except TypeError:
+            raise ValueError('Job payload must be JSON-serializable')
+        now = datetime.utcnow()
+        values = {
+            'name': name,
+            'payload': payload,
+            'status': 'queued',
+            'attempts': 0,
+            'max_attempts': max_attempts or task.max_attempts or self.max_attempts,
+            'run_at': now + timedelta(seconds=delay),
+            'created_at': now,
+            'schedule': schedule
+        }
+        if connection is None:
+            with db.engine.begin() as connection:
+                job_id = connection.execute(jobs.insert().values(**values)).inserted_primary_key[0]
+        else:
+            job_id = connection.execute(jobs.insert().values(**values)).inserted_primary_key[0]
+        with self._lock:
+            self.stats['enqueued'] += 1
+        if self.background:
+            self.wake()
+        return job_id
+
+    def claim(self, worker):
+        """Mark the next due job as running on worker and return it, or None"""
+        now = datetime.utcnow()
+        due = select(jobs.c.job_id).where(jobs.c.status == 'queued', jobs.c.run_at <= now) \
+            .order_by(jobs.c.run_at, jobs.c.job_id).limit(1).scalar_subquery()
+        with db.engine.begin() as connection:
+            return connection.execute(
+                update(jobs).where(jobs.c.job_id == due, jobs.c.status == 'queued')
+                .values(status='running', worker=worker, started_at=now, attempts=jobs.c.attempts + 1)
+                .returning(jobs.c.job_id, jobs.c.name, jobs.c.payload, jobs.c.attempts, jobs.c.max_attempts, jobs.c.checkpoint)
+            ).first()
+
+    def run_next(self, worker):
+        """Claim and run one due job; returns False when none is due"""
+        # A fresh app context per job, so each job gets its own session
+        with self.app.app_context():
+            job = self.claim(worker)
+            if job is None:
+                return False
+            self.execute(job, worker)
+        return True
+
+    def run_pending(self, worker=None):
+        """Run due jobs in the calling thread until none is left; returns how many ran"""
+        worker = worker or f'{socket.gethostname()}:{os.getpid()}:foreground'
+        ran = 0
+        while self.run_next(worker):
+            ran += 1
+        return ran
+
+    def execute(self, job, worker):
+        task = self.tasks.get(job.name)
+        checkpoint = json.loads(job.checkpoint) if job.checkpoint else None
+        token = _current_job.set({'job_id': job.job_id, 'checkpoint': checkpoint})
+        try:
+            if task is None:
+                raise LookupError(f'No task registered for {job.name}')
+            result = task.func(**json.loads(job.payload))
+        except Exception:
+            db.session.rollback()
+            self._failed(job, worker, traceback.format_exc())
+        else:
+            self._succeeded(job, worker, result)
+        finally:
+            _current_job.reset(token)
+
+    def _succeeded(self, job, worker, result):
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(jobs).where(jobs.c.job_id == job.job_id, jobs.c.worker == worker, jobs.c.status == 'running')
+                .values(status='succeeded', finished_at=datetime.utcnow(), last_error=None,
+                        result=json.dumps(result, default=str) if result is not None else None)
+            )
+        with self._lock:
+            self.stats['succeeded'] += 1
+
+    def _failed(self, job, worker, error):
+        now = datetime.utcnow()
+        values = {'last_error': error[-ERROR_LENGTH:]}
+        retry = job.attempts < job.max_attempts
+        if retry:
+            delay = min(self.max_backoff, self.backoff * 2 ** (job.attempts - 1))
+            delay += random.uniform(0, delay / 10)
+            values.update(status='queued', run_at=now + timedelta(seconds=delay), worker=None)
+        else:
+            values.update(status='failed', finished_at=now)
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(jobs).where(jobs.c.job_id == job.job_id, jobs.c.worker == worker, jobs.c.status == 'running').values(**values)
+            )
+        with self._lock:
+            self.stats['retried' if retry else 'failed'] += 1
+
+    def checkpoint(self, connection, state):
+        """Save the running job's progress with the caller's transaction (no-op outside a job)"""
+        job = _current_job.get()
+        if job is None:
+            return
+        connection.execute(update(jobs).where(jobs.c.job_id == job['job_id']).values(checkpoint=json.dumps(state)))
+        job['checkpoint'] = state
+
+    def resume_state(self):
+        """The last checkpoint of the running job, or None on its first attempt"""
+        job = _current_job.get()
+        return job['checkpoint'] if job else None
+
+    def tick(self, now=None):
+        """Enqueue due periodic jobs and requeue stale ones; returns the ids enqueued"""
+        now = now or datetime.utcnow()
+        self._sync_schedules(now)
+        enqueued = []
+        for name, cron in self.schedules.items():
+            if name not in self.tasks:
+                continue
+            with db.engine.begin() as connection:
+                claimed = connection.execute(
+                    update(schedules).where(schedules.c.name == name, schedules.c.next_run_at <= now)
+                    .values(next_run_at=cron.next_after(now), last_enqueued_at=now)
+                ).rowcount
+                if claimed:
+                    job_id = self.enqueue(name, connection=connection, schedule=name)
+                    connection.execute(update(schedules).where(schedules.c.name == name).values(last_job_id=job_id))
+                    enqueued.append(job_id)
+        with self._lock:
+            self.stats['scheduled'] += len(enqueued)
+        self._recover_stale(now)
+        return enqueued
+
+    def _sync_schedules(self, now):
+        # New or changed schedules start counting from now; removed ones are dropped
+        with db.engine.begin() as connection:
+            stored = dict(connection.execute(select(schedules.c.name, schedules.c.spec)).all())
+            for name, cron in self.schedules.items():
+                if stored.get(name) == cron.spec:
+                    continue
+                if name in stored:
+                    connection.execute(update(schedules).where(schedules.c.name == name)
+                                       .values(spec=cron.spec, next_run_at=cron.next_after(now)))
+                else:
+                    connection.execute(schedules.insert().prefix_with('OR IGNORE')
+                                       .values(name=name, spec=cron.spec, next_run_at=cron.next_after(now)))
+            removed = set(stored) - set(self.schedules)
+            if removed:
+                connection.execute(delete(schedules).where(schedules.c.name.in_(removed)))
+
+    def _recover_stale(self, now):
+        stale = [jobs.c.status == 'running', jobs.c.started_at < now - timedelta(seconds=self.stale_after)]
+        message = f'Still running after {self.stale_after}s; its worker is assumed dead'
+        with db.engine.begin() as connection:
+            recovered = connection.execute(
+                update(jobs).where(*stale, jobs.c.attempts < jobs.c.max_attempts)
+                .values(status='queued', run_at=now, worker=None, last_error=message)
+            ).rowcount
+            recovered += connection.execute(
+                update(jobs).where(*stale).values(status='failed', finished_at=now, worker=None, last_error=message)
+            ).rowcount
+        with self._lock:
+            self.stats['recovered'] += recovered
+
+    def prune(self, older_than_days=None):
+        """Delete finished jobs older than the retention period; returns how many"""
+        days = self.retention_days if older_than_days is None else older_than_days
+        with db.engine.begin() as connection:
+            return connection.execute(delete(jobs).where(
+                jobs.c.status.in_(('succeeded', 'failed', 'cancelled')),
+                jobs.c.finished_at < datetime.utcnow() - timedelta(days=days)
+            )).rowcount
+
+    def _record_error(self, error):
+        with self._lock:
+            self.stats['errors'] += 1
+            self.stats['last_error'] = str(error)
+
+    def _work(self, name):
+        worker = f'{socket.gethostname()}:{os.getpid()}:{name}'
+        while True:
+            try:
+                if self.run_next(worker):
+                    continue
+            except Exception as e:
+                # The queue itself failed (e.g. the database stayed locked); try again later
+                self._record_error(e)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _schedule(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self.tick()
+            except Exception as e:
+                self._record_error(e)
+            time.sleep(SCHEDULER_TICK)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(
+            background=self.background,
+            workers=self.workers if self.background else 0,
+            running_threads=sum(thread.is_alive() for thread in self._threads.peek() or []),
+            tasks=sorted(self.tasks),
+            pid=os.getpid()
+        )
+        return stats
+
+job_queue = JobQueue()
+
+def latency_summary(values):
+    """avg/p50/p95/max of a list of milliseconds"""
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+
+    def percentile(fraction):
+        return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+    return {
+        'count': len(values),
+        'avg': round(sum(values) / len(values)),
+        'p50': percentile(0.5),
+        'p95': percentile(0.95),
+        'max': values[-1]
+    }
+
+def milliseconds(delta):
+    return round(delta.total_seconds() * 1000)
+
+def queue_overview(hours=24):
+    """Queue depth by status and job, and wait/run latency of jobs finished in the last hours"""
+    now = datetime.utcnow()
+    depth = dict.fromkeys(STATUSES, 0)
+    by_name = {}
+    for name, status, count in db.session.execute(
+        select(Job.name, Job.status, func.count()).group_by(Job.name, Job.status)
+    ):
+        depth[status] = depth.get(status, 0) + count
+        by_name.setdefault(name, dict.fromkeys(STATUSES, 0))[status] = count
+    due, oldest_due = db.session.execute(
+        select(func.count(), func.min(Job.run_at)).where(Job.status == 'queued', Job.run_at <= now)
+    ).one()
+    depth['due'] = due
+    depth['oldest_due_seconds'] = round((now - oldest_due).total_seconds(), 1) if oldest_due else None
+
+    # Wait is from due time to start (of the last attempt), run is start to finish
+    wait, run = {}, {}
+    for name, run_at, started_at, finished_at in db.session.execute(
+        select(Job.name, Job.run_at, Job.started_at, Job.finished_at)
+        .where(Job.finished_at >= now - timedelta(hours=hours), Job.status.in_(('succeeded', 'failed')), Job.started_at.isnot(None))
+    ):
+        wait.setdefault(name, []).append(max(0, milliseconds(started_at - run_at)))
+        run.setdefault(name, []).append(milliseconds(finished_at - started_at))
+    latency = {
+        'window_hours': hours,
+        'wait_ms': latency_summary([value for values in wait.values() for value in values]),
+        'run_ms': latency_summary([value for values in run.values() for value in values]),
+        'by_name': {name: {'wait_ms': latency_summary(wait[name]), 'run_ms': latency_summary(run[name])} for name in sorted(wait)}
+    }
+    return {
+        'queue': depth,
+        'by_name': by_name,
+        'latency': latency,
+        'schedules': [schedule.to_dict() for schedule in JobSchedule.query.order_by(JobSchedule.name)]
+    }
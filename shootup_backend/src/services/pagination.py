@@ -0,0 +1,137 @@
+"""Keyset (cursor) pagination for list endpoints.
+
+Page/per_page pagination runs OFFSET scans plus a COUNT(*) on every request.
+In cursor mode the client passes back an opaque token holding the sort key of
+the last row it saw, and the next page is fetched with a range predicate
+that an index on the sort columns can seek to directly. Totals are optional
+and come from a short-TTL count cache.
+
+keyset_paginate replaces the query's ORDER BY with the keyset columns, so
+an order it does not know about, such as the bm25 ranking of a full-text
+search, would be lost. The course and vlog listings therefore reject a
+cursor together with search (400); ranked search results use page/per_page.
+"""
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import and_, or_, tuple_
+
+COUNT_CACHE_TTL = 30
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+_count_cache = {}
+_count_cache_lock = threading.Lock()
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+def decode_value(value):
+    """A sort key value from a cursor: a JSON scalar or the datetime wrapper"""
+    if isinstance(value, dict) and set(value) == {'dt'} and isinstance(value['dt'], str):
+        return datetime.fromisoformat(value['dt'])
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    raise ValueError('Invalid cursor')
+
+def encode_cursor(values):
+    payload = json.dumps([encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token, size):
+    """Return the sort key values in a cursor, or raise ValueError"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    try:
+        return [decode_value(value) for value in values]
+    except ValueError:
+        raise ValueError('Invalid cursor')
+
+def after_predicate(sort_keys, values):
+    """Rows strictly after `values` in the (column, descending) ordering"""
+    directions = {descending for column, descending in sort_keys}
+    columns = [column for column, descending in sort_keys]
+    if len(directions) == 1:
+        # Uniform direction: a row-value comparison the index can seek on
+        if directions.pop():
+            return tuple_(*columns) < tuple_(*values)
+        return tuple_(*columns) > tuple_(*values)
+
+    clauses = []
+    for i, (column, descending) in enumerate(sort_keys):
+        equal = [sort_keys[j][0] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+def cached_count(query, ttl=COUNT_CACHE_TTL):
+    """COUNT(*) for a query, memoized per process for `ttl` seconds"""
+    statement = query.order_by(None).statement.compile()
+    key = (str(statement), tuple(sorted((k, str(v)) for k, v in statement.params.items())))
+    now = time.monotonic()
+
+    with _count_cache_lock:
+        entry = _count_cache.get(key)
+        if entry and entry[1] > now:
+            return entry[0]
+
+    total = query.order_by(None).count()
+    with _count_cache_lock:
+        if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+            expired = [k for k, (value, expires) in _count_cache.items() if expires <= now]
+            for k in expired or list(_count_cache)[:COUNT_CACHE_MAX_ENTRIES // 4]:
+                _count_cache.pop(k, None)
+        _count_cache[key] = (total, now + ttl)
+    return total
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, total, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.total = total
+        self.per_page = per_page
+
+    def meta(self):
+        data = {
+            'per_page': self.per_page,
+            'next_cursor': self.next_cursor,
+            'has_more': self.next_cursor is not None
+        }
+        if self.total is not None:
+            data['total'] = self.total
+            data['pages'] = -(-self.total // self.per_page) if self.per_page else 0
+        return data
+
+def keyset_paginate(query, sort_keys, cursor, per_page, include_total=False):
+    """Fetch one page ordered by sort_keys, a list of (column, descending) pairs.
+
+    The last column must be unique (the primary key) so the order is total.
+    An empty cursor starts from the first row.
+    """
+    per_page = max(per_page, 1)
+    total = cached_count(query) if include_total else None
+
+    ordering = [column.desc() if descending else column.asc() for column, descending in sort_keys]
+    page_query = query.order_by(None).order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, len(sort_keys))
+        page_query = page_query.filter(after_predicate(sort_keys, values))
+
+    rows = page_query.limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column, descending in sort_keys])
+    return KeysetPage(items, next_cursor, total, per_page)
+
+def wants_total(args):
+    return args.get('include_total', '').lower() in ('1', 'true', 'yes')
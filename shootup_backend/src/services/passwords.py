@@ -0,0 +1,135 @@
+"""Password hashing on a bounded process pool.
+
+scrypt and pbkdf2 are tens of milliseconds of CPU per call. Run inline they
+hold a request thread for that long and, in a threaded worker, contend with
+every other request for the interpreter, which makes logins the throughput
+ceiling during a login spike. Hashes and checks are sent to a pool of
+PASSWORD_HASH_WORKERS processes instead (0 runs them inline), so KDF work
+is capped at that many cores and request threads only wait.
+
+PASSWORD_HASH_METHOD is a werkzeug method string such as
+``scrypt:32768:8:1`` or ``pbkdf2:sha256:1000000``. Changing it does not
+invalidate stored hashes: login checks a password against whatever
+parameters its hash was made with and, when they differ from the policy,
+stores a new hash made with the current one.
+
+As with any multiprocessing pool, the main module is imported again by the
+pool's forkserver, so scripts that use the app should keep their work
+under ``if __name__ == '__main__'``.
+"""
+import threading
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, parent_process
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+from src.services.background import ProcessLocal
+
+def normalize_method(method):
+    """The method string werkzeug stores for `method`, with its defaults filled in"""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = args if args else (2 ** 15, 8, 1)
+        return f'scrypt:{int(n)}:{int(r)}:{int(p)}'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    raise ValueError(f'Unsupported password hash method: {method}')
+
+def hash_parameters(password_hash):
+    """The method part of a stored hash ('scrypt:32768:8:1$salt$hash')"""
+    return password_hash.split('$', 1)[0] if password_hash and '$' in password_hash else None
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self.app = None
+        self.method = normalize_method('scrypt')
+        self.salt_length = 16
+        self.workers = 2
+        self.start_method = 'forkserver'
+        self.timeout = 30
+        self._pool = ProcessLocal(
+            lambda: ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context(self.start_method))
+        )
+        self._lock = threading.Lock()
+        self.stats = {'hashes': 0, 'checks': 0, 'rehashes': 0, 'inline_fallbacks': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.method = normalize_method(app.config.get('PASSWORD_HASH_METHOD', 'scrypt'))
+        self.salt_length = app.config.get('PASSWORD_HASH_SALT_LENGTH', 16)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.start_method = app.config.get('PASSWORD_HASH_START_METHOD', 'forkserver')
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 30)
+        app.extensions['password_hasher'] = self
+
+    def inline(self):
+        # Pool processes started with spawn/forkserver import the main module; if
+        # that hashes at import time it must not try to start a pool of its own
+        return not self.workers or parent_process() is not None
+
+    def _run(self, function, *args):
+        if self.inline():
+            return function(*args)
+        pool = self._pool.get()
+        try:
+            return pool.submit(function, *args).result(timeout=self.timeout)
+        except BrokenProcessPool:
+            # A pool process died (OOM kill); start a fresh pool and answer this call inline
+            self._pool.discard(pool)
+            with self._lock:
+                self.stats['inline_fallbacks'] += 1
+            return function(*args)
+
+    def hash(self, password):
+        """Hash a password with the current policy"""
+        with self._lock:
+            self.stats['hashes'] += 1
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def hash_many(self, passwords):
+        """Hash a batch of passwords across the pool; returns hashes in the same order"""
+        with self._lock:
+            self.stats['hashes'] += len(passwords)
+        args = (passwords, repeat(self.method), repeat(self.salt_length))
+        if self.inline() or not passwords:
+            return list(map(generate_password_hash, *args))
+        pool = self._pool.get()
+        # A few tasks per process keeps every worker busy without one IPC round trip per hash
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        try:
+            return list(pool.map(generate_password_hash, *args, chunksize=chunksize, timeout=self.timeout * len(passwords)))
+        except BrokenProcessPool:
+            self._pool.discard(pool)
+            with self._lock:
+                self.stats['inline_fallbacks'] += 1
+            return list(map(generate_password_hash, *args))
+
+    def check(self, password_hash, password):
+        with self._lock:
+            self.stats['checks'] += 1
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with parameters other than the current policy"""
+        return hash_parameters(password_hash) != self.method
+
+    def count_rehash(self):
+        with self._lock:
+            self.stats['rehashes'] += 1
+
+    def shutdown(self):
+        pool = self._pool.discard()
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(method=self.method, workers=self.workers)
+        return stats
+
+password_hasher = PasswordHasher()
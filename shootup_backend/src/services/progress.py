@@ -0,0 +1,185 @@
+"""Lesson progress stored as one completion bitmap per enrollment.
+
+Bit n of Enrollment.progress_bitmap is set when the lesson with
+progress_slot n is completed (see src/models/progress_slots.py), and
+lesson_completions keeps a completion date for completed lessons only, so
+nothing is written at enrollment time and lessons added later are tracked
+like any other. Enrollment.completed_lessons counts the set bits of the
+course's current lessons and is rewritten with the bitmap; with
+Course.lesson_count (src/models/counters.py) it makes progress summaries and
+the course completion check a comparison of two columns.
+"""
+from sqlalchemy import and_, bindparam, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from src.models.user import db, Course, Enrollment, Lesson, LessonCompletion
+from src.models.loaders import serializable
+
+UPDATE_ATTEMPTS = 5
+
+def bitmap_to_int(bitmap):
+    return int.from_bytes(bitmap, 'little') if bitmap else 0
+
+def int_to_bitmap(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little') if bits else None
+
+def get_course_slots(course_id):
+    """Return [(lesson_id, progress_slot)] of a course in lesson order"""
+    return db.session.execute(
+        select(Lesson.lesson_id, Lesson.progress_slot)
+        .where(Lesson.course_id == course_id, Lesson.progress_slot.isnot(None))
+        .order_by(Lesson.lesson_order, Lesson.lesson_id)
+    ).all()
+
+def slot_mask(slots):
+    mask = 0
+    for slot in slots:
+        mask |= 1 << slot
+    return mask
+
+def get_slot_maps(course_ids):
+    """Return {course_id: ({lesson_id: progress_slot}, lesson_count)} in one query"""
+    course_ids = list(course_ids)
+    if not course_ids:
+        return {}
+    rows = db.session.execute(
+        select(Course.course_id, Course.lesson_count, Lesson.lesson_id, Lesson.progress_slot)
+        .outerjoin(Lesson, and_(Lesson.course_id == Course.course_id, Lesson.progress_slot.isnot(None)))
+        .where(Course.course_id.in_(course_ids))
+    )
+    slot_maps = {}
+    for course_id, lesson_count, lesson_id, slot in rows:
+        slots = slot_maps.setdefault(course_id, ({}, lesson_count))[0]
+        if lesson_id is not None:
+            slots[lesson_id] = slot
+    return slot_maps
+
+def total_lessons_column():
+    return select(Course.lesson_count).where(
+        Course.course_id == Enrollment.course_id
+    ).correlate(Enrollment).scalar_subquery().label('total_lessons')
+
+def progress_summary(completed_lessons, total_lessons):
+    return {
+        'progress_percentage': (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0,
+        'completed_lessons': completed_lessons,
+        'total_lessons': total_lessons
+    }
+
+def with_progress(query, profile=None):
+    """Yield (enrollment, summary) for an Enrollment query in one statement"""
+    query = serializable(query, profile) if profile else query
+    for enrollment, total_lessons in query.add_columns(total_lessons_column()).all():
+        yield enrollment, progress_summary(enrollment.completed_lessons or 0, total_lessons or 0)
+
+def serialize_enrollments(query, include='course'):
+    """Serialize enrollments with progress plus their course or user"""
+    profile = 'enrollment_with_course' if include == 'course' else 'enrollment_with_user'
+    enrollment_data = []
+    for enrollment, summary in with_progress(query, profile):
+        data = enrollment.to_dict()
+        data[include] = getattr(enrollment, include).to_dict()
+        data.update(summary)
+        enrollment_data.append(data)
+    return enrollment_data
+
+def get_progress_map(enrollment_ids):
+    """Return {enrollment_id: summary} for already-loaded enrollments"""
+    if not enrollment_ids:
+        return {}
+    rows = db.session.execute(
+        select(Enrollment.enrollment_id, Enrollment.completed_lessons, total_lessons_column())
+        .where(Enrollment.enrollment_id.in_(enrollment_ids))
+    ).all()
+    return {
+        enrollment_id: progress_summary(completed_lessons or 0, total_lessons or 0)
+        for enrollment_id, completed_lessons, total_lessons in rows
+    }
+
+def progress_delta(enrollment, total_lessons):
+    """The compact per-enrollment state returned by progress sync"""
+    return dict(progress_summary(enrollment.completed_lessons, total_lessons), **{
+        'enrollment_id': enrollment.enrollment_id,
+        'status': enrollment.status,
+        'completion_date': enrollment.completion_date.isoformat() if enrollment.completion_date else None,
+        'last_accessed_lesson_id': enrollment.last_accessed_lesson_id
+    })
+
+def progress_entry(enrollment_id, lesson_id, is_completed, completion_date):
+    """A lesson's progress in the shape of the former progress rows"""
+    return {
+        'progress_id': None,
+        'enrollment_id': enrollment_id,
+        'lesson_id': lesson_id,
+        'is_completed': is_completed,
+        'completion_date': completion_date.isoformat() if completion_date else None
+    }
+
+def get_lesson_progress(enrollment):
+    """Progress entries for every current lesson of the enrollment's course, in lesson order"""
+    bits = bitmap_to_int(enrollment.progress_bitmap)
+    dates = dict(db.session.execute(
+        select(LessonCompletion.lesson_id, LessonCompletion.completion_date)
+        .where(LessonCompletion.enrollment_id == enrollment.enrollment_id)
+    ).all())
+    return [
+        progress_entry(enrollment.enrollment_id, lesson_id, bool(bits >> slot & 1), dates.get(lesson_id))
+        for lesson_id, slot in get_course_slots(enrollment.course_id)
+    ]
+
+def save_lesson_states(enrollment, slots, states, now):
+    """Apply {lesson_id: is_completed} to one enrollment; every lesson must be in `slots`.
+
+    The bitmap and completed_lessons are rewritten together by a
+    compare-and-set UPDATE, retried with fresh values when another request
+    changed the bitmap first, so concurrent updates are never lost. Completed
+    lessons are dated `now`.
+    """
+    set_bits = slot_mask(slots[lesson_id] for lesson_id, completed in states.items() if completed)
+    clear_bits = slot_mask(slots[lesson_id] for lesson_id, completed in states.items() if not completed)
+    mask = slot_mask(slots.values())
+    table = Enrollment.__table__
+    current, completed_lessons = enrollment.progress_bitmap, enrollment.completed_lessons or 0
+    for _ in range(UPDATE_ATTEMPTS):
+        bits = bitmap_to_int(current)
+        new_bits = (bits | set_bits) & ~clear_bits
+        bitmap = int_to_bitmap(new_bits)
+        if bitmap == current:
+            break
+        delta = (new_bits & mask).bit_count() - (bits & mask).bit_count()
+        unchanged = table.c.progress_bitmap.is_(None) if current is None else table.c.progress_bitmap == current
+        result = db.session.execute(
+            update(table).where(table.c.enrollment_id == enrollment.enrollment_id, unchanged)
+            .values(progress_bitmap=bitmap, completed_lessons=table.c.completed_lessons + delta)
+        )
+        if result.rowcount:
+            completed_lessons += delta
+            break
+        current, completed_lessons = db.session.execute(
+            select(table.c.progress_bitmap, table.c.completed_lessons)
+            .where(table.c.enrollment_id == enrollment.enrollment_id)
+        ).one()
+    else:
+        raise RuntimeError('Progress was updated concurrently, please retry')
+    set_committed_value(enrollment, 'progress_bitmap', bitmap)
+    set_committed_value(enrollment, 'completed_lessons', completed_lessons)
+
+    completions = LessonCompletion.__table__
+    db.session.execute(
+        completions.delete().where(
+            completions.c.enrollment_id == bindparam('b_enrollment_id'),
+            completions.c.lesson_id == bindparam('b_lesson_id')
+        ),
+        [{'b_enrollment_id': enrollment.enrollment_id, 'b_lesson_id': lesson_id} for lesson_id in states]
+    )
+    completed_rows = [
+        {'enrollment_id': enrollment.enrollment_id, 'lesson_id': lesson_id, 'completion_date': now}
+        for lesson_id, completed in states.items() if completed
+    ]
+    if completed_rows:
+        db.session.execute(completions.insert(), completed_rows)
+
+def check_course_completed(enrollment, total_lessons, now):
+    """Mark the enrollment completed once every current lesson is"""
+    if total_lessons > 0 and enrollment.completed_lessons == total_lessons:
+        enrollment.status = 'completed'
+        enrollment.completion_date = now
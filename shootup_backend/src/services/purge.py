@@ -0,0 +1,190 @@
+"""Soft delete and background purge of large courses and users.
+
+Foreign keys cascade deletes in the database (see src/models/cascades.py),
+but a course with a hundred thousand enrollments still cascades inside one
+statement and holds SQLite's write lock until it finishes. A delete whose
+cascade would reach PURGE_THRESHOLD_ROWS rows therefore only stamps
+deleted_at, which hides the row at once (src/models/soft_delete.py), and
+the request returns 202. The purger thread then removes the dependents
+PURGE_BATCH_SIZE rows per transaction, grandchildren first so no batch
+cascades further than itself, and finally the course or user, which by
+then cascades over a few rows. Batches whose rows feed counters or rollups
+go through the cascades helpers.
+
+Pending purges are just rows with deleted_at set, so a restart resumes
+them: the thread starts with the first request and polls every
+PURGE_INTERVAL seconds. Several processes may purge the same row; the
+RETURNING-based upkeep only counts rows a process actually deleted.
+"""
+import os
+import threading
+from sqlalchemy import delete, text, update
+from src.models.user import db
+from src.models.cascades import delete_enrollments, delete_reviews, delete_posts, delete_course, delete_users
+from src.services.background import ProcessLocal, start_thread
+from src.services.dashboard_stats import dashboard_stats
+
+KINDS = ('courses', 'users')
+
+COURSE_QUIZZES = 'SELECT quiz_id FROM quizzes WHERE lesson_id IN (SELECT lesson_id FROM lessons WHERE course_id = :key)'
+
+# (table, rows of the course or user, upkeep) in the order they are purged
+STEPS = {
+    'courses': [
+        ('answers', f'attempt_id IN (SELECT attempt_id FROM quiz_attempts WHERE quiz_id IN ({COURSE_QUIZZES}))', None),
+        ('quiz_attempts', f'quiz_id IN ({COURSE_QUIZZES})', None),
+        ('lesson_completions', 'enrollment_id IN (SELECT enrollment_id FROM enrollments WHERE course_id = :key)', None),
+        ('enrollments', 'course_id = :key', delete_enrollments),
+        ('reviews', 'course_id = :key', None)
+    ],
+    'users': [
+        ('answers', 'attempt_id IN (SELECT attempt_id FROM quiz_attempts WHERE user_id = :key)', None),
+        ('quiz_attempts', 'user_id = :key', None),
+        ('lesson_completions', 'enrollment_id IN (SELECT enrollment_id FROM enrollments WHERE user_id = :key)', None),
+        ('enrollments', 'user_id = :key', delete_enrollments),
+        ('reviews', 'user_id = :key', delete_reviews),
+        ('forum_posts', 'user_id = :key', delete_posts),
+        ('forum_posts', 'topic_id IN (SELECT topic_id FROM forum_topics WHERE user_id = :key)', None),
+        ('messages', 'sender_id = :key OR receiver_id = :key', None),
+        ('notifications', 'user_id = :key', None),
+        ('vlogs', 'user_id = :key', None)
+    ]
+}
+
+# Rows that outlive a deleted user with the reference set to NULL
+DETACH = {'courses': [], 'users': [('audit_logs', 'user_id'), ('forum_topics', 'last_poster_id')]}
+
+KEYS = {'courses': 'course_id', 'users': 'user_id'}
+
+def dependent_rows(connection, kind, key, limit):
+    """Rows deleting the course or user would cascade to, counted no further than limit"""
+    total = 0
+    for table, where, upkeep in STEPS[kind]:
+        total += connection.execute(
+            text(f'SELECT COUNT(*) FROM (SELECT 1 FROM {table} WHERE {where} LIMIT :limit)'),
+            {'key': key, 'limit': limit - total}
+        ).scalar()
+        if total >= limit:
+            break
+    return total
+
+class Purger:
+    def __init__(self, app=None):
+        self.app = None
+        self.background = True
+        self.threshold = 10000
+        self.batch_size = 1000
+        self.interval = 30
+        self._lock = threading.Lock()
+        self._purge_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = ProcessLocal(lambda: start_thread(self._run, 'purger'))
+        self.stats = {'courses_purged': 0, 'users_purged': 0, 'rows_deleted': 0, 'batches': 0, 'errors': 0, 'last_error': None}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.background = app.config.get('PURGE_BACKGROUND', True)
+        self.threshold = app.config.get('PURGE_THRESHOLD_ROWS', 10000)
+        self.batch_size = app.config.get('PURGE_BATCH_SIZE', 1000)
+        self.interval = app.config.get('PURGE_INTERVAL', 30)
+        app.extensions['purger'] = self
+        # Resume purges left pending by a previous run
+        app.before_request(self._ensure_worker)
+
+    def _ensure_worker(self):
+        if self.background:
+            self._worker.get()
+
+    def _run(self):
+        while True:
+            self._wakeup.clear()
+            self.run_once()
+            self._wakeup.wait(self.interval)
+
+    def needs_purge(self, kind, key):
+        """Whether deleting the course or user should be a soft delete purged in the background"""
+        return dependent_rows(db.session.connection(), kind, key, self.threshold) >= self.threshold
+
+    def schedule(self):
+        """Start purging soon after a soft delete commits; inline when not running in the background"""
+        if not self.background:
+            self.run_once()
+            return
+        self._ensure_worker()
+        self._wakeup.set()
+
+    def pending(self, connection, kind):
+        key = KEYS[kind]
+        return list(connection.execute(text(f'SELECT {key} FROM {kind} WHERE deleted_at IS NOT NULL ORDER BY deleted_at')).scalars())
+
+    def run_once(self):
+        """Purge every soft-deleted course, then every soft-deleted user; returns how many of each"""
+        purged = dict.fromkeys(KINDS, 0)
+        with self._purge_lock, self.app.app_context():
+            for kind in KINDS:
+                with db.engine.connect() as connection:
+                    keys = self.pending(connection, kind)
+                for key in keys:
+                    try:
+                        purged[kind] += self.purge(kind, key)
+                    except Exception as e:
+                        with self._lock:
+                            self.stats['errors'] += 1
+                            self.stats['last_error'] = f'{kind} {key}: {e}'
+        if any(purged.values()):
+            dashboard_stats.mark_stale()
+        return purged
+
+    def purge(self, kind, key):
+        """Delete one soft-deleted course or user in batches; returns whether this call deleted it"""
+        for table, where, upkeep in STEPS[kind]:
+            self._drain(lambda connection: self._delete_batch(connection, table, where, upkeep, key))
+        for table, column in DETACH[kind]:
+            self._drain(lambda connection: self._detach_batch(connection, table, column, key))
+        with db.engine.begin() as connection:
+            if kind == 'courses':
+                deleted = delete_course(connection, key)
+            else:
+                deleted = delete_users(connection, [key]) > 0
+        with self._lock:
+            self.stats[f'{kind}_purged'] += deleted
+        return deleted
+
+    def _drain(self, batch):
+        # One transaction per batch, so requests get the write lock in between
+        while True:
+            with db.engine.begin() as connection:
+                rows = batch(connection)
+            with self._lock:
+                self.stats['rows_deleted'] += rows
+                self.stats['batches'] += 1
+            if rows < self.batch_size:
+                return
+
+    def _batch_condition(self, table, where, key):
+        return text(f'{table}.rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT :batch)').bindparams(
+            key=key, batch=self.batch_size
+        )
+
+    def _delete_batch(self, connection, table, where, upkeep, key):
+        condition = self._batch_condition(table, where, key)
+        if upkeep is not None:
+            return upkeep(connection, condition)
+        return connection.execute(delete(db.metadata.tables[table]).where(condition)).rowcount
+
+    def _detach_batch(self, connection, table, column, key):
+        condition = self._batch_condition(table, f'{column} = :key', key)
+        return connection.execute(update(db.metadata.tables[table]).where(condition).values({column: None})).rowcount
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        with db.engine.connect() as connection:
+            for kind in KINDS:
+                stats[f'{kind}_pending'] = len(self.pending(connection, kind))
+        stats.update(background=self.background, threshold_rows=self.threshold, batch_size=self.batch_size, pid=os.getpid())
+        return stats
+
+purger = Purger()
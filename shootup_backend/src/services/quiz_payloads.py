@@ -0,0 +1,85 @@
+"""Pre-encoded quiz payloads for get_quiz.
+
+A quiz is effectively static while learners are taking it, yet every read
+loaded its questions, lazily loaded each question's options and stripped
+the answers out again. Both forms are now built together from one
+selectin-loaded query and kept as encoded JSON bytes: the authoring view
+(with correct_answer and is_correct) and the learner view (without them).
+Entries are tagged with the quiz's content_version, which get_quiz has
+already read for its ETag, so a hit costs no further queries; the quiz and
+question routes also discard the local copy as soon as they commit.
+"""
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy.orm import selectinload
+from src.models.user import Quiz, Question
+
+PAYLOAD_CACHE_SIZE = 256
+
+AUTHORING = 'authoring'
+LEARNER = 'learner'
+
+_payloads = OrderedDict()
+_payloads_lock = threading.Lock()
+
+class QuizPayloads:
+    def __init__(self, version, authoring, learner):
+        self.version = version
+        self.views = {AUTHORING: authoring, LEARNER: learner}
+
+def build_views(quiz):
+    authoring = quiz.to_dict()
+    learner = quiz.to_dict()
+    authoring['questions'] = []
+    learner['questions'] = []
+    for question in sorted(quiz.questions, key=lambda question: question.question_id):
+        options = sorted(question.options, key=lambda option: option.option_id)
+        authoring['questions'].append(dict(question.to_dict(), options=[option.to_dict() for option in options]))
+
+        # Learners never see which answer is correct
+        learner_question = question.to_dict()
+        learner_question.pop('correct_answer', None)
+        learner_question['options'] = [
+            {key: value for key, value in option.to_dict().items() if key != 'is_correct'} for option in options
+        ]
+        learner['questions'].append(learner_question)
+    return authoring, learner
+
+def encode_json(data):
+    """The exact bytes jsonify() would send"""
+    return current_app.json.response(data).get_data()
+
+def load_payloads(quiz_id):
+    quiz = Quiz.query.options(
+        selectinload(Quiz.questions).selectinload(Question.options)
+    ).filter_by(quiz_id=quiz_id).first()
+    if quiz is None:
+        return None
+    authoring, learner = build_views(quiz)
+    return QuizPayloads(quiz.content_version, encode_json(authoring), encode_json(learner))
+
+def get_quiz_payload(quiz_id, view, version=None):
+    """Encoded JSON for one view of a quiz, or None if it does not exist.
+
+    `version` is the quiz's current content_version when the caller has it;
+    without it any cached copy is rebuilt.
+    """
+    with _payloads_lock:
+        payloads = _payloads.get(quiz_id)
+        if payloads is not None and version is not None and payloads.version == version:
+            _payloads.move_to_end(quiz_id)
+            return payloads.views[view]
+
+    payloads = load_payloads(quiz_id)
+    if payloads is None:
+        return None
+    with _payloads_lock:
+        _payloads[quiz_id] = payloads
+        while len(_payloads) > PAYLOAD_CACHE_SIZE:
+            _payloads.popitem(last=False)
+    return payloads.views[view]
+
+def discard_quiz_payloads(quiz_id):
+    with _payloads_lock:
+        _payloads.pop(quiz_id, None)
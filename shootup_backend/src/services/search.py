@@ -0,0 +1,169 @@
+"""Full-text catalog search backed by SQLite FTS5.
+
+course_search and vlog_search are FTS5 tables keyed by the source row id and
+kept in sync by triggers on courses, categories and vlogs (see migration 4),
+so bulk SQL writes stay indexed too. When FTS5 is not available the routes
+fall back to the original LIKE filters.
+"""
+import html
+import re
+from sqlalchemy import Integer, Float, or_, text
+from src.models.user import db, Course, Vlog
+
+COURSE_WEIGHTS = (10.0, 1.0, 3.0)  # title, description, category_name
+VLOG_WEIGHTS = (10.0, 1.0)  # title, description
+SNIPPET_TOKENS = 12
+# Private-use characters marking matches until the snippet is escaped
+MARK_OPEN = '\ue000'
+MARK_CLOSE = '\ue001'
+
+CREATE_STATEMENTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS course_search USING fts5("
+    "title, description, category_name, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS vlog_search USING fts5("
+    "title, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+
+    "CREATE TRIGGER IF NOT EXISTS courses_search_insert AFTER INSERT ON courses BEGIN "
+    "INSERT INTO course_search (rowid, title, description, category_name) VALUES (new.course_id, new.title, new.description, "
+    "(SELECT category_name FROM categories WHERE category_id = new.category_id)); END",
+    "CREATE TRIGGER IF NOT EXISTS courses_search_update AFTER UPDATE OF title, description, category_id ON courses BEGIN "
+    "DELETE FROM course_search WHERE rowid = old.course_id; "
+    "INSERT INTO course_search (rowid, title, description, category_name) VALUES (new.course_id, new.title, new.description, "
+    "(SELECT category_name FROM categories WHERE category_id = new.category_id)); END",
+    "CREATE TRIGGER IF NOT EXISTS courses_search_delete AFTER DELETE ON courses BEGIN "
+    "DELETE FROM course_search WHERE rowid = old.course_id; END",
+    "CREATE TRIGGER IF NOT EXISTS categories_search_update AFTER UPDATE OF category_name ON categories BEGIN "
+    "UPDATE course_search SET category_name = new.category_name "
+    "WHERE rowid IN (SELECT course_id FROM courses WHERE category_id = new.category_id); END",
+
+    "CREATE TRIGGER IF NOT EXISTS vlogs_search_insert AFTER INSERT ON vlogs BEGIN "
+    "INSERT INTO vlog_search (rowid, title, description) VALUES (new.vlog_id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS vlogs_search_update AFTER UPDATE OF title, description ON vlogs BEGIN "
+    "DELETE FROM vlog_search WHERE rowid = old.vlog_id; "
+    "INSERT INTO vlog_search (rowid, title, description) VALUES (new.vlog_id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS vlogs_search_delete AFTER DELETE ON vlogs BEGIN "
+    "DELETE FROM vlog_search WHERE rowid = old.vlog_id; END"
+]
+
+REBUILD_STATEMENTS = [
+    "DELETE FROM course_search",
+    "INSERT INTO course_search (rowid, title, description, category_name) "
+    "SELECT courses.course_id, courses.title, courses.description, categories.category_name "
+    "FROM courses LEFT JOIN categories ON categories.category_id = courses.category_id",
+    "DELETE FROM vlog_search",
+    "INSERT INTO vlog_search (rowid, title, description) SELECT vlog_id, title, description FROM vlogs",
+    "INSERT INTO course_search (course_search) VALUES ('optimize')",
+    "INSERT INTO vlog_search (vlog_search) VALUES ('optimize')"
+]
+
+def fts5_supported(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    options = {row[0] for row in connection.exec_driver_sql('PRAGMA compile_options')}
+    return 'ENABLE_FTS5' in options
+
+def create_search_index(connection):
+    """Create the FTS5 tables and sync triggers, then fill them; False if unsupported"""
+    if not fts5_supported(connection):
+        return False
+    for statement in CREATE_STATEMENTS:
+        connection.exec_driver_sql(statement)
+    rebuild_search_index(connection)
+    return True
+
+def rebuild_search_index(connection):
+    for statement in REBUILD_STATEMENTS:
+        connection.exec_driver_sql(statement)
+
+_available = {}
+
+def search_tables_exist(connection):
+    return connection.dialect.name == 'sqlite' and connection.exec_driver_sql(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('course_search', 'vlog_search')"
+    ).scalar() == 2
+
+def search_available():
+    """Whether the FTS tables exist on this app's database (cached per engine)"""
+    engine = db.engine
+    if engine not in _available:
+        with engine.connect() as connection:
+            _available[engine] = search_tables_exist(connection)
+    return _available[engine]
+
+def build_match_query(search):
+    """Turn free text into an FTS5 query: every term must match, each as a prefix"""
+    terms = re.findall(r'\w+', search or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def match_subquery(table, weights, match):
+    """Matching row ids with their bm25 rank (lower is better).
+
+    Materialized so SQLite runs the MATCH once and probes the base table by
+    primary key, instead of re-running it for every base row when the query
+    planner puts the FTS table on the inner side of the join (as it does for
+    COUNT queries).
+    """
+    weight_args = ', '.join(str(weight) for weight in weights)
+    return text(
+        f'SELECT rowid AS item_id, bm25({table}, {weight_args}) AS rank FROM {table} WHERE {table} MATCH :match'
+    ).bindparams(match=match).columns(item_id=Integer, rank=Float).cte(f'{table}_matches').prefix_with('MATERIALIZED')
+
+def search_courses(query, search):
+    """Restrict a Course query to matches, ranked by bm25 (best first)"""
+    match = build_match_query(search)
+    if not match or not search_available():
+        return query.filter(or_(Course.title.contains(search), Course.description.contains(search)))
+    matches = match_subquery('course_search', COURSE_WEIGHTS, match)
+    return query.join(matches, matches.c.item_id == Course.course_id).order_by(matches.c.rank)
+
+def search_vlogs(query, search):
+    """Restrict a Vlog query to matches, ranked by bm25 (best first)"""
+    match = build_match_query(search)
+    if not match or not search_available():
+        return query.filter(or_(Vlog.title.contains(search), Vlog.description.contains(search)))
+    matches = match_subquery('vlog_search', VLOG_WEIGHTS, match)
+    return query.join(matches, matches.c.item_id == Vlog.vlog_id).order_by(matches.c.rank)
+
+def get_snippets(table, search, item_ids):
+    """Return {item_id: highlighted snippet} for one page of results.
+
+    snippet() copies the stored text verbatim, so matches are wrapped in
+    private-use sentinels, the text is HTML-escaped, and only then do the
+    sentinels become <mark> tags.
+    """
+    match = build_match_query(search)
+    if not match or not item_ids or not search_available():
+        return {}
+    placeholders = ', '.join(str(int(item_id)) for item_id in item_ids)
+    rows = db.session.execute(text(
+        f"SELECT rowid, snippet({table}, -1, :open, :close, '…', {SNIPPET_TOKENS}) FROM {table} "
+        f"WHERE {table} MATCH :match AND rowid IN ({placeholders})"
+    ), {'match': match, 'open': MARK_OPEN, 'close': MARK_CLOSE}).fetchall()
+    return {item_id: highlight(snippet) for item_id, snippet in rows}
+
+def highlight(snippet):
+    if snippet is None:
+        return None
+    return html.escape(snippet, quote=False).replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+
+def serialize_courses(courses, search=None):
+    """to_dict() a page of courses, adding search_snippet when searching"""
+    snippets = get_snippets('course_search', search, [course.course_id for course in courses]) if search else {}
+    results = []
+    for course in courses:
+        data = course.to_dict()
+        if search:
+            data['search_snippet'] = snippets.get(course.course_id)
+        results.append(data)
+    return results
+
+def serialize_vlogs(vlogs, search=None):
+    """to_dict() a page of vlogs, adding search_snippet when searching"""
+    snippets = get_snippets('vlog_search', search, [vlog.vlog_id for vlog in vlogs]) if search else {}
+    results = []
+    for vlog in vlogs:
+        data = vlog.to_dict()
+        if search:
+            data['search_snippet'] = snippets.get(vlog.vlog_id)
+        results.append(data)
+    return results
@@ -0,0 +1,76 @@
+"""Tasks run by the background job queue (src/services/jobs.py).
+
+Each one is safe to run again after a failure or a stale-job retry:
+archiving skips rows it already archived, purges and counter rebuilds
+converge, bulk actions only change rows that still need it, and the
+notification fan-out checkpoints the last user it reached.
+"""
+from datetime import datetime
+from sqlalchemy import select
+from src.models.user import db, User, Role, Notification
+from src.models.counters import (
+    rebuild_counters as rebuild_course_counters, rebuild_progress_counters, course_counters, touch_rebuilt_courses
+)
+from src.services.jobs import job_queue
+from src.services.audit import audit
+from src.services.audit_archive import audit_archive
+from src.services.bulk_users import BulkUserAction
+from src.services.cache import invalidate_cache
+from src.services.purge import purger
+
+NOTIFY_CHUNK_SIZE = 1000
+
+@job_queue.task('archive_audit_logs')
+def archive_audit_logs(older_than_days=None):
+    return audit_archive.archive(after_days=older_than_days)
+
+@job_queue.task('purge_deleted')
+def purge_deleted():
+    return purger.run_once()
+
+@job_queue.task('rebuild_counters')
+def rebuild_counters():
+    with db.engine.begin() as connection:
+        before = course_counters(connection)
+        rebuild_course_counters(connection)
+        rebuild_progress_counters(connection)
+        changed = touch_rebuilt_courses(connection, before)
+    invalidate_cache('courses', *(f'course:{course_id}' for course_id in changed))
+    return {'courses_changed': len(changed)}
+
+@job_queue.task('prune_jobs')
+def prune_jobs(older_than_days=None):
+    return {'deleted': job_queue.prune(older_than_days)}
+
+@job_queue.task('bulk_user_action', max_attempts=3)
+def bulk_user_action(action, actor_id, chunk_size, user_ids=None, user_filter=None, role=None, ip_address=None):
+    bulk_action = BulkUserAction(
+        action, user_ids=user_ids, user_filter=user_filter, role=role, actor_id=actor_id, chunk_size=chunk_size
+    )
+    result = bulk_action.run()
+    audit(f'bulk_{action}_users', bulk_action.summary(), user_id=actor_id, ip_address=ip_address)
+    return dict(result, message=bulk_action.summary())
+
+@job_queue.task('notify_users')
+def notify_users(message, type='announcement', link=None, role=None):
+    """Fan a notification out to every active user, or every active user with a role"""
+    users = User.__table__
+    conditions = [users.c.is_active.is_(True), users.c.deleted_at.is_(None)]
+    if role:
+        conditions.append(users.c.role_id == select(Role.role_id).where(Role.role_name == role).scalar_subquery())
+    state = job_queue.resume_state() or {'last_user_id': 0, 'notified': 0}
+    now = datetime.utcnow()
+    while True:
+        with db.engine.begin() as connection:
+            user_ids = list(connection.execute(
+                select(users.c.user_id).where(*conditions, users.c.user_id > state['last_user_id'])
+                .order_by(users.c.user_id).limit(NOTIFY_CHUNK_SIZE)
+            ).scalars())
+            if not user_ids:
+                return {'notified': state['notified']}
+            connection.execute(Notification.__table__.insert(), [
+                {'user_id': user_id, 'type': type, 'message': message, 'link': link, 'created_at': now, 'is_read': False}
+                for user_id in user_ids
+            ])
+            state = {'last_user_id': user_ids[-1], 'notified': state['notified'] + len(user_ids)}
+            job_queue.checkpoint(connection, state)
@@ -0,0 +1,126 @@
+"""Write-behind buffer for vlog view counts.
+
+Viewing a vlog used to commit `views += 1` on every read, turning reads into
+write transactions that queue on the SQLite write lock (and lose increments
+when two requests read the same value). Views are now added to an in-memory
+per-process buffer and written as one batched
+``UPDATE vlogs SET views = views + ?`` by a background thread every
+VIEW_COUNTER_FLUSH_INTERVAL seconds, as soon as VIEW_COUNTER_FLUSH_THRESHOLD
+views are pending, and once more at interpreter exit. Reads add the
+unflushed deltas of this process so counts and rankings stay current.
+"""
+import atexit
+import threading
+from collections import Counter
+from sqlalchemy import text
+from src.models.user import db
+from src.services.background import ProcessLocal, start_thread
+
+FLUSH_SQL = text('UPDATE vlogs SET views = COALESCE(views, 0) + :delta WHERE vlog_id = :vlog_id')
+
+class ViewCounterBuffer:
+    def __init__(self, app=None):
+        self.app = None
+        self.buffered = True
+        self.flush_interval = 5
+        self.flush_threshold = 1000
+        self._pending = Counter()
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher = ProcessLocal(lambda: start_thread(self._run, 'vlog-view-flusher'), on_fork=self._reset)
+        self.stats = {'views': 0, 'flushes': 0, 'rows_flushed': 0, 'errors': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.buffered = app.config.get('VIEW_COUNTER_BUFFERED', True)
+        self.flush_interval = app.config.get('VIEW_COUNTER_FLUSH_INTERVAL', 5)
+        self.flush_threshold = app.config.get('VIEW_COUNTER_FLUSH_THRESHOLD', 1000)
+        app.extensions['view_counter'] = self
+        atexit.register(self.flush)
+
+    def _reset(self):
+        # Views buffered by the parent are the parent's to flush
+        with self._lock:
+            self._pending.clear()
+            self._pending_total = 0
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def increment(self, vlog_id, count=1):
+        """Record `count` views of a vlog"""
+        if not self.buffered:
+            self._write({vlog_id: count})
+            with self._lock:
+                self.stats['views'] += count
+            return
+
+        self._flusher.get()
+        with self._lock:
+            self._pending[vlog_id] += count
+            self._pending_total += count
+            self.stats['views'] += count
+            full = self._pending_total >= self.flush_threshold
+        if full:
+            self._wakeup.set()
+
+    def pending(self, vlog_id):
+        with self._lock:
+            return self._pending.get(vlog_id, 0)
+
+    def pending_snapshot(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self):
+        """Write every pending delta in one transaction; returns the number of vlogs updated"""
+        with self._flush_lock:
+            with self._lock:
+                deltas = dict(self._pending)
+                self._pending.clear()
+                self._pending_total = 0
+            if not deltas:
+                return 0
+            try:
+                self._write(deltas)
+            except Exception:
+                # Keep the views for the next attempt rather than dropping them
+                with self._lock:
+                    self._pending.update(deltas)
+                    self._pending_total += sum(deltas.values())
+                    self.stats['errors'] += 1
+                return 0
+            with self._lock:
+                self.stats['flushes'] += 1
+                self.stats['rows_flushed'] += len(deltas)
+            return len(deltas)
+
+    def _write(self, deltas):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(FLUSH_SQL, [
+                    {'vlog_id': vlog_id, 'delta': delta} for vlog_id, delta in sorted(deltas.items())
+                ])
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending_vlogs'] = len(self._pending)
+            stats['pending_views'] = self._pending_total
+        stats['buffered'] = self.buffered
+        return stats
+
+view_counter = ViewCounterBuffer()
+
+def with_pending_views(vlog_data, pending=None):
+    """Add this process's unflushed views to a serialized vlog"""
+    delta = pending.get(vlog_data['vlog_id'], 0) if pending is not None else view_counter.pending(vlog_data['vlog_id'])
+    vlog_data['views'] = (vlog_data.get('views') or 0) + delta
+    return vlog_data